@@ -1,53 +1,116 @@
 #!/usr/bin/env python3
 
+import argparse
+import os
 import sys
 import logging
-import requests
 import xml.etree.ElementTree as ET
-from db_connection import get_connection, return_connection
-from dateutil import parser as date_parser
+from concurrent.futures import ThreadPoolExecutor
+from logging_config import setup_logging
+from date_parsing import parse_pub_date
+
+# requests und psycopg2 werden erst in den Funktionen importiert,
+# damit --help und Argumentfehler ohne sie auskommen
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Konfiguration
+CONFIG = {
+    'DISCOVERY_WORKERS': 16,  # Parallele Feed-Abrufe
+    'REQUEST_TIMEOUT': 10,  # Timeout für HTTP-Anfragen in Sekunden
+    'RSS_BASE_URL': os.getenv('NEWS_RSS_BASE_URL', 'https://news.google.com/rss')  # z. B. benchmarks/stub_servers.py
+}
+
 def parse_date(date_str):
+    if not date_str:
+        return None
     try:
-        return date_parser.parse(date_str)
+        return parse_pub_date(date_str)
+    except ValueError as e:
+        logger.error("Fehler beim Parsen des Datums '%s': %s", date_str, e)
+        return None
+
+def get_or_create_topic(cursor, topic_code, topic_name):
+    # Thema abrufen oder hinzufügen
+    cursor.execute("SELECT id, link FROM topics WHERE topic_name = %s", (topic_name,))
+    topic = cursor.fetchone()
+    if topic:
+        return topic[0], topic[1]
+
+    # Link zum Thema erstellen (ohne Ländercode)
+    topic_link_template = f"{CONFIG['RSS_BASE_URL']}/topics/{topic_code}?hl={{hl}}&gl={{gl}}&ceid={{ceid}}"
+    cursor.execute("""
+        INSERT INTO topics (topic_name, link)
+        VALUES (%s, %s)
+        RETURNING id
+    """, (topic_name, topic_link_template))
+    logger.info("Thema '%s' hinzugefügt.", topic_name)
+    return cursor.fetchone()[0], topic_link_template
+
+def discover_feed(topic_id, topic_link_template, country_id, iso_code):
+    """
+    Ruft den Feed eines Themas für ein Land ab und liefert die Zeile für die Tabelle feeds.
+    Läuft in einem Worker-Thread und greift nicht auf die Datenbank zu.
+    """
+    import requests
+
+    # Feed-Link für das Land erstellen
+    hl = iso_code.lower()
+    gl = iso_code.upper()
+    ceid = f"{gl}:{hl}"
+    feed_url = topic_link_template.format(hl=hl, gl=gl, ceid=ceid)
+
+    # Feed abrufen
+    try:
+        response = requests.get(feed_url, timeout=CONFIG['REQUEST_TIMEOUT'])
+        response.raise_for_status()
+        root = ET.fromstring(response.content)
+
+        # Titel, Sprache und Link aus dem Feed extrahieren
+        channel = root.find('channel')
+        title_element = channel.find('title')
+        language_element = channel.find('language')
+        link_element = channel.find('link')
+        last_build_date_element = channel.find('lastBuildDate')
+
+        feed_title = title_element.text if title_element is not None else None
+        language = language_element.text if language_element is not None else iso_code
+        last_build_date = parse_date(last_build_date_element.text) if last_build_date_element is not None else None
+
+        # Query-Parameter aus dem Link extrahieren
+        feed_link = link_element.text if link_element is not None else ''
+        query_params = ''
+        if '?' in feed_link:
+            query_params = feed_link.split('?', 1)[1]
+
+        return (feed_title, language, last_build_date, country_id, topic_id, query_params)
+
     except Exception as e:
-        logger.error(f"Fehler beim Parsen des Datums '{date_str}': {e}")
+        logger.error("Fehler beim Abrufen oder Verarbeiten des Feeds für Land '%s': %s", iso_code, e)
         return None
 
-def add_feeds_for_all_countries(topic_code, topic_name):
+def add_feeds_for_topics(topics):
+    """
+    Legt für jedes (topic_code, topic_name)-Paar die Feeds aller Länder an.
+    Die Feeds werden parallel mit begrenzter Thread-Anzahl abgerufen und
+    anschließend mit einem einzigen INSERT ... ON CONFLICT gespeichert.
+    Gibt False zurück bei einem Fehler oder wenn kein einziger Feed abgerufen werden konnte.
+    """
+    from psycopg2.extras import execute_values
+    from db_connection import get_connection, return_connection
+
     conn = None
     cursor = None
     try:
         conn = get_connection()
         if conn is None:
             logger.error("Keine Datenbankverbindung verfügbar")
-            return
+            return False
 
-        conn.autocommit = True
         cursor = conn.cursor()
 
-        # Thema abrufen oder hinzufügen
-        cursor.execute("SELECT id FROM topics WHERE topic_name = %s", (topic_name,))
-        topic = cursor.fetchone()
-        if not topic:
-            # Link zum Thema erstellen (ohne Ländercode)
-            topic_link_template = f"https://news.google.com/rss/topics/{topic_code}?hl={{hl}}&gl={{gl}}&ceid={{ceid}}"
-            cursor.execute("""
-                INSERT INTO topics (topic_name, link)
-                VALUES (%s, %s)
-                RETURNING id
-            """, (topic_name, topic_link_template))
-            topic_id = cursor.fetchone()[0]
-            logger.info(f"Thema '{topic_name}' hinzugefügt.")
-        else:
-            topic_id = topic[0]
-            # Den gespeicherten Thema-Link abrufen
-            cursor.execute("SELECT link FROM topics WHERE id = %s", (topic_id,))
-            topic_link_template = cursor.fetchone()[0]
+        topic_rows = [get_or_create_topic(cursor, topic_code, topic_name) for topic_code, topic_name in topics]
+        conn.commit()
 
         # Alle Länder abrufen
         cursor.execute("SELECT id, iso_code FROM countries")
@@ -60,68 +123,55 @@ def add_feeds_for_all_countries(topic_code, topic_name):
         # Länder neu anordnen
         ordered_countries = priority_countries + remaining_countries
 
-        for country_id, iso_code in ordered_countries:
-            # Feed-Link für das Land erstellen
-            hl = iso_code.lower()
-            gl = iso_code.upper()
-            ceid = f"{gl}:{hl}"
-            feed_url = topic_link_template.format(hl=hl, gl=gl, ceid=ceid)
-
-            # Feed abrufen
-            try:
-                response = requests.get(feed_url)
-                response.raise_for_status()
-                root = ET.fromstring(response.content)
-
-                # Titel, Sprache und Link aus dem Feed extrahieren
-                channel = root.find('channel')
-                title_element = channel.find('title')
-                language_element = channel.find('language')
-                link_element = channel.find('link')
-                last_build_date_element = channel.find('lastBuildDate')
-
-                feed_title = title_element.text if title_element is not None else None
-                language = language_element.text if language_element is not None else iso_code
-                last_build_date = parse_date(last_build_date_element.text) if last_build_date_element is not None else None
-
-                # Query-Parameter aus dem Link extrahieren
-                feed_link = link_element.text if link_element is not None else ''
-                query_params = ''
-                if '?' in feed_link:
-                    query_params = feed_link.split('?', 1)[1]
-
-                # Prüfen, ob der Feed bereits existiert
-                cursor.execute("""
-                    SELECT id FROM feeds WHERE query_params = %s AND topic_id = %s
-                """, (query_params, topic_id))
-                feed = cursor.fetchone()
-                if not feed:
-                    # Feed in die Datenbank einfügen
-                    cursor.execute("""
-                        INSERT INTO feeds (title, language, last_build_date, country_id, topic_id, query_params)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """, (feed_title, language, last_build_date, country_id, topic_id, query_params))
-                    logger.info(f"Feed für Land '{iso_code}' und Thema '{topic_name}' hinzugefügt.")
-                else:
-                    logger.info(f"Feed für Land '{iso_code}' und Thema '{topic_name}' existiert bereits mit denselben Query-Parametern. Übersprungen.")
-
-            except Exception as e:
-                logger.error(f"Fehler beim Abrufen oder Verarbeiten des Feeds für Land '{iso_code}': {e}")
+        jobs = [
+            (topic_id, topic_link_template, country_id, iso_code)
+            for topic_id, topic_link_template in topic_rows
+            for country_id, iso_code in ordered_countries
+        ]
+        with ThreadPoolExecutor(max_workers=CONFIG['DISCOVERY_WORKERS']) as executor:
+            discovered = [feed for feed in executor.map(lambda job: discover_feed(*job), jobs) if feed]
+        logger.info("%s von %s Feeds erfolgreich abgerufen.", len(discovered), len(jobs))
+
+        if not discovered:
+            return not jobs
+
+        # Feeds in einer einzigen Anweisung einfügen (execute_values teilt sonst in Seiten zu
+        # 100 Zeilen); bereits vorhandene werden übersprungen
+        inserted = execute_values(cursor, """
+            INSERT INTO feeds (title, language, last_build_date, country_id, topic_id, query_params)
+            VALUES %s
+            ON CONFLICT (topic_id, query_params) DO NOTHING
+            RETURNING id
+        """, discovered, page_size=len(discovered), fetch=True)
+        conn.commit()
+        logger.info("%s Feeds hinzugefügt, %s existierten bereits.", len(inserted), len(discovered) - len(inserted))
+        return True
 
     except Exception as e:
-        logger.error(f"Fehler beim Hinzufügen der Feeds: {e}")
+        if conn:
+            conn.rollback()
+        logger.error("Fehler beim Hinzufügen der Feeds: %s", e)
+        return False
     finally:
         if cursor:
             cursor.close()
         if conn:
             return_connection(conn)
 
-if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Verwendung: python add_feed.py <topic_code> <topic_name>")
-        sys.exit(1)
+def add_feeds_for_all_countries(topic_code, topic_name):
+    return add_feeds_for_topics([(topic_code, topic_name)])
 
-    topic_code = sys.argv[1]
-    topic_name = sys.argv[2]
+def run(argv=None) -> int:
+    # Kommandozeile, auch für python -m googlenewsmap add-feed; gibt den Exit-Code zurück
+    arg_parser = argparse.ArgumentParser(description="Feeds eines oder mehrerer Themen für alle Länder anlegen")
+    arg_parser.add_argument('topics', nargs='+', metavar='<topic_code> <topic_name>',
+                            help="Paare aus Google-News-Themencode und Themenname")
+    args = arg_parser.parse_args(argv)
+    if len(args.topics) % 2:
+        arg_parser.error("zu jedem Themencode gehört ein Themenname")
 
-    add_feeds_for_all_countries(topic_code, topic_name)
+    return 0 if add_feeds_for_topics(list(zip(args.topics[::2], args.topics[1::2]))) else 1
+
+if __name__ == '__main__':
+    setup_logging()
+    sys.exit(run())
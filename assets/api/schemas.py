@@ -2,7 +2,7 @@
 
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 class CountryBase(BaseModel):
     id: int
@@ -43,6 +43,9 @@ class ArticleBase(BaseModel):
     pub_date: Optional[datetime]
     publisher: Optional[PublisherBase]
     topic: Optional[TopicBase]
+    story_cluster_id: Optional[int] = None
+    # Nur bei zusammengefassten Story-Clustern: Anzahl der Artikel im Cluster
+    cluster_size: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -80,4 +83,41 @@ class PublishersArticlesListResponse(BaseModel):
     total_articles: int
     page: int
     page_size: int
-    items: List[PublisherWithArticles]
\ No newline at end of file
+    items: List[PublisherWithArticles]
+
+class StatsCountItem(BaseModel):
+    id: int
+    name: Optional[str]
+    count: int
+
+class StatsCountResponse(BaseModel):
+    group_by: str
+    days: int
+    total: int
+    items: List[StatsCountItem]
+
+class HeatmapPoint(BaseModel):
+    publisher_id: int
+    latitude: float
+    longitude: float
+    weight: int
+
+class HeatmapResponse(BaseModel):
+    days: int
+    max_weight: int
+    points: List[HeatmapPoint]
+
+class TrendSeries(BaseModel):
+    id: Optional[int]
+    name: Optional[str]
+    counts: List[int]
+
+class TrendResponse(BaseModel):
+    days: List[date]
+    series: List[TrendSeries]
+
+class DeltaSyncResponse(BaseModel):
+    sync_token: str
+    has_more: bool
+    items: List[ArticleBase]
+    publishers: List[PublisherBase]
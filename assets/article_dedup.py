@@ -0,0 +1,55 @@
+# article_dedup.py
+
+import hashlib
+import re
+import unicodedata
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query-Parameter, die nur Herkunft oder Sprache des Feeds beschreiben, nicht den Artikel.
+# Google News hängt z. B. oc=5 an jeden Link; hl/gl/ceid unterscheiden die Länderfeeds.
+IGNORED_PARAMS = {"oc", "hl", "gl", "ceid", "fbclid", "gclid", "ref"}
+IGNORED_PARAM_PREFIXES = ("utm_",)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+def canonical_url(link: str) -> str:
+    """
+    Normalisiert einen Artikellink, sodass derselbe Artikel aus verschiedenen Feeds
+    dieselbe URL erhält: https, Host in Kleinbuchstaben ohne www., ohne Fragment,
+    ohne abschließenden Slash und ohne Tracking-/Feed-Parameter (übrige sortiert).
+    """
+    parts = urlsplit(link.strip())
+    scheme = (parts.scheme or "https").lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    params = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in IGNORED_PARAMS and not key.lower().startswith(IGNORED_PARAM_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(params), ""))
+
+def normalize_title(title: str, publisher_name: Optional[str] = None) -> str:
+    """
+    Vergleichsform eines Titels: Unicode-normalisiert, ohne Groß-/Kleinschreibung,
+    Satzzeichen und das bei Google News angehängte " - Publisher".
+    """
+    title = unicodedata.normalize("NFKC", title).strip()
+    if publisher_name:
+        suffix = f" - {publisher_name.strip()}"
+        if title.endswith(suffix):
+            title = title[:-len(suffix)]
+    return " ".join(_NON_WORD.sub(" ", title.casefold()).split())
+
+def title_hash(title: str, publisher_name: Optional[str] = None) -> int:
+    # 64-Bit-Hash, passend für eine BIGINT-Spalte
+    digest = hashlib.blake2b(normalize_title(title, publisher_name).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
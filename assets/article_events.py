@@ -0,0 +1,150 @@
+# article_events.py
+
+import logging
+import select
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from db_connection import acquire_connection, create_connection, return_connection
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY-Kanal für neu gespeicherte und neu mit einem Feed verknüpfte Artikel;
+# die API lauscht darauf über article_hub (article_push.py, recent_index.py, vector_tiles.py)
+ARTICLES_CHANNEL = "new_articles"
+
+# NOTIFY-Nutzdaten sind auf knapp 8000 Byte begrenzt
+MAX_PAYLOAD_BYTES = 7000
+
+LISTEN_TIMEOUT = 5.0
+RECONNECT_DELAY = 5.0
+
+def _payloads(article_ids: Iterable[int]) -> List[str]:
+    payloads, current, size = [], [], 0
+    for article_id in article_ids:
+        text = str(article_id)
+        if current and size + len(text) + 1 > MAX_PAYLOAD_BYTES:
+            payloads.append(",".join(current))
+            current, size = [], 0
+        current.append(text)
+        size += len(text) + 1
+    if current:
+        payloads.append(",".join(current))
+    return payloads
+
+def publish_new_articles(cursor, article_ids: Iterable[int]):
+    """
+    Meldet Artikel-IDs (kommagetrennt) auf ARTICLES_CHANNEL.
+    Läuft in der Transaktion des Aufrufers; Postgres stellt das NOTIFY erst nach dem Commit zu,
+    sodass Empfänger die Zeilen sicher lesen können.
+    """
+    for payload in _payloads(article_ids):
+        cursor.execute("SELECT pg_notify(%s, %s)", (ARTICLES_CHANNEL, payload))
+
+def parse_payload(payload: str) -> List[int]:
+    return [int(part) for part in payload.split(",") if part.strip().isdigit()]
+
+def listen_for_articles(handle: Callable[[List[int]], None], on_connect: Optional[Callable[[], None]] = None):
+    """
+    Lauscht dauerhaft auf ARTICLES_CHANNEL und übergibt die IDs je Abholung an handle.
+    Bricht die Verbindung ab, wird neu verbunden; on_connect läuft nach jedem LISTEN,
+    da zwischenzeitliche Meldungen verloren sind. Für einen eigenen Thread gedacht.
+    """
+    while True:
+        listen_conn = create_connection(autocommit=True)
+        if listen_conn is None:
+            time.sleep(RECONNECT_DELAY)
+            continue
+        try:
+            with listen_conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {ARTICLES_CHANNEL}")
+            logger.info("Lausche auf %s", ARTICLES_CHANNEL)
+            if on_connect:
+                on_connect()
+            while True:
+                if select.select([listen_conn], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                    continue
+                listen_conn.poll()
+                article_ids = []
+                while listen_conn.notifies:
+                    article_ids.extend(parse_payload(listen_conn.notifies.pop(0).payload))
+                if article_ids:
+                    handle(article_ids)
+        except Exception as e:
+            logger.error("Listener auf %s unterbrochen: %s", ARTICLES_CHANNEL, e)
+            time.sleep(RECONNECT_DELAY)
+        finally:
+            listen_conn.close()
+
+class ArticleEventHub:
+    """
+    Ein LISTEN je API-Prozess: Ein Thread lauscht auf ARTICLES_CHANNEL, lädt die gemeldeten
+    Artikel einmal vom Primary und übergibt die Zeilen (ARTICLE_COLUMNS, change_version,
+    feed_ids) an alle registrierten Empfänger. on_reset läuft nach jedem (Wieder-)Verbinden
+    und wenn die Zeilen nicht geladen werden konnten, da Meldungen dann verloren sind.
+    """
+
+    def __init__(self):
+        self._handlers: List[Callable[[List[dict]], None]] = []
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, handle: Callable[[List[dict]], None], on_reset: Optional[Callable[[], None]] = None):
+        with self._lock:
+            self._handlers = self._handlers + [handle]
+            if on_reset:
+                self._reset_handlers = self._reset_handlers + [on_reset]
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=listen_for_articles, args=(self._on_articles, self._reset),
+                    name="article-events", daemon=True
+                )
+                self._thread.start()
+
+    def _reset(self):
+        for on_reset in self._reset_handlers:
+            try:
+                on_reset()
+            except Exception as e:
+                logger.error("Fehler beim Zurücksetzen nach %s: %s", ARTICLES_CHANNEL, e)
+
+    def _on_articles(self, article_ids: List[int]):
+        try:
+            rows = self.fetch(article_ids)
+        except Exception as e:
+            logger.error("Gemeldete Artikel konnten nicht geladen werden: %s", e)
+            self._reset()
+            return
+        for handle in self._handlers:
+            try:
+                handle(rows)
+            except Exception as e:
+                logger.error("Fehler beim Verarbeiten gemeldeter Artikel: %s", e)
+
+    @staticmethod
+    def fetch(article_ids: List[int]) -> List[dict]:
+        # Erst hier importiert, damit parse_feeds (publish_new_articles) sie nicht lädt
+        from psycopg2.extras import RealDictCursor
+        from article_queries import ARTICLE_COLUMNS, FEED_IDS_COLUMN
+
+        # Vom Primary lesen: Replicas haben die gerade committeten Zeilen evtl. noch nicht
+        conn = acquire_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    f"SELECT {ARTICLE_COLUMNS}, articles.change_version, {FEED_IDS_COLUMN}"
+                    " FROM articles WHERE articles.id = ANY(%s)",
+                    (article_ids,)
+                )
+                rows = cursor.fetchall()
+            conn.rollback()
+            return rows
+        finally:
+            return_connection(conn)
+
+article_hub = ArticleEventHub()
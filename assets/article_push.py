@@ -0,0 +1,192 @@
+# article_push.py
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from itertools import count
+from typing import AbstractSet, Dict, List, Optional, Set
+
+import metrics
+from api.schemas import ArticleBase
+from article_events import ArticleEventHub, article_hub
+from dimension_cache import DimensionCache, dimension_cache
+
+logger = logging.getLogger(__name__)
+
+# Maximal gepufferte Nachrichten je Client; ist der Puffer voll, erhält der Client ein
+# resync-Ereignis und lädt seine Suche neu, statt den Server aufzuhalten
+QUEUE_SIZE = 100
+
+# Metriken
+PUSH_SUBSCRIBERS = metrics.Gauge('newsmap_push_subscribers', 'Verbundene Live-Clients')
+PUSH_DELIVERED = metrics.Counter('newsmap_push_articles_delivered_total', 'An Clients ausgelieferte Artikel')
+PUSH_RESYNCS = metrics.Counter('newsmap_push_resyncs_total', 'Übergelaufene Client-Puffer')
+PUSH_DISPATCH_SECONDS = metrics.Histogram('newsmap_push_dispatch_seconds', 'Laden und Verteilen einer Artikelmeldung')
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Artikel haben zeitzonenbehaftete Daten; Angaben ohne Zeitzone gelten als UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+class Subscription:
+    """
+    Filter eines Live-Clients, dieselben wie bei /search; Themen gelten wie dort über alle
+    Feeds, mit denen ein Artikel verknüpft ist (article_feeds). Nachrichten werden im
+    Event-Loop des Servers in die Queue gelegt.
+    """
+    __slots__ = ('id', 'keywords', 'topic_ids', 'publisher_ids', 'country', 'date_from', 'date_to',
+                 'loop', 'queue', 'lagging')
+
+    def __init__(self, subscription_id: int, loop: asyncio.AbstractEventLoop,
+                 keywords: Optional[str] = None, topics: Optional[List[int]] = None,
+                 publishers: Optional[List[int]] = None, country: Optional[str] = None,
+                 date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+        self.id = subscription_id
+        self.keywords = keywords.casefold() if keywords else None
+        self.topic_ids = frozenset(topics or ())
+        self.publisher_ids = frozenset(publishers or ())
+        self.country = country.upper() if country else None
+        self.date_from = _as_utc(date_from)
+        self.date_to = _as_utc(date_to)
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.lagging = False
+
+    def matches(self, article: ArticleBase, topic_ids: AbstractSet[int], country_iso: Optional[str]) -> bool:
+        if self.topic_ids and self.topic_ids.isdisjoint(topic_ids):
+            return False
+        if self.publisher_ids and article.publisher.id not in self.publisher_ids:
+            return False
+        if self.country and country_iso != self.country:
+            return False
+        if self.date_from and (article.pub_date is None or article.pub_date < self.date_from):
+            return False
+        if self.date_to and (article.pub_date is None or article.pub_date > self.date_to):
+            return False
+        if self.keywords and self.keywords not in article.title.casefold():
+            return False
+        return True
+
+    def deliver(self, message: str):
+        # Läuft im Event-Loop (call_soon_threadsafe)
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if not self.lagging:
+                PUSH_RESYNCS.inc()
+            self.lagging = True
+
+class SubscriptionIndex:
+    """
+    Ordnet jede Subscription ihrem trennschärfsten Filter zu (Thema, sonst Publisher,
+    sonst Land). Für einen Artikel werden so nur die Subscriptions seines Themas,
+    Publishers und Landes sowie die ungefilterten geprüft.
+    """
+
+    def __init__(self):
+        self.by_topic: Dict[int, Set[Subscription]] = {}
+        self.by_publisher: Dict[int, Set[Subscription]] = {}
+        self.by_country: Dict[str, Set[Subscription]] = {}
+        self.unfiltered: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _slots(self, subscription: Subscription):
+        if subscription.topic_ids:
+            return [self.by_topic.setdefault(key, set()) for key in subscription.topic_ids]
+        if subscription.publisher_ids:
+            return [self.by_publisher.setdefault(key, set()) for key in subscription.publisher_ids]
+        if subscription.country:
+            return [self.by_country.setdefault(subscription.country, set())]
+        return [self.unfiltered]
+
+    def add(self, subscription: Subscription):
+        with self._lock:
+            for slot in self._slots(subscription):
+                slot.add(subscription)
+            self._count += 1
+
+    def remove(self, subscription: Subscription):
+        with self._lock:
+            for slot in self._slots(subscription):
+                slot.discard(subscription)
+            self._count -= 1
+
+    def candidates(self, topic_ids: AbstractSet[int], publisher_id: int, country_iso: Optional[str]) -> Set[Subscription]:
+        with self._lock:
+            result = set(self.unfiltered)
+            for topic_id in topic_ids:
+                result.update(self.by_topic.get(topic_id, ()))
+            result.update(self.by_publisher.get(publisher_id, ()))
+            if country_iso:
+                result.update(self.by_country.get(country_iso, ()))
+        return result
+
+class ArticlePushHub:
+    """
+    Erhält neu gespeicherte Artikel vom gemeinsamen Listener (article_events.article_hub),
+    serialisiert jeden Artikel einmal und verteilt ihn an alle passenden Subscriptions.
+    Wird ein vorhandener Artikel mit einem weiteren Feed verknüpft, kommt er erneut; Clients,
+    deren Filter schon vorher passte, erhalten ihn dann ein zweites Mal (gleiche id).
+    Der Listener startet mit der ersten Subscription.
+    """
+
+    def __init__(self, cache: DimensionCache, events: ArticleEventHub):
+        self.cache = cache
+        self.events = events
+        self.index = SubscriptionIndex()
+        self._ids = count(1)
+        events.subscribe(self._on_articles)
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, **filters) -> Subscription:
+        subscription = Subscription(next(self._ids), loop, **filters)
+        self.index.add(subscription)
+        PUSH_SUBSCRIBERS.set(len(self.index))
+        self.events.ensure_started()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.index.remove(subscription)
+        PUSH_SUBSCRIBERS.set(len(self.index))
+
+    def _on_articles(self, rows: List[dict]):
+        if len(self.index):
+            self.dispatch(rows)
+
+    def dispatch(self, rows: List[dict]):
+        # rows wie von ArticleEventHub.fetch, also mit feed_ids
+        with PUSH_DISPATCH_SECONDS.time():
+            articles = self.cache.hydrate_articles(rows)
+            feed_ids = {row['id']: row['feed_ids'] or () for row in rows}
+
+            # Je Subscription die passenden, bereits serialisierten Artikel sammeln
+            pending: Dict[Subscription, List[str]] = {}
+            for article in articles:
+                # Unbekannte Dimensionen (siehe hydrate_articles) lassen sich nicht filtern
+                if article.publisher is None or article.topic is None:
+                    continue
+                country_iso = self.cache.country_iso_for_publisher(article.publisher.id)
+                topic_ids = {self.cache.feed_topics.get(feed_id) for feed_id in feed_ids[article.id]} - {None}
+                topic_ids.add(article.topic.id)
+                serialized = None
+                for subscription in self.index.candidates(topic_ids, article.publisher.id, country_iso):
+                    if subscription.matches(article, topic_ids, country_iso):
+                        if serialized is None:
+                            serialized = article.model_dump_json()
+                        pending.setdefault(subscription, []).append(serialized)
+
+            for subscription, items in pending.items():
+                message = f"event: articles\ndata: [{','.join(items)}]\n\n"
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+                except RuntimeError:
+                    # Event-Loop bereits beendet (Server fährt herunter)
+                    continue
+                PUSH_DELIVERED.inc(len(items))
+
+push_hub = ArticlePushHub(dimension_cache, article_hub)
@@ -0,0 +1,271 @@
+# article_queries.py
+
+import json
+import logging
+import os
+import threading
+import weakref
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import psycopg2
+import psycopg2.errors
+
+import metrics
+from dimension_cache import DimensionCache
+
+logger = logging.getLogger(__name__)
+
+# Artikelabfragen liefern nur Artikelspalten und Fremdschlüssel;
+# Publisher und Themen kommen aus dem Dimension-Cache
+ARTICLE_COLUMNS = """
+    articles.id, articles.title, articles.link, articles.pub_date,
+    articles.publisher_id, articles.feed_id, articles.story_cluster_id
+"""
+
+# Feed-IDs aus article_feeds, wie sie der Themenfilter in FILTERS prüft
+FEED_IDS_COLUMN = """
+    ARRAY(SELECT article_feeds.feed_id FROM article_feeds WHERE article_feeds.article_id = articles.id) AS feed_ids
+"""
+
+# Mögliche Filter in fester Reihenfolge: (Name, Bedingung mit Platzhalter, Postgres-Typ)
+FILTERS = (
+    ("keywords", "articles.title ILIKE {}", "text"),
+    # Artikel erscheinen in mehreren Feeds (article_feeds), nicht nur in articles.feed_id
+    ("topics", "EXISTS (SELECT 1 FROM article_feeds WHERE article_feeds.article_id = articles.id"
+               " AND article_feeds.feed_id = ANY({}))", "integer[]"),
+    ("publishers", "articles.publisher_id = ANY({})", "integer[]"),
+    ("country", "publishers.country_id = {}", "integer"),
+    ("date_from", "articles.pub_date >= {}", "timestamptz"),
+    ("date_to", "articles.pub_date <= {}", "timestamptz"),
+)
+
+# Optional plan_cache_mode je Verbindung, z. B. force_generic_plan, damit Postgres auch
+# nach den ersten Ausführungen nicht mehr pro Aufruf plant (Standard: Postgres entscheidet)
+PLAN_CACHE_MODE = os.getenv("API_PLAN_CACHE_MODE")
+
+# Metriken
+PREPARE_SECONDS = metrics.Histogram('newsmap_api_prepare_seconds', 'Dauer von PREPARE je Abfrageart', ['statement'])
+EXECUTE_SECONDS = metrics.Histogram('newsmap_api_execute_seconds', 'Dauer von EXECUTE je Abfrageart', ['statement'])
+PREPARED_LOOKUPS = metrics.Counter('newsmap_api_prepared_lookups_total', 'Verwendung vorbereiteter Statements', ['result'])
+
+class ArticleFilter(NamedTuple):
+    """Aktive Filter als Bitmaske plus Parameterwerte in der Reihenfolge von FILTERS."""
+    mask: int
+    values: Tuple
+
+class QueryTemplate(NamedTuple):
+    name: str
+    kind: str
+    sql: str
+    param_types: Tuple[str, ...]
+
+def build_article_filters(
+    cache: DimensionCache,
+    keywords: Optional[str] = None,
+    topics: Optional[List[int]] = None,
+    publishers: Optional[List[int]] = None,
+    country: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> ArticleFilter:
+    """
+    Übersetzt die Filter von /news und /search in eine kanonische Kombination.
+    Themen und Länder werden über den Cache in Feed- bzw. Länder-IDs übersetzt, sodass
+    topics und countries nicht gejoint werden müssen.
+    """
+    candidates = (
+        f"%{keywords}%" if keywords else None,
+        cache.feed_ids_for_topics(topics) if topics else None,
+        publishers or None,
+        # Unbekannter Ländercode: keine Treffer
+        (cache.country_id(country) or -1) if country else None,
+        date_from,
+        date_to,
+    )
+    mask = 0
+    values = []
+    for index, value in enumerate(candidates):
+        if value is not None:
+            mask |= 1 << index
+            values.append(value)
+    return ArticleFilter(mask, tuple(values))
+
+def _where_clause(mask: int, first_param: int = 1) -> Tuple[str, Tuple[str, ...]]:
+    conditions = ["articles.publisher_id IS NOT NULL"]
+    types = []
+    for index, (_, condition, param_type) in enumerate(FILTERS):
+        if mask & (1 << index):
+            types.append(param_type)
+            conditions.append(condition.format(f"${first_param + len(types) - 1}"))
+    return " AND ".join(conditions), tuple(types)
+
+def _needs_publisher_join(mask: int) -> bool:
+    return any(mask & (1 << index) and "publishers." in condition for index, (_, condition, _) in enumerate(FILTERS))
+
+@lru_cache(maxsize=None)
+def news_count_template(mask: int) -> QueryTemplate:
+    where, types = _where_clause(mask)
+    from_clause = "articles"
+    if _needs_publisher_join(mask):
+        from_clause += " JOIN publishers ON articles.publisher_id = publishers.id"
+    sql = f"SELECT COUNT(*) FROM {from_clause} WHERE {where}"
+    return QueryTemplate(f"news_count_{mask:02x}", "news_count", sql, types)
+
+@lru_cache(maxsize=None)
+def news_page_template(mask: int) -> QueryTemplate:
+    where, types = _where_clause(mask)
+    from_clause = "articles"
+    if _needs_publisher_join(mask):
+        from_clause += " JOIN publishers ON articles.publisher_id = publishers.id"
+    offset, limit = len(types) + 1, len(types) + 2
+    sql = (
+        f"SELECT {ARTICLE_COLUMNS} FROM {from_clause} WHERE {where}"
+        f" ORDER BY articles.pub_date DESC OFFSET ${offset} LIMIT ${limit}"
+    )
+    return QueryTemplate(f"news_page_{mask:02x}", "news_page", sql, types + ("bigint", "bigint"))
+
+@lru_cache(maxsize=None)
+def search_page_template(mask: int) -> QueryTemplate:
+    # publishers wird immer gejoint, da nach vorhandenen Koordinaten sortiert wird
+    where, types = _where_clause(mask)
+    offset, limit = len(types) + 1, len(types) + 2
+    sql = (
+        f"SELECT {ARTICLE_COLUMNS} FROM articles JOIN publishers ON articles.publisher_id = publishers.id"
+        f" WHERE {where}"
+        f" ORDER BY (publishers.latitude IS NULL) ASC, articles.pub_date DESC OFFSET ${offset} LIMIT ${limit}"
+    )
+    return QueryTemplate(f"search_page_{mask:02x}", "search_page", sql, types + ("bigint", "bigint"))
+
+@lru_cache(maxsize=None)
+def search_collapsed_page_template(mask: int) -> QueryTemplate:
+    """
+    Wie search_page, aber je Story-Cluster nur der erste Artikel in Suchreihenfolge, mit der
+    Anzahl aller passenden Artikel des Clusters (cluster_size). Zusammengefasst wird vor
+    OFFSET/LIMIT, sodass ein Cluster nur auf einer Seite erscheint. Noch nicht geclusterte
+    Artikel bilden jeweils einen eigenen Cluster.
+    """
+    where, types = _where_clause(mask)
+    offset, limit = len(types) + 1, len(types) + 2
+    cluster_key = "COALESCE(articles.story_cluster_id, -articles.id)"
+    sql = (
+        "SELECT id, title, link, pub_date, publisher_id, feed_id, story_cluster_id, cluster_size FROM ("
+        f" SELECT DISTINCT ON ({cluster_key}) {ARTICLE_COLUMNS},"
+        " (publishers.latitude IS NULL) AS without_location,"
+        f" count(*) OVER (PARTITION BY {cluster_key}) AS cluster_size"
+        " FROM articles JOIN publishers ON articles.publisher_id = publishers.id"
+        f" WHERE {where}"
+        f" ORDER BY {cluster_key}, (publishers.latitude IS NULL) ASC, articles.pub_date DESC"
+        ") AS representatives"
+        f" ORDER BY without_location ASC, pub_date DESC OFFSET ${offset} LIMIT ${limit}"
+    )
+    return QueryTemplate(f"search_collapsed_page_{mask:02x}", "search_collapsed_page", sql, types + ("bigint", "bigint"))
+
+@lru_cache(maxsize=None)
+def changes_page_template(mask: int) -> QueryTemplate:
+    # Geänderte Artikel oberhalb einer Änderungsnummer, aufsteigend für die Delta-Synchronisation
+    where, types = _where_clause(mask)
+    from_clause = "articles"
+    if _needs_publisher_join(mask):
+        from_clause += " JOIN publishers ON articles.publisher_id = publishers.id"
+    after, limit = len(types) + 1, len(types) + 2
+    sql = (
+        f"SELECT {ARTICLE_COLUMNS}, articles.change_version FROM {from_clause}"
+        f" WHERE {where} AND articles.change_version > ${after}"
+        f" ORDER BY articles.change_version LIMIT ${limit}"
+    )
+    return QueryTemplate(f"changes_page_{mask:02x}", "changes_page", sql, types + ("bigint", "bigint"))
+
+# Häufigste Filterkombinationen der Kartenansicht; werden beim Start jedes API-Workers auf
+# den offenen Verbindungen vorbereitet (main.warm_up)
+COMMON_FILTERS = ((), ("topics",), ("country",), ("topics", "country"), ("date_from",), ("topics", "date_from"))
+
+def filter_mask(*names: str) -> int:
+    known = [name for name, _, _ in FILTERS]
+    return sum(1 << known.index(name) for name in names)
+
+# Je Verbindung die bereits vorbereiteten Statement-Namen. Schwache Schlüssel: verwirft der
+# Pool eine Verbindung, verschwindet auch ihr Eintrag, und eine neue Verbindung gilt nie
+# fälschlich als vorbereitet.
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+def _prepared_names(conn) -> Set[str]:
+    with _prepared_lock:
+        return _prepared.setdefault(conn, set())
+
+def prepare(cursor, template: QueryTemplate):
+    names = _prepared_names(cursor.connection)
+    if template.name in names:
+        PREPARED_LOOKUPS.inc(result='hit')
+        return
+    PREPARED_LOOKUPS.inc(result='miss')
+    if not names and PLAN_CACHE_MODE:
+        cursor.execute("SELECT set_config('plan_cache_mode', %s, false)", (PLAN_CACHE_MODE,))
+    with PREPARE_SECONDS.time(statement=template.kind):
+        cursor.execute(f"PREPARE {template.name} ({', '.join(template.param_types)}) AS {template.sql}")
+    names.add(template.name)
+
+def prepare_common(cursor) -> int:
+    # Bereitet news_count, news_page und search_page für COMMON_FILTERS vor; liefert die Anzahl
+    templates = [
+        build(filter_mask(*names))
+        for names in COMMON_FILTERS
+        for build in (news_count_template, news_page_template, search_page_template)
+    ]
+    for template in templates:
+        prepare(cursor, template)
+    return len(templates)
+
+def _execute_sql(template: QueryTemplate, params) -> str:
+    if not params:
+        return f"EXECUTE {template.name}"
+    return f"EXECUTE {template.name} ({', '.join(['%s'] * len(params))})"
+
+def execute_prepared(cursor, template: QueryTemplate, params) -> None:
+    """
+    Führt ein Template als serverseitiges Prepared Statement aus. Parsen und Planen
+    entfallen so bei wiederholten Anfragen mit derselben Filterkombination.
+    """
+    prepare(cursor, template)
+    execute_sql = _execute_sql(template, params)
+    try:
+        with EXECUTE_SECONDS.time(statement=template.kind):
+            cursor.execute(execute_sql, params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # Statement auf dem Server unbekannt (z. B. nach DISCARD ALL): neu vorbereiten
+        cursor.connection.rollback()
+        _prepared_names(cursor.connection).discard(template.name)
+        prepare(cursor, template)
+        with EXECUTE_SECONDS.time(statement=template.kind):
+            cursor.execute(execute_sql, params)
+
+def explain_prepared(cursor, template: QueryTemplate, params, buffers: bool = False) -> Dict[str, object]:
+    """
+    Misst Planungs- und Ausführungszeit eines Templates per EXPLAIN (ANALYZE), mit
+    buffers=True inkl. Shared-Buffer-Treffern und -Lesezugriffen; "plan" enthält den ganzen Plan.
+    Führt die Abfrage tatsächlich aus und ist daher nur für Diagnosen gedacht.
+    """
+    prepare(cursor, template)
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if buffers else "ANALYZE, FORMAT JSON"
+    cursor.execute(f"EXPLAIN ({options}) " + _execute_sql(template, params), params)
+    row = cursor.fetchone()
+    plan = row[0] if not isinstance(row, dict) else next(iter(row.values()))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    result = {
+        "planning_ms": plan[0].get("Planning Time", 0.0),
+        "execution_ms": plan[0].get("Execution Time", 0.0),
+        "plan": plan[0].get("Plan"),
+    }
+    if buffers:
+        top = plan[0].get("Plan", {})
+        result["shared_hit_blocks"] = top.get("Shared Hit Blocks", 0)
+        result["shared_read_blocks"] = top.get("Shared Read Blocks", 0)
+    return result
+
+def replay_sql(cursor, template: QueryTemplate, params) -> str:
+    # PREPARE und EXECUTE mit eingesetzten Werten, direkt in psql ausführbar
+    execute = cursor.mogrify(_execute_sql(template, params), params).decode("utf-8", errors="replace")
+    return f"PREPARE {template.name} ({', '.join(template.param_types)}) AS {template.sql};\n{execute};"
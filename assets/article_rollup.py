@@ -0,0 +1,127 @@
+# article_rollup.py
+
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Gruppierungen der Statistik-Endpoints -> Spalte in article_daily_counts
+GROUP_COLUMNS = {
+    "country": "country_id",
+    "topic": "topic_id",
+    "publisher": "publisher_id",
+}
+
+def record_article_counts(cursor, topic_id: int, articles: Iterable[Tuple[Optional[int], Optional[datetime]]]):
+    """
+    Erhöht die Tageszähler für frisch eingefügte Artikel (publisher_id, pub_date).
+    Läuft in der Transaktion des Aufrufers, sodass Artikel und Zähler gemeinsam committet werden.
+    Das Land kommt vom Publisher, wie beim Länderfilter der API.
+    """
+    counts = Counter(
+        (publisher_id, pub_date.astimezone(timezone.utc).date())
+        for publisher_id, pub_date in articles
+        if publisher_id is not None and pub_date is not None
+    )
+    if not counts:
+        return
+    # Feste Reihenfolge, damit parallele Worker die Zeilen in derselben Reihenfolge sperren
+    rows = sorted((publisher_id, topic_id, day, count) for (publisher_id, day), count in counts.items())
+    execute_values(cursor, """
+        INSERT INTO article_daily_counts (country_id, topic_id, publisher_id, day, article_count)
+        SELECT publishers.country_id, v.topic_id, v.publisher_id, v.day, v.article_count
+        FROM (VALUES %s) AS v(publisher_id, topic_id, day, article_count)
+        JOIN publishers ON publishers.id = v.publisher_id
+        WHERE publishers.country_id IS NOT NULL
+        ORDER BY v.publisher_id, v.day
+        ON CONFLICT (country_id, topic_id, publisher_id, day)
+        DO UPDATE SET article_count = article_daily_counts.article_count + EXCLUDED.article_count
+    """, rows, template="(%s::integer, %s::integer, %s::date, %s::integer)")
+
+def day_range(days: int, today: Optional[date] = None) -> List[date]:
+    # Die letzten `days` Kalendertage (UTC) einschließlich heute
+    today = today or datetime.now(timezone.utc).date()
+    return [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+def _where_clause(
+    days: int,
+    topic_ids: Optional[List[int]] = None,
+    country_id: Optional[int] = None,
+    publisher_ids: Optional[List[int]] = None,
+) -> Tuple[str, list]:
+    conditions = ["day >= %s"]
+    params: list = [day_range(days)[0]]
+    if topic_ids:
+        conditions.append("topic_id = ANY(%s)")
+        params.append(topic_ids)
+    if country_id is not None:
+        conditions.append("country_id = %s")
+        params.append(country_id)
+    if publisher_ids:
+        conditions.append("publisher_id = ANY(%s)")
+        params.append(publisher_ids)
+    return " AND ".join(conditions), params
+
+def count_by(cursor, group_by: str, days: int, limit: int, **filters) -> List[Tuple[int, int]]:
+    """
+    Artikelzahlen der letzten `days` Tage je Land, Thema oder Publisher, absteigend sortiert.
+    """
+    column = GROUP_COLUMNS[group_by]
+    where, params = _where_clause(days, **filters)
+    cursor.execute(f"""
+        SELECT {column}, SUM(article_count)
+        FROM article_daily_counts
+        WHERE {where}
+        GROUP BY {column}
+        ORDER BY 2 DESC, 1
+        LIMIT %s
+    """, params + [limit])
+    return [(key, int(total)) for key, total in cursor.fetchall()]
+
+def daily_trend(
+    cursor, days: int, group_by: Optional[str] = None, limit: int = 10, **filters
+) -> Tuple[List[date], Dict[Optional[int], List[int]]]:
+    """
+    Tageszahlen für Sparklines, lückenlos mit 0 aufgefüllt. Ohne group_by eine Gesamtreihe
+    (Schlüssel None), sonst je eine Reihe für die `limit` stärksten Gruppen.
+    """
+    day_list = day_range(days)
+    positions = {day: index for index, day in enumerate(day_list)}
+    where, params = _where_clause(days, **filters)
+
+    if group_by is None:
+        cursor.execute(f"""
+            SELECT NULL, day, SUM(article_count)
+            FROM article_daily_counts
+            WHERE {where}
+            GROUP BY day
+        """, params)
+    else:
+        column = GROUP_COLUMNS[group_by]
+        cursor.execute(f"""
+            WITH top_keys AS (
+                SELECT {column} AS key
+                FROM article_daily_counts
+                WHERE {where}
+                GROUP BY {column}
+                ORDER BY SUM(article_count) DESC, 1
+                LIMIT %s
+            )
+            SELECT {column}, day, SUM(article_count)
+            FROM article_daily_counts
+            WHERE {where} AND {column} IN (SELECT key FROM top_keys)
+            GROUP BY {column}, day
+        """, params + [limit] + params)
+
+    series: Dict[Optional[int], List[int]] = {}
+    for key, day, total in cursor.fetchall():
+        counts = series.setdefault(key, [0] * len(day_list))
+        if day in positions:
+            counts[positions[day]] = int(total)
+    if group_by is None and not series:
+        series[None] = [0] * len(day_list)
+    return day_list, series
@@ -0,0 +1,197 @@
+# bench_api.py
+#
+# Lastszenarien für alle /api/v01/*-Endpoints gegen eine laufende API (z. B. mit dem
+# Datensatz aus benchmarks/synthetic_data.py). Je Szenario werden Durchsatz sowie p50/p99
+# der Antwortzeit gemessen; mit --baseline wird gegen einen gespeicherten Lauf verglichen
+# und bei Regressionen mit Exit-Code 1 beendet.
+# Aufruf aus assets/:
+#   python -m benchmarks.bench_api --url http://127.0.0.1:8000 --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.bench_api --url http://127.0.0.1:8000 --baseline benchmarks/baseline.json
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from benchmarks.synthetic_data import FEED_COUNTRIES
+
+KEYWORDS = ["reform", "Zins", "strike", "canicule", "Polizei", "2", "Senado", "政府", "Правительство"]
+
+class Fixture(NamedTuple):
+    # IDs und Werte aus der API, mit denen die Szenarien ihre Anfragen bauen
+    topic_ids: List[int]
+    publishers: List[Tuple[int, float, float]]  # (id, Breite, Länge) geokodierter Publisher
+    article_ids: List[int]
+    country_codes: List[str]
+    sync_token: str
+
+class Result(NamedTuple):
+    requests: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p99_ms: float
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-Rank-Verfahren
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def load_fixture(session: requests.Session, base_url: str, country_codes: List[str]) -> Fixture:
+    topics = session.get(f"{base_url}/api/v01/topics", timeout=30).json()["items"]
+    publishers = session.get(f"{base_url}/api/v01/publishers", timeout=30).json()["items"]
+    news = session.get(f"{base_url}/api/v01/news", params={"page_size": 1000}, timeout=60).json()
+    token = session.get(f"{base_url}/api/v01/news/changes", timeout=30).json()["sync_token"]
+    located = [
+        (p["id"], p["location"]["latitude"], p["location"]["longitude"])
+        for p in publishers
+        if p.get("location") and p["location"].get("latitude") is not None and p["location"].get("longitude") is not None
+    ]
+    return Fixture(
+        topic_ids=[t["id"] for t in topics],
+        publishers=located,
+        article_ids=[a["id"] for a in news["items"]],
+        country_codes=country_codes,
+        sync_token=token,
+    )
+
+def _tile(rng: random.Random, fixture: Fixture) -> str:
+    # Kacheln um zufällige Publisher, damit die Szenarien nicht nur leere Kacheln messen
+    _, latitude, longitude = rng.choice(fixture.publishers)
+    zoom = rng.randrange(2, 9)
+    n = 1 << zoom
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * n)
+    return f"/api/v01/tiles/{zoom}/{min(x, n - 1)}/{min(y, n - 1)}.mvt"
+
+# Szenario: Name -> Funktion (rng, fixture) -> (Pfad, Query-Parameter)
+SCENARIOS: Dict[str, Callable[[random.Random, Fixture], Tuple[str, dict]]] = {
+    "news": lambda rng, f: ("/api/v01/news", {"page": rng.randrange(1, 6), "page_size": 200}),
+    "news_filtered": lambda rng, f: ("/api/v01/news", {
+        "topics": rng.sample(f.topic_ids, min(2, len(f.topic_ids))), "country": rng.choice(f.country_codes),
+        "date_from": (date.today() - timedelta(days=rng.randrange(1, 14))).isoformat(),
+    }),
+    "news_keywords": lambda rng, f: ("/api/v01/news", {"keywords": rng.choice(KEYWORDS), "page_size": 100}),
+    "news_changes": lambda rng, f: ("/api/v01/news/changes", {"since": f.sync_token, "limit": 500}),
+    "news_detail": lambda rng, f: (f"/api/v01/news/{rng.choice(f.article_ids)}", {}),
+    "topics": lambda rng, f: ("/api/v01/topics", {}),
+    "publishers": lambda rng, f: ("/api/v01/publishers", {"country": rng.choice(f.country_codes)}),
+    "autocomplete": lambda rng, f: ("/api/v01/search/autocomplete", {"q": rng.choice(KEYWORDS)[:3]}),
+    "search": lambda rng, f: ("/api/v01/search", {
+        "topics": [rng.choice(f.topic_ids)], "country": rng.choice(f.country_codes), "collapse_stories": True,
+    }),
+    "search_stream": lambda rng, f: ("/api/v01/search/stream", {"topics": [rng.choice(f.topic_ids)]}),
+    "stats_counts": lambda rng, f: ("/api/v01/stats/counts", {"group_by": rng.choice(["country", "topic", "publisher"]), "days": 30}),
+    "stats_heatmap": lambda rng, f: ("/api/v01/stats/heatmap", {"days": rng.choice([1, 7, 30])}),
+    "stats_trend": lambda rng, f: ("/api/v01/stats/trend", {"group_by": "topic", "days": 30}),
+    "tiles": lambda rng, f: (_tile(rng, f), {"topics": [rng.choice(f.topic_ids)]} if rng.random() < 0.3 else {}),
+}
+# Streams laufen endlos: gemessen wird die Zeit bis zu den Antwort-Headern
+STREAMING = {"search_stream"}
+
+def run_scenario(base_url: str, name: str, fixture: Fixture, request_count: int, concurrency: int,
+                 warmup: int, seed: int) -> Result:
+    build = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    plan = [build(rng, fixture) for _ in range(warmup + request_count)]
+    local = threading.local()
+
+    def call(job: Tuple[str, dict]) -> Optional[float]:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, params = job
+        started = time.perf_counter()
+        try:
+            with session.get(f"{base_url}{path}", params=params, timeout=60, stream=name in STREAMING) as response:
+                if name not in STREAMING:
+                    response.content
+                ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started if ok else None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, plan[:warmup]))
+        started = time.perf_counter()
+        timings = list(executor.map(call, plan[warmup:]))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(t * 1000 for t in timings if t is not None)
+    return Result(
+        requests=request_count,
+        errors=request_count - len(latencies),
+        throughput=request_count / elapsed,
+        p50_ms=percentile(latencies, 0.50),
+        p99_ms=percentile(latencies, 0.99),
+    )
+
+def regressions(name: str, result: Result, baseline: dict, tolerance: float) -> List[str]:
+    reference = baseline.get(name)
+    if not reference:
+        return []
+    found = []
+    if result.throughput < reference["throughput"] * (1 - tolerance):
+        found.append(f"Durchsatz {result.throughput:.1f}/s < {reference['throughput']:.1f}/s")
+    if result.p99_ms > reference["p99_ms"] * (1 + tolerance):
+        found.append(f"p99 {result.p99_ms:.1f} ms > {reference['p99_ms']:.1f} ms")
+    if result.errors > reference.get("errors", 0):
+        found.append(f"{result.errors} Fehler (vorher {reference.get('errors', 0)})")
+    return found
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Lastszenarien für die News-API")
+    arg_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    arg_parser.add_argument("--scenarios", nargs="*", choices=sorted(SCENARIOS), help="Standard: alle")
+    arg_parser.add_argument("--requests", type=int, default=500, help="Gemessene Anfragen je Szenario")
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--warmup", type=int, default=50)
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--countries", type=int, default=12, help="Wie bei benchmarks.synthetic_data")
+    arg_parser.add_argument("--baseline", help="JSON eines früheren Laufs zum Vergleich")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15, help="Erlaubte Abweichung (Anteil)")
+    arg_parser.add_argument("--save-baseline", help="Ergebnisse als neue Baseline speichern")
+    args = arg_parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    fixture = load_fixture(requests.Session(), base_url, FEED_COUNTRIES[:args.countries])
+    if not fixture.article_ids or not fixture.publishers:
+        sys.exit("Keine Artikel oder geokodierten Publisher; zuerst benchmarks.synthetic_data ausführen")
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+
+    results = {}
+    failed = False
+    print(f"{'Szenario':<16}{'Anfragen/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'Fehler':>8}")
+    for name in args.scenarios or list(SCENARIOS):
+        result = run_scenario(base_url, name, fixture, args.requests, args.concurrency, args.warmup, args.seed)
+        results[name] = result._asdict()
+        problems = regressions(name, result, baseline, args.tolerance)
+        failed = failed or bool(problems)
+        marker = "  REGRESSION: " + "; ".join(problems) if problems else ""
+        print(f"{name:<16}{result.throughput:>12.1f}{result.p50_ms:>10.1f}{result.p99_ms:>10.1f}{result.errors:>8}{marker}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "url": base_url, "requests": args.requests, "concurrency": args.concurrency,
+                "seed": args.seed, "scenarios": results,
+            }, f, indent=2)
+        print(f"Baseline gespeichert: {args.save_baseline}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
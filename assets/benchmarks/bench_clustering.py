@@ -0,0 +1,71 @@
+# bench_clustering.py
+#
+# Misst den Durchsatz (Artikel/s) des Story-Clusterings aus story_clustering.py:
+# MinHash-Signaturen und Zuordnung über den LSH-Index, ohne Datenbank.
+# Die Titel sind leicht abgewandelte Varianten einer festen Anzahl von Meldungen.
+# Aufruf aus assets/: python -m benchmarks.bench_clustering [--articles N] [--stories N]
+
+import argparse
+import random
+import time
+
+from story_clustering import LshIndex, minhash
+
+SUBJECTS = ["Bundesregierung", "EU-Kommission", "Fed", "Börse Tokio", "WHO", "Nationalteam",
+            "Autobauer", "Zentralbank", "Parlament", "Wetterdienst", "Ölpreis", "Streikende"]
+VERBS = ["beschließt", "warnt vor", "kündigt an", "meldet", "stoppt", "erwartet", "prüft", "senkt"]
+OBJECTS = ["neue Zölle", "Rekordhitze", "Zinswende", "Milliardenpaket", "Grenzkontrollen",
+           "Impfkampagne", "Kurssturz", "Stellenabbau", "Wahlreform", "Hilfsfonds"]
+PUBLISHERS = ["Der Spiegel", "tagesschau.de", "Reuters", "BBC News", "Le Monde", "El País", "NHK"]
+EXTRAS = ["", "", " – live", " (Update)", ": Was bekannt ist", " – Bericht", " nach Treffen"]
+
+SYLLABLES = ["ka", "ro", "mi", "tan", "sel", "vo", "gu", "ber", "lin", "ath", "pe", "dor", "ux", "shi", "na"]
+
+def pseudo_word(rng: random.Random) -> str:
+    # Eigennamen, damit sich verschiedene Meldungen nicht nur in einer Zahl unterscheiden
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 4))).capitalize()
+
+def build_titles(article_count: int, story_count: int, seed: int = 7):
+    rng = random.Random(seed)
+    stories = [
+        f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} in {pseudo_word(rng)} und {pseudo_word(rng)}"
+        for _ in range(story_count)
+    ]
+    titles = []
+    for index in range(article_count):
+        story = rng.randrange(story_count)
+        publisher = rng.choice(PUBLISHERS)
+        titles.append((index + 1, story, f"{stories[story]}{rng.choice(EXTRAS)} - {publisher}", publisher))
+    return titles
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark des MinHash/LSH-Story-Clusterings")
+    arg_parser.add_argument("--articles", type=int, default=50_000)
+    arg_parser.add_argument("--stories", type=int, default=5_000)
+    arg_parser.add_argument("--max-entries", type=int, default=200_000)
+    args = arg_parser.parse_args()
+
+    titles = build_titles(args.articles, args.stories)
+
+    started = time.perf_counter()
+    signatures = [minhash(title, publisher) for _, _, title, publisher in titles]
+    minhash_seconds = time.perf_counter() - started
+
+    index = LshIndex(args.max_entries)
+    clusters_by_story = {}
+    started = time.perf_counter()
+    for (article_id, story, _, _), signature in zip(titles, signatures):
+        cluster_id, _ = index.assign(article_id, signature)
+        clusters_by_story.setdefault(story, set()).add(cluster_id)
+    assign_seconds = time.perf_counter() - started
+
+    cluster_count = len({cluster for clusters in clusters_by_story.values() for cluster in clusters})
+    split_stories = sum(1 for clusters in clusters_by_story.values() if len(clusters) > 1)
+    total = minhash_seconds + assign_seconds
+    print(f"{'MinHash':>12}: {args.articles / minhash_seconds:>10,.0f} Artikel/s")
+    print(f"{'LSH-Zuordnung':>12}: {args.articles / assign_seconds:>10,.0f} Artikel/s")
+    print(f"{'gesamt':>12}: {args.articles / total:>10,.0f} Artikel/s")
+    print(f"{len(clusters_by_story)} Meldungen -> {cluster_count} Cluster, {split_stories} Meldungen auf mehrere Cluster verteilt")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# bench_date_parsing.py
+#
+# Misst den Durchsatz (Items/s) der Datumspfade aus date_parsing.py.
+# Aufruf aus assets/: python -m benchmarks.bench_date_parsing [--items N]
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import date_parsing
+
+def sample_dates(item_count: int, distinct: int):
+    start = datetime(2024, 10, 2, 14, 0, tzinfo=timezone.utc)
+    values = [(start - timedelta(minutes=7 * i)).strftime("%a, %d %b %Y %H:%M:%S GMT") for i in range(distinct)]
+    return [values[i % distinct] for i in range(item_count)]
+
+def throughput(parse, dates) -> float:
+    started = time.perf_counter()
+    for value in dates:
+        parse(value)
+    return len(dates) / (time.perf_counter() - started)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark des pubDate-Parsings")
+    arg_parser.add_argument("--items", type=int, default=100_000)
+    arg_parser.add_argument("--distinct", type=int, default=2_000,
+                            help="Anzahl unterschiedlicher Zeitstempel im Datensatz")
+    args = arg_parser.parse_args()
+
+    dates = sample_dates(args.items, args.distinct)
+    paths = [
+        ("rfc822", date_parsing.parse_rfc822),
+        ("cached", date_parsing.parse_pub_date),
+    ]
+    try:
+        import dateutil  # noqa: F401
+        paths.append(("dateutil", date_parsing.parse_generic))
+    except ImportError:
+        print("dateutil nicht installiert, Fallback-Pfad wird übersprungen")
+
+    date_parsing.parse_pub_date.cache_clear()
+    for name, parse in paths:
+        print(f"{name:>10}: {throughput(parse, dates):>12,.0f} items/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_feed_parsing.py
+#
+# Vergleicht ET.fromstring mit dem Streaming-Parser aus feed_parser.py.
+# Aufruf aus assets/: python -m benchmarks.bench_feed_parsing [--items N ...]
+
+import argparse
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from feed_parser import CHUNK_SIZE, iter_feed_items
+
+def build_feed(item_count: int) -> bytes:
+    items = "".join(
+        f"<item><title>Schlagzeile {i} - Beispielzeitung</title>"
+        f"<link>https://news.google.com/rss/articles/{i:012d}?oc=5</link>"
+        f"<guid isPermaLink=\"false\">{i:012d}</guid>"
+        f"<pubDate>Wed, 02 Oct 2024 14:{i % 60:02d}:00 GMT</pubDate>"
+        f"<description>&lt;a href=\"https://example.org/{i}\"&gt;Schlagzeile {i}&lt;/a&gt;</description>"
+        f"<source url=\"https://example.org\">Beispielzeitung {i % 500}</source></item>"
+        for i in range(item_count)
+    )
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel>"
+        "<title>Synthetic</title><language>de</language>"
+        f"{items}</channel></rss>"
+    ).encode("utf-8")
+
+def chunked(document: bytes):
+    for start in range(0, len(document), CHUNK_SIZE):
+        yield document[start:start + CHUNK_SIZE]
+
+def tree_items(document: bytes):
+    # Bisheriges Verfahren: gesamten Body puffern und vollständigen Baum aufbauen
+    yield from ET.fromstring(b"".join(chunked(document))).findall(".//item")
+
+def streaming_items(document: bytes):
+    yield from iter_feed_items(chunked(document))
+
+def measure(parse, document: bytes, stop_after: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_item = None
+    count = 0
+    for item in parse(document):
+        item.findtext("link")
+        if first_item is None:
+            first_item = time.perf_counter() - started
+        count += 1
+        if count >= stop_after:
+            break
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_item or 0.0, total, peak, count
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark des Feed-Parsings")
+    arg_parser.add_argument("--items", type=int, nargs="+", default=[100, 10_000, 100_000])
+    arg_parser.add_argument("--stop-after", type=int, default=20,
+                            help="Abbruch nach N Items (simuliert den Dedup-Abbruch)")
+    args = arg_parser.parse_args()
+
+    print(f"{'items':>8} {'parser':>10} {'mode':>6} {'first item ms':>14} {'total ms':>10} {'peak KiB':>10}")
+    for item_count in args.items:
+        document = build_feed(item_count)
+        for name, parse in (("fromstring", tree_items), ("streaming", streaming_items)):
+            for mode, stop_after in (("full", item_count), ("early", args.stop_after)):
+                first_item, total, peak, _ = measure(parse, document, stop_after)
+                print(f"{item_count:>8} {name:>10} {mode:>6} {first_item * 1000:>14.2f} "
+                      f"{total * 1000:>10.2f} {peak / 1024:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_logging.py
+#
+# Misst den Durchsatz der Item-Schleife von process_feed (Parsing, Datum, Logging pro Artikel)
+# mit unterschiedlichen Logging-Varianten. Die DB-Zugriffe sind nicht Teil der Messung.
+# Aufruf aus assets/: python -m benchmarks.bench_logging [--items N]
+
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from benchmarks.bench_feed_parsing import build_feed, chunked
+from date_parsing import parse_pub_date
+from feed_parser import iter_feed_items
+from logging_config import TEXT_FORMAT, JsonFormatter, log_sampled
+
+logger = logging.getLogger("bench_ingest")
+
+def ingest(document: bytes, log_item) -> int:
+    count = 0
+    for item in iter_feed_items(chunked(document)):
+        parse_pub_date(item.findtext("pubDate"))
+        title = item.findtext("title")
+        log_item(title)
+        count += 1
+    return count
+
+def log_eager(title):
+    # Bisheriges Muster: f-String auf INFO pro Artikel
+    logger.info(f"Artikel bereits vorhanden: {title}")
+
+def log_lazy_debug(title):
+    logger.debug("Artikel bereits vorhanden: %s", title)
+
+def log_sampled_info(title):
+    log_sampled(logger, logging.INFO, "Artikel bereits vorhanden: %s", title)
+
+def no_logging(title):
+    pass
+
+def configure(handler, level):
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark des Logging-Overheads bei der Ingestion")
+    arg_parser.add_argument("--items", type=int, default=50_000)
+    args = arg_parser.parse_args()
+
+    document = build_feed(args.items)
+    devnull = open(os.devnull, "w")
+
+    def text_handler():
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        return handler
+
+    def json_handler():
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(JsonFormatter())
+        return handler
+
+    scenarios = [
+        ("ohne Logging", no_logging, text_handler, logging.INFO),
+        ("eager INFO (text)", log_eager, text_handler, logging.INFO),
+        ("eager INFO (json)", log_eager, json_handler, logging.INFO),
+        ("lazy DEBUG, Level INFO", log_lazy_debug, text_handler, logging.INFO),
+        ("sampled INFO (text)", log_sampled_info, text_handler, logging.INFO),
+    ]
+
+    for name, log_item, make_handler, level in scenarios:
+        configure(make_handler(), level)
+        parse_pub_date.cache_clear()
+        started = time.perf_counter()
+        count = ingest(document, log_item)
+        print(f"{name:>28}: {count / (time.perf_counter() - started):>10,.0f} items/s")
+
+    # Async: Aufrufer übergibt nur an die Queue, der Listener formatiert und schreibt
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, text_handler())
+    listener.start()
+    configure(logging.handlers.QueueHandler(log_queue), logging.INFO)
+    parse_pub_date.cache_clear()
+    started = time.perf_counter()
+    count = ingest(document, log_eager)
+    elapsed = time.perf_counter() - started
+    listener.stop()
+    print(f"{'eager INFO (async queue)':>28}: {count / elapsed:>10,.0f} items/s")
+
+    devnull.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# bench_recent_index.py
+#
+# Antwortzeiten (p50/p99) typischer /news-Abfragen aus dem Recent-Index (recent_index.py).
+# Ohne --sql auf einem synthetischen Fenster im Speicher, ohne Datenbank; mit --sql wird das
+# Fenster aus der Datenbank geladen (z. B. Datensatz aus benchmarks/synthetic_data.py) und
+# jede Abfrage zusätzlich über die vorbereiteten Statements news_count/news_page gemessen.
+# Dabei werden die Artikel-IDs beider Wege verglichen.
+# Aufruf aus assets/:
+#   python -m benchmarks.bench_recent_index [--articles 200000] [--queries 2000]
+#   python -m benchmarks.bench_recent_index --sql [--window-hours 24]
+
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from article_queries import ArticleFilter, build_article_filters
+from recent_index import RecentArticle, RecentIndex
+
+class Fixture(NamedTuple):
+    topic_ids: List[int]
+    country_codes: List[str]
+    publisher_ids: List[int]
+    boundary: datetime
+
+# Szenario: Name -> Funktion (rng, fixture) -> (Filter für build_article_filters, Seite)
+SCENARIOS: Dict[str, Callable[[random.Random, Fixture], tuple]] = {
+    "default": lambda rng, f: ({}, 1),
+    "topic": lambda rng, f: ({"topics": [rng.choice(f.topic_ids)]}, 1),
+    "country": lambda rng, f: ({"country": rng.choice(f.country_codes)}, 1),
+    "topic_country": lambda rng, f: ({"topics": [rng.choice(f.topic_ids)], "country": rng.choice(f.country_codes)}, 1),
+    "publishers": lambda rng, f: ({"publishers": rng.sample(f.publisher_ids, 3)}, 1),
+    "last_hours": lambda rng, f: ({"date_from": datetime.now(timezone.utc) - timedelta(hours=rng.randrange(1, 12))}, 1),
+    "page_5": lambda rng, f: ({"topics": [rng.choice(f.topic_ids)]}, 5),
+}
+PAGE_SIZE = 200
+
+class SyntheticCache:
+    """Nur was build_article_filters braucht: Themen -> Feeds und ISO-Code -> Länder-ID."""
+
+    def __init__(self, topic_feeds: Dict[int, List[int]], country_ids: Dict[str, int]):
+        self.topic_feeds = topic_feeds
+        self.country_ids = country_ids
+
+    def feed_ids_for_topics(self, topic_ids: List[int]) -> List[int]:
+        return [feed_id for topic_id in topic_ids for feed_id in self.topic_feeds.get(topic_id, ())]
+
+    def country_id(self, iso_code: str) -> Optional[int]:
+        return self.country_ids.get(iso_code.upper())
+
+class WindowOnlyIndex(RecentIndex):
+    # Im synthetischen Datensatz gibt es keine Artikel vor dem Fenster
+    def _older_count(self, conn, filters, boundary):
+        return 0
+
+def synthetic_index(article_count: int, window_hours: float, seed: int):
+    rng = random.Random(seed)
+    countries = [f"C{index}" for index in range(12)]
+    topic_ids = list(range(1, 9))
+    # Ein Feed je Thema und Land, 40 Publisher je Land
+    feeds = {(topic_id, country): index for index, (topic_id, country) in
+             enumerate(((t, c) for t in topic_ids for c in range(1, len(countries) + 1)), start=1)}
+    # Länder-IDs ab 1; build_article_filters behandelt die ID 0 wie ein unbekanntes Land
+    publishers = [(publisher_id, publisher_id % len(countries) + 1) for publisher_id in range(1, 40 * len(countries) + 1)]
+    now = datetime.now(timezone.utc)
+    boundary = now - timedelta(hours=window_hours)
+    records = []
+    for article_id in range(1, article_count + 1):
+        publisher_id, country = rng.choice(publishers)
+        article_topics = rng.sample(topic_ids, rng.choice((1, 1, 1, 2)))
+        feed_ids = [feeds[(topic_id, country)] for topic_id in article_topics]
+        records.append(RecentArticle({
+            "id": article_id, "title": f"Artikel {article_id}", "link": f"https://example.org/{article_id}",
+            "pub_date": boundary + timedelta(seconds=rng.random() * window_hours * 3600),
+            "publisher_id": publisher_id, "feed_id": feed_ids[0], "story_cluster_id": None, "feed_ids": feed_ids,
+        }, country))
+    cache = SyntheticCache(
+        {topic_id: [feeds[(topic_id, c)] for c in range(1, len(countries) + 1)] for topic_id in topic_ids},
+        {code: index for index, code in enumerate(countries, start=1)},
+    )
+    index = WindowOnlyIndex(cache, window_hours)
+    started = time.perf_counter()
+    index.replace(records, boundary)
+    print(f"Fenster aufgebaut: {article_count:,} Artikel in {time.perf_counter() - started:.2f} s")
+    return index, cache, Fixture(topic_ids, countries, [p for p, _ in publishers], boundary)
+
+def database_index(window_hours: float):
+    from db_connection import get_connection
+    from dimension_cache import dimension_cache
+
+    conn = get_connection()
+    dimension_cache.ensure_fresh(force=True)
+    index = RecentIndex(dimension_cache, window_hours)
+    started = time.perf_counter()
+    index.reload(conn)
+    print(f"Fenster geladen in {time.perf_counter() - started:.2f} s")
+    fixture = Fixture(
+        topic_ids=sorted(dimension_cache.topics),
+        country_codes=sorted({dimension_cache.country_iso_for_publisher(p) for p in dimension_cache.publishers} - {None}),
+        publisher_ids=sorted(dimension_cache.publishers),
+        boundary=index._state.snapshot.boundary,
+    )
+    return index, dimension_cache, fixture, conn
+
+def sql_page(conn, article_filter: ArticleFilter, offset: int) -> List[int]:
+    from psycopg2.extras import RealDictCursor
+    from article_queries import execute_prepared, news_count_template, news_page_template
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        execute_prepared(cursor, news_count_template(article_filter.mask), article_filter.values)
+        cursor.fetchone()
+        execute_prepared(cursor, news_page_template(article_filter.mask), article_filter.values + (offset, PAGE_SIZE))
+        rows = cursor.fetchall()
+    conn.rollback()
+    return [row["id"] for row in rows]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest-Rank-Verfahren wie in bench_api.py
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Recent-Index gegen SQL für /news")
+    arg_parser.add_argument("--sql", action="store_true", help="Fenster aus der Datenbank laden und mit SQL vergleichen")
+    arg_parser.add_argument("--articles", type=int, default=200_000, help="Artikel im synthetischen Fenster")
+    arg_parser.add_argument("--window-hours", type=float, default=24.0)
+    arg_parser.add_argument("--queries", type=int, default=2000, help="Abfragen je Szenario")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    conn = None
+    if args.sql:
+        index, cache, fixture, conn = database_index(args.window_hours)
+    else:
+        index, cache, fixture = synthetic_index(args.articles, args.window_hours, args.seed)
+    index.ensure_started = lambda: None  # Kein Hintergrund-Thread während der Messung
+
+    header = f"{'Szenario':<16}{'Index p50 ms':>14}{'p99 ms':>10}{'Treffer':>9}"
+    if args.sql:
+        header += f"{'SQL p50 ms':>12}{'p99 ms':>10}{'Abweichungen':>14}"
+    print(header)
+    for name, build in SCENARIOS.items():
+        rng = random.Random(f"{args.seed}:{name}")
+        index_times, sql_times = [], []
+        hits = mismatches = 0
+        for _ in range(args.queries if not args.sql else max(1, args.queries // 10)):
+            filters, page = build(rng, fixture)
+            article_filter = build_article_filters(cache, **filters)
+            offset = (page - 1) * PAGE_SIZE
+            started = time.perf_counter()
+            result = index.query(conn, article_filter, offset, PAGE_SIZE)
+            index_times.append((time.perf_counter() - started) * 1000)
+            hits += result is not None
+            if args.sql:
+                started = time.perf_counter()
+                ids = sql_page(conn, article_filter, offset)
+                sql_times.append((time.perf_counter() - started) * 1000)
+                # Gleiche pub_date können in beliebiger Reihenfolge stehen; verglichen wird die Menge
+                if result is not None and set(ids) != {row["id"] for row in result[1]}:
+                    mismatches += 1
+        index_times.sort()
+        line = f"{name:<16}{percentile(index_times, 0.5):>14.3f}{percentile(index_times, 0.99):>10.3f}{hits:>9}"
+        if args.sql:
+            sql_times.sort()
+            line += f"{percentile(sql_times, 0.5):>12.3f}{percentile(sql_times, 0.99):>10.3f}{mismatches:>14}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
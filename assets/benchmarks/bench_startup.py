@@ -0,0 +1,90 @@
+# bench_startup.py
+#
+# Startzeit der Batch-Befehle (googlenewsmap.py). Jeder Fall läuft --repeat-mal in einem
+# frischen Interpreter; "<befehl> --help" importiert das Befehlsmodul samt Abhängigkeiten,
+# öffnet aber keine Verbindung. "python -c pass" ist die Untergrenze des Interpreters.
+# Mit --imports werden die teuersten Importe eines Befehls aus python -X importtime gezeigt.
+# Aufruf aus assets/:
+#   python -m benchmarks.bench_startup [--repeat 10]
+#   python -m benchmarks.bench_startup --imports ingest [--top 15]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from googlenewsmap import COMMANDS
+
+ASSETS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def cases() -> List[Tuple[str, List[str]]]:
+    return [
+        ("interpreter", ["-c", "pass"]),
+        ("googlenewsmap", ["-m", "googlenewsmap", "--help"]),
+    ] + [(command, ["-m", "googlenewsmap", command, "--help"]) for command in COMMANDS]
+
+def run_once(args: List[str]) -> Tuple[float, Optional[str]]:
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=ASSETS_DIR, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        # Meist ein fehlendes Paket; die letzte Zeile nennt es
+        lines = result.stderr.strip().splitlines()
+        return elapsed, lines[-1] if lines else f"Exit-Code {result.returncode}"
+    return elapsed, None
+
+def measure(repeat: int):
+    print(f"{'Fall':<20}{'min ms':>10}{'Median ms':>12}{'max ms':>10}")
+    for name, args in cases():
+        times = []
+        error = None
+        for _ in range(repeat):
+            elapsed, error = run_once(args)
+            if error:
+                break
+            times.append(elapsed)
+        if error:
+            print(f"{name:<20}  fehlgeschlagen: {error}")
+            continue
+        print(f"{name:<20}{min(times):>10.1f}{statistics.median(times):>12.1f}{max(times):>10.1f}")
+
+def import_times(command: str, top: int):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "googlenewsmap", command, "--help"],
+        cwd=ASSETS_DIR, capture_output=True, text=True,
+    )
+    # Format: "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, package = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(package) - len(package.lstrip()) - 1) // 2
+        # Nur direkte Importe und deren unmittelbare Abhängigkeiten
+        if depth <= 1:
+            entries.append((int(cumulative_us), int(self_us), depth, package.strip()))
+    if result.returncode != 0:
+        print(f"Befehl fehlgeschlagen: {result.stderr.strip().splitlines()[-1]}")
+    print(f"{'kumuliert ms':>13}{'selbst ms':>11}  Modul")
+    for cumulative_us, self_us, depth, package in sorted(entries, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>13.1f}{self_us / 1000:>11.1f}  {'  ' * depth}{package}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Startzeit der Batch-Befehle")
+    arg_parser.add_argument("--repeat", type=int, default=10, help="Läufe je Fall")
+    arg_parser.add_argument("--imports", choices=sorted(COMMANDS), help="Importzeiten eines Befehls ausgeben")
+    arg_parser.add_argument("--top", type=int, default=15, help="Anzahl Module für --imports")
+    args = arg_parser.parse_args()
+
+    if args.imports:
+        import_times(args.imports, args.top)
+    else:
+        measure(args.repeat)
+
+if __name__ == "__main__":
+    main()
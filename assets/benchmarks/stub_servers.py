@@ -0,0 +1,155 @@
+# stub_servers.py
+#
+# Lokaler Ersatz für Google News RSS und Nominatim, damit parse_feeds.py, add_feed.py und
+# geocode_publishers.py ohne Internet und reproduzierbar laufen. Die Daten stammen aus
+# derselben SyntheticWorld wie benchmarks/synthetic_data.py (gleicher Seed, gleiche Länderzahl).
+#
+#   GET /rss/topics/<CODE>?hl=..&gl=..&ceid=..  RSS-Feed; alle --interval Sekunden erscheinen
+#                                               --per-slot neue Artikel, --slots Zeitscheiben
+#   GET /search?q=<Name>&countrycodes=..        Nominatim-Antwort (JSON), ein Treffer oder []
+#
+# Aufruf aus assets/: python -m benchmarks.stub_servers [--port 8765] [--seed 1] [--latency-ms 50]
+# Danach z. B.: NOMINATIM_URL=http://127.0.0.1:8765/search GEOCODE_RATE_LIMIT_DELAY=0 python geocode_publishers.py
+#               NEWS_RSS_BASE_URL=http://127.0.0.1:8765/rss python add_feed.py WORLD Welt
+
+import argparse
+import csv
+import json
+import random
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+from benchmarks.synthetic_data import COUNTRY_CSV, SyntheticWorld, article, language_for, location_for, pseudo_word
+
+# Anteil der Nominatim-Anfragen ohne Treffer, damit auch der Retry-Pfad läuft
+NOT_FOUND_SHARE = 0.05
+
+def _rng(*parts) -> random.Random:
+    return random.Random(zlib.crc32("|".join(str(part) for part in parts).encode("utf-8")))
+
+class StubData:
+    def __init__(self, world: SyntheticWorld, interval: float, per_slot: int, slots: int):
+        self.world = world
+        self.interval = interval
+        self.per_slot = per_slot
+        self.slots = slots
+        with open(COUNTRY_CSV, encoding="utf-8-sig") as f:
+            self.country_names = {row[1].strip().upper(): row[0].strip() for row in csv.reader(f, delimiter=";") if len(row) == 2}
+        self.publishers = {publisher.name: publisher for publisher in world.publishers}
+
+    def feed(self, topic_code: str, query: dict) -> bytes:
+        gl = (query.get("gl") or ["US"])[0].upper()
+        hl = (query.get("hl") or [language_for(gl)])[0]
+        ceid = (query.get("ceid") or [f"{gl}:{hl}"])[0]
+        # Länder ohne eigene Publisher bekommen Artikel aus dem ersten Land des Datensatzes
+        iso_code = gl if gl in self.world.publishers_by_country else self.world.feed_countries[0]
+        current_slot = int(time.time() // self.interval)
+
+        items = []
+        # Neueste zuerst wie bei Google News; parse_feeds bricht nach bekannten Artikeln ab
+        for slot in range(current_slot, current_slot - self.slots, -1):
+            rng = _rng(self.world.seed, topic_code, gl, slot)
+            slot_start = datetime.fromtimestamp(slot * self.interval, timezone.utc)
+            for index in range(self.per_slot):
+                pub_date = slot_start + timedelta(seconds=self.interval * (self.per_slot - index) / (self.per_slot + 1))
+                sequence = zlib.crc32(f"{topic_code}|{gl}|{slot}|{index}".encode("utf-8"))
+                title, link, publisher = article(rng, self.world, iso_code, sequence, pub_date)
+                items.append(
+                    f"<item><title>{escape(title)}</title><link>{escape(link)}</link>"
+                    f"<guid isPermaLink=\"false\">{sequence:x}</guid>"
+                    f"<pubDate>{format_datetime(pub_date, usegmt=True)}</pubDate>"
+                    f"<description>{escape(title)}</description>"
+                    f"<source url=\"https://{publisher.domain}\">{escape(publisher.name)}</source></item>"
+                )
+        link = f"https://news.google.com/topics/{topic_code}?hl={hl}&amp;gl={gl}&amp;ceid={escape(ceid)}"
+        return (
+            "<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel>"
+            f"<title>{escape(topic_code)} - {escape(self.country_names.get(gl, gl))}</title>"
+            f"<link>{link}</link><language>{escape(hl)}</language>"
+            f"<lastBuildDate>{format_datetime(datetime.now(timezone.utc), usegmt=True)}</lastBuildDate>"
+            f"{''.join(items)}</channel></rss>"
+        ).encode("utf-8")
+
+    def geocode(self, query: dict) -> bytes:
+        name = (query.get("q") or [""])[0]
+        iso_code = (query.get("countrycodes") or [""])[0].upper()
+        rng = _rng(self.world.seed, "geocode", name)
+        if not name or rng.random() < NOT_FOUND_SHARE:
+            return b"[]"
+        publisher = self.publishers.get(name)
+        if publisher and publisher.latitude is not None:
+            latitude, longitude, city = publisher.latitude, publisher.longitude, publisher.city
+        else:
+            latitude, longitude = location_for(rng, iso_code)
+            city = pseudo_word(rng, language_for(iso_code))
+        return json.dumps([{
+            "lat": str(latitude),
+            "lon": str(longitude),
+            "display_name": f"{city}, {self.country_names.get(iso_code, iso_code)}",
+            "address": {"city": city, "country": self.country_names.get(iso_code, iso_code), "country_code": iso_code.lower()},
+        }], ensure_ascii=False).encode("utf-8")
+
+def make_handler(data: StubData, latency: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if url.path.startswith("/rss/topics/"):
+                self._send(200, "application/rss+xml; charset=utf-8", data.feed(url.path.rsplit("/", 1)[-1], query))
+            elif url.path == "/search":
+                self._send(200, "application/json; charset=utf-8", data.geocode(query))
+            else:
+                self._send(404, "text/plain", b"not found")
+
+        def _send(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Kein Log je Anfrage; die Lastmessung soll nicht an der Konsole hängen
+            pass
+
+    return StubHandler
+
+def serve(host: str, port: int, data: StubData, latency: float = 0.0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(data, latency))
+    server.daemon_threads = True
+    return server
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Stub-Server für Google News RSS und Nominatim")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--countries", type=int, default=12)
+    arg_parser.add_argument("--publishers-per-country", type=int, default=40)
+    arg_parser.add_argument("--interval", type=float, default=60.0, help="Sekunden je Zeitscheibe mit neuen Artikeln")
+    arg_parser.add_argument("--per-slot", type=int, default=5, help="Neue Artikel je Feed und Zeitscheibe")
+    arg_parser.add_argument("--slots", type=int, default=20, help="Zeitscheiben im Feed")
+    arg_parser.add_argument("--latency-ms", type=float, default=0.0, help="Künstliche Antwortzeit")
+    args = arg_parser.parse_args()
+
+    world = SyntheticWorld(args.seed, args.countries, args.publishers_per_country)
+    server = serve(args.host, args.port, StubData(world, args.interval, args.per_slot, args.slots), args.latency_ms / 1000)
+    print(f"Stub-Server auf http://{args.host}:{args.port} (RSS: /rss/topics/<CODE>, Nominatim: /search)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
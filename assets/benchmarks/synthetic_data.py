@@ -0,0 +1,332 @@
+# synthetic_data.py
+#
+# Deterministischer Testdatensatz für Benchmarks: Länder, Themen, Feeds, Publisher mit
+# Koordinaten und beliebig viele Artikel mit mehrsprachigen Titeln im Google-News-Format.
+# Gleicher Seed -> gleiche Daten. Die Themen-Links zeigen auf den Stub-Server
+# (benchmarks/stub_servers.py), sodass parse_feeds.py und add_feed.py offline laufen.
+# Ein Teil der Publisher bleibt ohne Koordinaten und steht in der geocode_queue.
+#
+# Erwartet eine Datenbank mit allen Migrationen aus data/. Aufruf aus assets/:
+#   python -m benchmarks.synthetic_data --articles 2000000 [--seed 1] [--stub-url http://127.0.0.1:8765]
+
+import argparse
+import csv
+import io
+import logging
+import math
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from article_dedup import canonical_url, title_hash
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "country_iso_codes.csv")
+DEFAULT_STUB_URL = "http://127.0.0.1:8765"
+
+# Themen wie bei Google News: (Code im Feed-Link, Name)
+TOPICS = [
+    ("WORLD", "Welt"), ("NATION", "Inland"), ("BUSINESS", "Wirtschaft"), ("TECHNOLOGY", "Technik"),
+    ("ENTERTAINMENT", "Unterhaltung"), ("SPORTS", "Sport"), ("SCIENCE", "Wissenschaft"), ("HEALTH", "Gesundheit"),
+]
+
+# Ungefähre Landesmitte (Breite, Länge, Streuung in Grad); übrige Länder liegen verstreut
+CENTROIDS = {
+    "DE": (51.2, 10.4, 2.5), "US": (39.8, -98.6, 10.0), "GB": (53.5, -1.5, 2.0), "FR": (46.6, 2.4, 2.5),
+    "ES": (40.2, -3.7, 2.5), "IT": (42.8, 12.5, 2.5), "AT": (47.6, 14.1, 1.0), "CH": (46.8, 8.2, 0.7),
+    "NL": (52.2, 5.3, 0.7), "PL": (52.1, 19.4, 2.0), "BR": (-10.8, -52.9, 8.0), "MX": (23.6, -102.5, 5.0),
+    "AR": (-34.6, -64.0, 5.0), "JP": (36.2, 138.3, 3.0), "CN": (35.9, 104.2, 8.0), "IN": (21.1, 78.0, 6.0),
+    "RU": (56.0, 38.0, 6.0), "EG": (26.8, 30.8, 3.0), "SA": (23.9, 45.1, 4.0), "AE": (24.4, 54.4, 1.0),
+    "TR": (39.0, 35.2, 3.0), "AU": (-25.3, 133.8, 8.0), "CA": (50.0, -96.8, 8.0), "ZA": (-29.0, 24.0, 4.0),
+    "NG": (9.1, 8.7, 3.0), "KR": (36.5, 127.9, 1.0), "PT": (39.6, -8.0, 1.0),
+}
+# Länder mit Feeds in dieser Reihenfolge; DE und US zuerst wie in add_feed.py, dann
+# abwechselnd Sprachen und Schriften, damit auch kleine Datensätze mehrsprachig sind
+FEED_COUNTRIES = ["DE", "US", "FR", "JP", "BR", "EG", "RU", "CN", "ES", "IN", "IT", "GB",
+                  "MX", "SA", "AT", "KR", "PL", "TR", "AU", "CA", "NL", "CH", "AR", "ZA", "NG", "AE", "PT"]
+
+COUNTRY_LANGUAGES = {
+    "DE": "de", "AT": "de", "CH": "de", "FR": "fr", "ES": "es", "MX": "es", "AR": "es", "IT": "it",
+    "BR": "pt", "PT": "pt", "JP": "ja", "CN": "zh", "RU": "ru", "EG": "ar", "SA": "ar", "AE": "ar",
+}
+
+# Wortschatz je Sprache: Subjekte, Verben, Objekte (mit {n} für eine Zahl), Verbindung zum Ort
+VOCABULARY = {
+    "de": (["Bundesregierung", "Zentralbank", "Gewerkschaft", "Landtag", "Polizei", "Autobauer", "Wetterdienst"],
+           ["beschließt", "warnt vor", "kündigt an", "stoppt", "prüft", "meldet"],
+           ["{n} neue Stellen", "Zinswende", "Milliardenpaket", "Streik an {n} Standorten", "Hitzewelle", "Reform"],
+           "in"),
+    "en": (["Government", "Central bank", "Union", "Senate", "Police", "Carmaker", "Weather service"],
+           ["approves", "warns of", "announces", "halts", "reviews", "reports"],
+           ["{n} new jobs", "rate cut", "billion-dollar package", "strike at {n} sites", "heat wave", "reform"],
+           "in"),
+    "fr": (["Gouvernement", "Banque centrale", "Syndicat", "Sénat", "Police", "Constructeur", "Météo-France"],
+           ["adopte", "met en garde contre", "annonce", "suspend", "examine", "signale"],
+           ["{n} nouveaux emplois", "baisse des taux", "plan de milliards", "grève sur {n} sites", "canicule", "réforme"],
+           "à"),
+    "es": (["Gobierno", "Banco central", "Sindicato", "Senado", "Policía", "Fabricante", "Servicio meteorológico"],
+           ["aprueba", "advierte de", "anuncia", "detiene", "revisa", "informa"],
+           ["{n} nuevos empleos", "bajada de tipos", "paquete millonario", "huelga en {n} plantas", "ola de calor", "reforma"],
+           "en"),
+    "it": (["Governo", "Banca centrale", "Sindacato", "Senato", "Polizia", "Casa automobilistica", "Meteo"],
+           ["approva", "avverte su", "annuncia", "blocca", "esamina", "segnala"],
+           ["{n} nuovi posti", "taglio dei tassi", "pacchetto miliardario", "sciopero in {n} sedi", "ondata di caldo", "riforma"],
+           "a"),
+    "pt": (["Governo", "Banco central", "Sindicato", "Senado", "Polícia", "Montadora", "Meteorologia"],
+           ["aprova", "alerta para", "anuncia", "suspende", "analisa", "relata"],
+           ["{n} novos empregos", "corte de juros", "pacote bilionário", "greve em {n} fábricas", "onda de calor", "reforma"],
+           "em"),
+    "ja": (["政府", "日銀", "労働組合", "国会", "警察", "自動車大手", "気象庁"],
+           ["を決定", "に警戒", "を発表", "を停止", "を検討", "を報告"],
+           ["{n}人の新規雇用", "利下げ", "巨額の経済対策", "{n}か所でスト", "猛暑", "制度改革"],
+           "で"),
+    "zh": (["政府", "央行", "工会", "议会", "警方", "车企", "气象局"],
+           ["批准", "警告", "宣布", "暂停", "审查", "报告"],
+           ["{n}个新岗位", "降息", "千亿计划", "{n}地罢工", "热浪", "改革"],
+           "在"),
+    "ru": (["Правительство", "Центробанк", "Профсоюз", "Госдума", "Полиция", "Автопроизводитель", "Гидрометцентр"],
+           ["утверждает", "предупреждает о", "объявляет", "останавливает", "проверяет", "сообщает о"],
+           ["{n} новых рабочих мест", "снижение ставки", "пакет на миллиарды", "забастовка на {n} заводах", "жара", "реформа"],
+           "в"),
+    "ar": (["الحكومة", "البنك المركزي", "النقابة", "البرلمان", "الشرطة", "شركة السيارات", "الأرصاد"],
+           ["تقر", "تحذر من", "تعلن", "توقف", "تراجع", "تبلغ عن"],
+           ["{n} وظيفة جديدة", "خفض الفائدة", "حزمة بالمليارات", "إضراب في {n} مواقع", "موجة حر", "إصلاح"],
+           "في"),
+}
+SYLLABLES = {
+    "ja": ["か", "さ", "た", "な", "ま", "やま", "かわ", "しま"],
+    "zh": ["山", "河", "京", "海", "安", "州", "南", "北"],
+    "ru": ["мо", "ка", "ни", "ров", "град", "ск", "во", "ли"],
+    "ar": ["ال", "مد", "ين", "رة", "قا", "سل", "بر", "نا"],
+}
+LATIN_SYLLABLES = ["ka", "ro", "mi", "tan", "sel", "vo", "gu", "ber", "lin", "ath", "pe", "dor", "ux", "na"]
+PUBLISHER_SUFFIXES = ["Zeitung", "Post", "News", "Journal", "Tribune", "Courier", "Online", "Express", "Herald"]
+
+class Publisher(NamedTuple):
+    name: str
+    iso_code: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    city: Optional[str]
+    domain: str
+
+class SyntheticWorld:
+    """
+    Stammdaten des Datensatzes. Alles wird aus dem Seed abgeleitet, sodass Generator,
+    Stub-Server und Lastszenarien dieselben Publisher und Themen kennen.
+    """
+
+    def __init__(self, seed: int = 1, feed_countries: int = 12, publishers_per_country: int = 40,
+                 ungeocoded_share: float = 0.1):
+        self.seed = seed
+        self.topics = TOPICS
+        self.feed_countries = FEED_COUNTRIES[:feed_countries]
+        rng = random.Random(seed)
+        self.publishers: List[Publisher] = []
+        for iso_code in self.feed_countries:
+            language = language_for(iso_code)
+            for index in range(publishers_per_country):
+                word = pseudo_word(rng, language)
+                name = f"{word} {rng.choice(PUBLISHER_SUFFIXES)} {iso_code}{index}"
+                domain = f"{iso_code.lower()}{index}-{zlib.crc32(name.encode('utf-8')):08x}.example"
+                if rng.random() < ungeocoded_share:
+                    self.publishers.append(Publisher(name, iso_code, None, None, None, domain))
+                else:
+                    latitude, longitude = location_for(rng, iso_code)
+                    self.publishers.append(Publisher(name, iso_code, latitude, longitude, pseudo_word(rng, language), domain))
+        self.publishers_by_country: Dict[str, List[Publisher]] = {}
+        for publisher in self.publishers:
+            self.publishers_by_country.setdefault(publisher.iso_code, []).append(publisher)
+
+def language_for(iso_code: str) -> str:
+    return COUNTRY_LANGUAGES.get(iso_code, "en")
+
+def pseudo_word(rng: random.Random, language: str = "en") -> str:
+    syllables = SYLLABLES.get(language, LATIN_SYLLABLES)
+    return "".join(rng.choice(syllables) for _ in range(rng.randrange(2, 4))).capitalize()
+
+def location_for(rng: random.Random, iso_code: str) -> Tuple[float, float]:
+    latitude, longitude, spread = CENTROIDS.get(iso_code, (rng.uniform(-40, 60), rng.uniform(-120, 140), 5.0))
+    return (round(max(-80.0, min(80.0, rng.gauss(latitude, spread / 2))), 5),
+            round(((rng.gauss(longitude, spread / 2) + 180.0) % 360.0) - 180.0, 5))
+
+def headline(rng: random.Random, language: str) -> str:
+    subjects, verbs, objects, connector = VOCABULARY[language]
+    phrase = rng.choice(objects).format(n=rng.randrange(2, 5000))
+    if language in ("ja", "zh"):
+        return f"{rng.choice(subjects)}、{pseudo_word(rng, language)}{connector}{phrase}{rng.choice(verbs)}"
+    return f"{rng.choice(subjects)} {rng.choice(verbs)} {phrase} {connector} {pseudo_word(rng, language)}"
+
+def article(rng: random.Random, world: SyntheticWorld, iso_code: str, sequence: int,
+            pub_date: datetime) -> Tuple[str, str, Publisher]:
+    # (Titel, Link, Publisher) im Format der Google-News-Feeds: "Schlagzeile - Publisher"
+    publisher = rng.choice(world.publishers_by_country[iso_code])
+    language = language_for(iso_code)
+    title = f"{headline(rng, language)} - {publisher.name}"
+    link = f"https://{publisher.domain}/{language}/{pub_date:%Y/%m/%d}/{sequence:x}?utm_source=rss"
+    return title, link, publisher
+
+def pub_dates(rng: random.Random, count: int, days: int, now: datetime) -> Iterator[datetime]:
+    # Mehr Artikel in den letzten Tagen, wie bei einer laufenden Ingestion mit wachsendem Archiv
+    for _ in range(count):
+        age_days = days * (1.0 - math.sqrt(rng.random()))
+        yield now - timedelta(days=age_days)
+
+# --- Datenbank -----------------------------------------------------------------
+
+def _copy_rows(cursor, table: str, columns: str, rows: List[tuple]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def populate_dimensions(conn, world: SyntheticWorld, stub_url: str) -> Tuple[Dict[str, int], Dict[Tuple[int, str], int], Dict[str, int]]:
+    """
+    Legt Länder, Themen, Feeds und Publisher an (vorhandene Zeilen bleiben).
+    Gibt (iso_code -> country_id, (topic_id, iso_code) -> feed_id, Publisher-Name -> id) zurück.
+    """
+    from psycopg2.extras import execute_values
+
+    with conn.cursor() as cursor:
+        with open(COUNTRY_CSV, encoding="utf-8-sig") as f:
+            countries = [(row[0].strip(), row[1].strip().upper()) for row in csv.reader(f, delimiter=";") if len(row) == 2]
+        execute_values(cursor, "INSERT INTO countries (country_name, iso_code) VALUES %s ON CONFLICT (iso_code) DO NOTHING", countries)
+        cursor.execute("SELECT iso_code, id FROM countries")
+        country_ids = dict(cursor.fetchall())
+
+        topic_rows = [
+            (name, f"{stub_url}/rss/topics/{code}?hl={{hl}}&gl={{gl}}&ceid={{ceid}}")
+            for code, name in world.topics
+        ]
+        execute_values(cursor, "INSERT INTO topics (topic_name, link) VALUES %s ON CONFLICT (topic_name) DO NOTHING", topic_rows)
+        cursor.execute("SELECT topic_name, id FROM topics WHERE topic_name = ANY(%s)", ([name for _, name in world.topics],))
+        topic_ids = dict(cursor.fetchall())
+
+        feed_rows = []
+        for code, name in world.topics:
+            for iso_code in world.feed_countries:
+                language = language_for(iso_code)
+                query_params = f"hl={language}&gl={iso_code}&ceid={iso_code}:{language}"
+                feed_rows.append((f"{name} - {iso_code}", language, country_ids[iso_code], topic_ids[name], query_params))
+        execute_values(cursor, """
+            INSERT INTO feeds (title, language, country_id, topic_id, query_params)
+            VALUES %s
+            ON CONFLICT (topic_id, query_params) DO NOTHING
+        """, feed_rows)
+        cursor.execute("""
+            SELECT feeds.id, feeds.topic_id, countries.iso_code FROM feeds
+            JOIN countries ON countries.id = feeds.country_id
+            WHERE feeds.topic_id = ANY(%s)
+        """, (list(topic_ids.values()),))
+        feed_ids = {(topic_id, iso_code): feed_id for feed_id, topic_id, iso_code in cursor.fetchall()}
+
+        cursor.execute("SELECT name, id FROM publishers WHERE name = ANY(%s)", ([p.name for p in world.publishers],))
+        publisher_ids = dict(cursor.fetchall())
+        missing = [p for p in world.publishers if p.name not in publisher_ids]
+        if missing:
+            created = execute_values(cursor, """
+                INSERT INTO publishers (name, country_id, latitude, longitude, city)
+                VALUES %s
+                RETURNING id, name
+            """, [(p.name, country_ids[p.iso_code], p.latitude, p.longitude, p.city) for p in missing], fetch=True)
+            publisher_ids.update((name, publisher_id) for publisher_id, name in created)
+            ungeocoded = [(publisher_ids[p.name],) for p in missing if p.latitude is None]
+            if ungeocoded:
+                execute_values(cursor, "INSERT INTO geocode_queue (publisher_id) VALUES %s ON CONFLICT DO NOTHING", ungeocoded)
+    conn.commit()
+    return country_ids, feed_ids, publisher_ids
+
+def populate_articles(conn, world: SyntheticWorld, feed_ids: Dict[Tuple[int, str], int],
+                      publisher_ids: Dict[str, int], article_count: int, days: int = 30,
+                      batch_size: int = 50_000) -> int:
+    """
+    Schreibt article_count Artikel per COPY über eine Staging-Tabelle. Zufällige Dubletten
+    (gleicher Titel beim selben Publisher) werden wie bei der Ingestion übersprungen.
+    Gibt die Anzahl gespeicherter Artikel zurück.
+    """
+    rng = random.Random(world.seed * 1_000_003 + article_count)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    feeds = sorted(feed_ids.items())
+    inserted = 0
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS synthetic_articles (
+                title TEXT, link TEXT, canonical_url TEXT, title_hash BIGINT,
+                pub_date TIMESTAMP WITH TIME ZONE, publisher_id INTEGER, feed_id INTEGER
+            ) ON COMMIT DELETE ROWS
+        """)
+        dates = pub_dates(rng, article_count, days, now)
+        for start in range(0, article_count, batch_size):
+            started = time.perf_counter()
+            rows = []
+            for sequence in range(start, min(start + batch_size, article_count)):
+                (topic_id, iso_code), feed_id = rng.choice(feeds)
+                pub_date = next(dates)
+                title, link, publisher = article(rng, world, iso_code, sequence, pub_date)
+                rows.append((title, link, canonical_url(link), title_hash(title, publisher.name),
+                             pub_date.isoformat(), publisher_ids[publisher.name], feed_id))
+            _copy_rows(cursor, "synthetic_articles",
+                       "title, link, canonical_url, title_hash, pub_date, publisher_id, feed_id", rows)
+            cursor.execute("""
+                WITH inserted AS (
+                    INSERT INTO articles (title, link, canonical_url, title_hash, pub_date, publisher_id, feed_id)
+                    SELECT title, link, canonical_url, title_hash, pub_date, publisher_id, feed_id
+                    FROM synthetic_articles
+                    ON CONFLICT DO NOTHING
+                    RETURNING id, feed_id
+                )
+                INSERT INTO article_feeds (article_id, feed_id)
+                SELECT id, feed_id FROM inserted
+            """)
+            inserted += cursor.rowcount
+            conn.commit()
+            logger.info("%s/%s Artikel geschrieben (%.0f Artikel/s)", min(start + batch_size, article_count),
+                        article_count, len(rows) / (time.perf_counter() - started))
+    return inserted
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Synthetischen Datensatz in die Datenbank schreiben")
+    arg_parser.add_argument("--articles", type=int, default=1_000_000)
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--countries", type=int, default=12, help="Länder mit Feeds und Publishern")
+    arg_parser.add_argument("--publishers-per-country", type=int, default=40)
+    arg_parser.add_argument("--days", type=int, default=30, help="Zeitraum der Veröffentlichungsdaten")
+    arg_parser.add_argument("--stub-url", default=DEFAULT_STUB_URL, help="Basis-URL von benchmarks.stub_servers")
+    args = arg_parser.parse_args()
+
+    # Erst hier importiert, damit Stub-Server und Titelgenerator ohne Datenbanktreiber laufen
+    from db_connection import close_all_connections, get_connection, return_connection
+    from logging_config import setup_logging
+    from scripts.dedup_articles import rebuild_rollup
+
+    setup_logging()
+    world = SyntheticWorld(args.seed, args.countries, args.publishers_per_country)
+    conn = get_connection()
+    if conn is None:
+        logger.error("Keine Datenbankverbindung verfügbar")
+        return
+    try:
+        _, feed_ids, publisher_ids = populate_dimensions(conn, world, args.stub_url.rstrip("/"))
+        inserted = populate_articles(conn, world, feed_ids, publisher_ids, args.articles, args.days)
+        with conn.cursor() as cursor:
+            rebuild_rollup(cursor)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        conn.autocommit = False
+        logger.info("%s Feeds, %s Publisher, %s von %s Artikeln gespeichert",
+                    len(feed_ids), len(publisher_ids), inserted, args.articles)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+        close_all_connections()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+-- Feed-übergreifende Deduplizierung der Artikel (article_dedup.py, parse_feeds.py).
+-- Ein Artikel wird einmal gespeichert; in welchen Feeds (und damit Themen) er erschienen ist,
+-- steht in article_feeds. articles.feed_id bleibt der Feed, in dem er zuerst gefunden wurde.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS canonical_url TEXT;
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS title_hash BIGINT;
+
+-- Derselbe Artikel: gleiche kanonische URL oder gleicher normalisierter Titel beim selben Publisher
+CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_canonical_url ON articles(canonical_url);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_publisher_title_hash ON articles(publisher_id, title_hash);
+
+CREATE TABLE IF NOT EXISTS article_feeds (
+    article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+    feed_id INTEGER NOT NULL REFERENCES feeds(id),
+    PRIMARY KEY (article_id, feed_id)
+);
+
+-- Themenfilter der API und Duplikatprüfung je Feed
+CREATE INDEX IF NOT EXISTS idx_article_feeds_feed_id ON article_feeds(feed_id, article_id);
+
+-- Bestehende Artikel verknüpfen; anschließend scripts/dedup_articles.py ausführen,
+-- das canonical_url/title_hash befüllt und vorhandene Duplikate zusammenführt
+INSERT INTO article_feeds (article_id, feed_id)
+SELECT id, feed_id FROM articles
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,26 @@
+-- Tägliche Artikelzahlen je Land, Thema und Publisher (article_rollup.py).
+-- parse_feeds.py erhöht die Zähler in derselben Transaktion, in der es die Artikel einfügt;
+-- die Statistik-Endpoints der API lesen nur diese Tabelle.
+-- Artikel ohne Veröffentlichungsdatum oder ohne Land des Publishers werden nicht gezählt.
+CREATE TABLE IF NOT EXISTS article_daily_counts (
+    country_id INTEGER NOT NULL REFERENCES countries(id),
+    topic_id INTEGER NOT NULL REFERENCES topics(id),
+    publisher_id INTEGER NOT NULL REFERENCES publishers(id),
+    day DATE NOT NULL,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (country_id, topic_id, publisher_id, day)
+);
+
+-- Zeitraumabfragen ("letzte N Tage") beginnen beim Tag
+CREATE INDEX IF NOT EXISTS idx_article_daily_counts_day ON article_daily_counts(day, topic_id);
+
+-- Einmaliges Befüllen aus den vorhandenen Artikeln; vor dem ersten Lauf des neuen Ingesters ausführen
+INSERT INTO article_daily_counts (country_id, topic_id, publisher_id, day, article_count)
+SELECT publishers.country_id, feeds.topic_id, articles.publisher_id,
+       (articles.pub_date AT TIME ZONE 'UTC')::date, COUNT(*)
+FROM articles
+JOIN publishers ON articles.publisher_id = publishers.id
+JOIN feeds ON articles.feed_id = feeds.id
+WHERE articles.pub_date IS NOT NULL AND publishers.country_id IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,24 @@
+-- Änderungsfolge der Artikel für die Delta-Synchronisation der API (/api/v01/news/changes).
+-- Jede eingefügte oder inhaltlich geänderte Zeile erhält eine neue Nummer; Clients laden nur
+-- Zeilen oberhalb ihres Tokens. Standortänderungen der Publisher (geocode_publishers.py)
+-- laufen über publishers.row_version (data/db_dimension_versions.sql). Wird ein vorhandener
+-- Artikel mit einem weiteren Feed verknüpft (article_feeds), setzt parse_feeds.insert_articles
+-- die Nummer selbst neu, da sich nur seine Themen ändern.
+-- Hinweis: Das Hinzufügen der Spalte schreibt die Tabelle articles einmal neu.
+CREATE SEQUENCE IF NOT EXISTS article_change_seq;
+
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT nextval('article_change_seq');
+
+CREATE OR REPLACE FUNCTION bump_article_change_version() RETURNS trigger AS $$
+BEGIN
+    NEW.change_version := nextval('article_change_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_articles_change_version ON articles;
+CREATE TRIGGER trg_articles_change_version
+    BEFORE INSERT OR UPDATE OF title, link, pub_date, publisher_id, feed_id, story_cluster_id ON articles
+    FOR EACH ROW EXECUTE FUNCTION bump_article_change_version();
+
+CREATE INDEX IF NOT EXISTS idx_articles_change_version ON articles(change_version);
@@ -0,0 +1,42 @@
+-- Änderungsversionen der Dimensionstabellen für den Dimension-Cache der API (dimension_cache.py)
+-- Jede eingefügte oder geänderte Zeile erhält eine neue Nummer aus einer gemeinsamen Sequenz,
+-- sodass die API nur die seit dem letzten Abgleich geänderten Zeilen nachladen muss.
+CREATE SEQUENCE IF NOT EXISTS dimension_change_seq;
+
+ALTER TABLE topics ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT nextval('dimension_change_seq');
+ALTER TABLE countries ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT nextval('dimension_change_seq');
+ALTER TABLE publishers ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT nextval('dimension_change_seq');
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT nextval('dimension_change_seq');
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    NEW.row_version := nextval('dimension_change_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_topics_row_version ON topics;
+CREATE TRIGGER trg_topics_row_version
+    BEFORE INSERT OR UPDATE OF topic_name ON topics
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS trg_countries_row_version ON countries;
+CREATE TRIGGER trg_countries_row_version
+    BEFORE INSERT OR UPDATE OF country_name, iso_code ON countries
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+-- Nur inhaltliche Änderungen zählen, nicht z. B. Scheduler-Spalten der Feeds
+DROP TRIGGER IF EXISTS trg_publishers_row_version ON publishers;
+CREATE TRIGGER trg_publishers_row_version
+    BEFORE INSERT OR UPDATE OF name, latitude, longitude, city, country_id ON publishers
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS trg_feeds_row_version ON feeds;
+CREATE TRIGGER trg_feeds_row_version
+    BEFORE INSERT OR UPDATE OF topic_id, country_id ON feeds
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+CREATE INDEX IF NOT EXISTS idx_topics_row_version ON topics(row_version);
+CREATE INDEX IF NOT EXISTS idx_countries_row_version ON countries(row_version);
+CREATE INDEX IF NOT EXISTS idx_publishers_row_version ON publishers(row_version);
+CREATE INDEX IF NOT EXISTS idx_feeds_row_version ON feeds(row_version);
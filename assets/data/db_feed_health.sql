@@ -0,0 +1,15 @@
+-- Zustand je Feed für feed_health.py (Circuit Breaker und Bericht).
+-- failure_count (data/db_feed_schedule.sql) zählt die aufeinanderfolgenden Fehlschläge.
+-- Die Spalten lösen keinen row_version-Trigger aus (data/db_dimension_versions.sql).
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS total_fetches BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS total_failures BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS last_status TEXT;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS last_error TEXT;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS last_latency_ms INTEGER;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS avg_latency_ms DOUBLE PRECISION;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS last_checked_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS last_success_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS circuit_open_until TIMESTAMP WITH TIME ZONE;
+
+-- Nur wenige Feeds sind gesperrt
+CREATE INDEX IF NOT EXISTS idx_feeds_circuit_open_until ON feeds(circuit_open_until) WHERE circuit_open_until IS NOT NULL;
@@ -0,0 +1,6 @@
+-- Leases für die Verteilung der Feeds auf mehrere Ingestion-Worker (parse_feeds.py --workers N)
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+
+-- Index für die Suche nach freien Feeds
+CREATE INDEX IF NOT EXISTS idx_feeds_lease_until ON feeds(lease_until);
@@ -0,0 +1,8 @@
+-- Abrufplan je Feed für feed_scheduler.py
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS poll_interval INTEGER;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS next_poll_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS last_polled_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE feeds ADD COLUMN IF NOT EXISTS failure_count INTEGER NOT NULL DEFAULT 0;
+
+-- Index für das Laden der fälligen Feeds
+CREATE INDEX IF NOT EXISTS idx_feeds_next_poll_at ON feeds(next_poll_at);
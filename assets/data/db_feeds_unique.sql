@@ -0,0 +1,2 @@
+-- Eindeutigkeit der Feeds je Thema, Voraussetzung für INSERT ... ON CONFLICT in add_feed.py
+CREATE UNIQUE INDEX IF NOT EXISTS idx_feeds_topic_query_params ON feeds(topic_id, query_params);
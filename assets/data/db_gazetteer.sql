@@ -0,0 +1,13 @@
+-- Bekannte Standorte je Name und Land (scripts/load_reference_data.py, data/gazetteer.csv).
+-- geocode_publishers.py schaut hier nach, bevor es Nominatim fragt; so lassen sich
+-- bekannte Publisher ohne Netzwerk und ohne Rate-Limit verorten.
+CREATE TABLE IF NOT EXISTS gazetteer (
+    name TEXT NOT NULL,
+    country_id INTEGER NOT NULL REFERENCES countries(id),
+    latitude DOUBLE PRECISION NOT NULL CHECK (latitude BETWEEN -90 AND 90),
+    longitude DOUBLE PRECISION NOT NULL CHECK (longitude BETWEEN -180 AND 180),
+    city TEXT
+);
+
+-- Ein Eintrag je Name (ohne Groß-/Kleinschreibung) und Land; zugleich Ziel des Upserts
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gazetteer_name_country ON gazetteer (lower(name), country_id);
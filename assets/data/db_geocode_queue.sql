@@ -0,0 +1,11 @@
+-- Queue für noch nicht geokodierte Publisher
+-- Wird von parse_feeds.get_or_create_publisher befüllt und von geocode_publishers.py --worker abgearbeitet
+CREATE TABLE IF NOT EXISTS geocode_queue (
+    publisher_id INTEGER PRIMARY KEY REFERENCES publishers(id) ON DELETE CASCADE,
+    enqueued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    not_before TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+
+-- Index für die Abfrage des nächsten fälligen Eintrags
+CREATE INDEX IF NOT EXISTS idx_geocode_queue_due ON geocode_queue(not_before, enqueued_at);
@@ -0,0 +1,18 @@
+-- Story-Cluster für nahezu gleiche Schlagzeilen (story_clustering.py).
+-- story_cluster_id ist die ID des ersten Artikels des Clusters; NULL = noch nicht geclustert.
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS story_cluster_id INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_articles_story_cluster_id ON articles(story_cluster_id);
+-- Findet die noch nicht geclusterten Artikel ohne Scan der ganzen Tabelle
+CREATE INDEX IF NOT EXISTS idx_articles_unclustered ON articles(id) WHERE story_cluster_id IS NULL;
+
+-- MinHash-Signaturen der jüngsten Artikel, damit jeder Clustering-Lauf an den vorigen anschließt.
+-- Einträge außerhalb des Zeitfensters (CLUSTER_WINDOW_HOURS) werden nach jedem Lauf gelöscht.
+CREATE TABLE IF NOT EXISTS story_signatures (
+    article_id INTEGER PRIMARY KEY REFERENCES articles(id) ON DELETE CASCADE,
+    cluster_id INTEGER NOT NULL,
+    signature BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_story_signatures_created_at ON story_signatures(created_at);
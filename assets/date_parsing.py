@@ -0,0 +1,48 @@
+# date_parsing.py
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+# Viele Items eines Feeds (und mehrerer Feeds) tragen identische Zeitstempel
+CACHE_SIZE = 8192
+
+def to_utc(value: datetime) -> datetime:
+    # Zeitstempel ohne Zeitzone werden als UTC interpretiert
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def parse_rfc822(date_str: str) -> datetime:
+    """
+    Schneller Pfad für RFC-822-Datumsangaben, wie sie in RSS-pubDate üblich sind
+    (z. B. 'Wed, 02 Oct 2024 14:00:00 GMT'). Wirft ValueError bei anderen Formaten.
+    """
+    try:
+        return to_utc(parsedate_to_datetime(date_str))
+    except (TypeError, IndexError) as e:
+        raise ValueError(str(e)) from e
+
+def parse_generic(date_str: str) -> datetime:
+    # dateutil erst bei Bedarf importieren; der schnelle Pfad braucht es nicht
+    from dateutil import parser as date_parser
+
+    try:
+        return to_utc(date_parser.parse(date_str))
+    except OverflowError as e:
+        raise ValueError(str(e)) from e
+
+def parse_date_uncached(date_str: str) -> datetime:
+    try:
+        return parse_rfc822(date_str)
+    except ValueError:
+        return parse_generic(date_str)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_pub_date(date_str: str) -> datetime:
+    """
+    Parst eine Datumsangabe aus einem Feed in einen zeitzonenbewussten UTC-Zeitstempel.
+    Versucht zuerst RFC 822, dann dateutil; Ergebnisse werden gecacht.
+    Wirft ValueError, wenn keines der Verfahren die Angabe versteht.
+    """
+    return parse_date_uncached(date_str.strip())
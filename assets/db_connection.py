@@ -2,62 +2,344 @@
 
 import psycopg2
 from psycopg2 import pool
+import itertools
 import logging
-from logging_config import setup_logging
 from dotenv import load_dotenv
 import os
+import threading
+import time
+import weakref
+import metrics
 
 # Laden der Umgebungsvariablen
 load_dotenv()
 
-# Logging konfigurieren
-setup_logging()
 logger = logging.getLogger(__name__)
 
-try:
-    # Erstelle einen Connection Pool
-    db_pool = psycopg2.pool.SimpleConnectionPool(
-        1,  # Minimale Anzahl an Verbindungen
-        10,  # Maximale Anzahl an Verbindungen
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT", "5433"),
-        database=os.getenv("DB_NAME"),
-        options="-c search_path=google_news"
+# Verbindungsparameter (werden vom Pool und von eigenständigen Verbindungen genutzt)
+DB_PARAMS = {
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT", "5433"),
+    "database": os.getenv("DB_NAME"),
+    "options": "-c search_path=google_news",
+}
+
+# Standardgrößen je Prozessart; überschreibbar per DB_POOL_<ROLE>_MIN/_MAX/_TIMEOUT.
+# "read" gilt für jeden einzelnen Lese-Replica-Pool.
+POOL_DEFAULTS = {
+    "api": {"min": 2, "max": 20, "timeout": 5.0},
+    "batch": {"min": 1, "max": 5, "timeout": 30.0},
+    "read": {"min": 1, "max": 10, "timeout": 5.0},
+}
+
+# Lese-Replicas für die API, z. B. DB_REPLICA_HOSTS=replica1:5433,replica2:5433.
+# Ohne Angabe gehen alle Lesezugriffe an den Primary.
+REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+# Ausgefallene Replicas werden für diese Dauer übersprungen (Sekunden)
+REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+# Verbindungen, die länger ungenutzt waren, werden vor der Herausgabe geprüft
+HEALTH_CHECK_IDLE_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", "30"))
+
+# Metriken
+POOL_WAIT_SECONDS = metrics.Histogram('newsmap_db_pool_wait_seconds', 'Wartezeit beim Holen einer Verbindung aus dem Pool', ['pool'])
+POOL_IN_USE = metrics.Gauge('newsmap_db_pool_in_use', 'Ausgegebene Verbindungen des Pools', ['pool'])
+POOL_IDLE = metrics.Gauge('newsmap_db_pool_idle', 'Freie offene Verbindungen des Pools', ['pool'])
+POOL_TIMEOUTS = metrics.Counter('newsmap_db_pool_timeouts_total', 'Abgelaufene Wartezeiten auf eine Verbindung', ['pool'])
+POOL_HEALTH_CHECK_FAILURES = metrics.Counter('newsmap_db_pool_health_check_failures_total', 'Verworfene defekte Verbindungen', ['pool'])
+READ_ROUTES = metrics.Counter('newsmap_db_read_routes_total', 'Lesezugriffe je Ziel', ['target'])
+REPLICA_FAILURES = metrics.Counter('newsmap_db_replica_failures_total', 'Als ausgefallen markierte Replicas', ['replica'])
+
+class PoolTimeout(Exception):
+    """Innerhalb der Wartezeit wurde keine Verbindung frei."""
+
+class BlockingConnectionPool:
+    """
+    Thread-sicherer Pool, der bei Erschöpfung bis zu `timeout` Sekunden auf eine freie
+    Verbindung wartet, statt sofort fehlzuschlagen, und länger ungenutzte Verbindungen
+    vor der Herausgabe prüft.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, name="primary", **params):
+        self.name = name
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **params)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # Schwache Schlüssel: Verbindungen, die der psycopg2-Pool selbst schließt und
+        # freigibt, verschwinden auch hier
+        self._last_used = weakref.WeakKeyDictionary()
+        self._update_gauges()
+
+    def getconn(self, timeout=None):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout if timeout is None else timeout):
+            POOL_TIMEOUTS.inc(pool=self.name)
+            raise PoolTimeout(f"Keine freie Verbindung nach {time.perf_counter() - started:.1f}s")
+        try:
+            conn = self._pool.getconn()
+            # Nach einem Ausfall des Servers sind meist alle freien Verbindungen defekt; jede
+            # Ersatzverbindung wird ebenso geprüft, bis der Pool eine neue öffnet
+            discarded = 0
+            while not self._is_healthy(conn):
+                POOL_HEALTH_CHECK_FAILURES.inc(pool=self.name)
+                self._discard(conn)
+                discarded += 1
+                if discarded > self.maxconn:
+                    raise psycopg2.OperationalError(f"Keine funktionsfähige Verbindung nach {discarded} Versuchen")
+                conn = self._pool.getconn()
+        except BaseException:
+            self._slots.release()
+            raise
+        POOL_WAIT_SECONDS.observe(time.perf_counter() - started, pool=self.name)
+        self._update_gauges()
+        return conn
+
+    def putconn(self, conn, close=False):
+        try:
+            self._last_used[conn] = time.monotonic()
+            self._pool.putconn(conn, close=close or bool(conn.closed))
+        finally:
+            self._slots.release()
+            self._update_gauges()
+
+    def closeall(self):
+        self._pool.closeall()
+        self._last_used.clear()
+        self._update_gauges()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(conn)
+        if last_used is not None and time.monotonic() - last_used < HEALTH_CHECK_IDLE_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (Exception, psycopg2.DatabaseError) as error:
+            logger.warning("Defekte Verbindung verworfen: %s", error)
+            return False
+
+    def _discard(self, conn):
+        self._last_used.pop(conn, None)
+        try:
+            self._pool.putconn(conn, close=True)
+        except (Exception, psycopg2.DatabaseError) as error:
+            logger.debug("Fehler beim Verwerfen der Verbindung: %s", error)
+
+    def _update_gauges(self):
+        # Zugriff auf die internen Listen des psycopg2-Pools, nur für die Metriken
+        POOL_IN_USE.set(len(self._pool._used), pool=self.name)
+        POOL_IDLE.set(len(self._pool._pool), pool=self.name)
+
+def pool_settings(role):
+    defaults = POOL_DEFAULTS[role]
+    prefix = f"DB_POOL_{role.upper()}_"
+    return (
+        int(os.getenv(prefix + "MIN", defaults["min"])),
+        int(os.getenv(prefix + "MAX", defaults["max"])),
+        float(os.getenv(prefix + "TIMEOUT", defaults["timeout"])),
     )
-    if db_pool:
-        logger.debug("Connection Pool erfolgreich erstellt")
 
-except (Exception, psycopg2.DatabaseError) as error:
-    logger.error(f"Fehler beim Erstellen des Connection Pools: {error}")
-    db_pool = None
+class ReplicaRouter:
+    """
+    Verteilt Lesezugriffe reihum auf die Lese-Replicas. Ein Replica, das keine
+    Verbindung liefert, wird für REPLICA_RETRY_SECONDS übersprungen; sind alle
+    ausgefallen, liefert acquire() None und der Aufrufer weicht auf den Primary aus.
+    """
 
-def get_connection():
-    try:
+    def __init__(self, hosts, retry_seconds=REPLICA_RETRY_SECONDS):
+        self.hosts = list(hosts)
+        self.retry_seconds = retry_seconds
+        self._pools = {}
+        self._down_until = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        start = next(self._counter)
+        for offset in range(len(self.hosts)):
+            host = self.hosts[(start + offset) % len(self.hosts)]
+            if time.monotonic() < self._down_until.get(host, 0.0):
+                continue
+            try:
+                replica_pool = self._pool_for(host)
+                return replica_pool.getconn(), replica_pool
+            except PoolTimeout as error:
+                # Ausgelastet, aber erreichbar: nächstes Replica versuchen, ohne es zu sperren
+                logger.warning("Replica %s ausgelastet: %s", host, error)
+            except (Exception, psycopg2.DatabaseError) as error:
+                self.mark_down(host, error)
+        return None
+
+    def mark_down(self, host, error):
+        logger.warning("Replica %s für %.0fs deaktiviert: %s", host, self.retry_seconds, error)
+        REPLICA_FAILURES.inc(replica=host)
+        # Der Pool bleibt bestehen: ausgegebene Verbindungen laufen zu Ende, defekte freie
+        # Verbindungen verwirft die Gesundheitsprüfung beim nächsten Versuch
+        self._down_until[host] = time.monotonic() + self.retry_seconds
+
+    def _pool_for(self, host):
+        with self._lock:
+            replica_pool = self._pools.get(host)
+            if replica_pool is None:
+                name, _, port = host.partition(":")
+                params = dict(DB_PARAMS, host=name, port=port or DB_PARAMS["port"])
+                minconn, maxconn, timeout = pool_settings("read")
+                replica_pool = BlockingConnectionPool(minconn, maxconn, timeout, name=host, **params)
+                self._pools[host] = replica_pool
+                logger.debug("Replica-Pool für %s erstellt (%s-%s)", host, minconn, maxconn)
+            return replica_pool
+
+    def closeall(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for replica_pool in pools:
+            replica_pool.closeall()
+
+    def forget(self):
+        # Nach fork(): geerbte Pools nicht schließen (das träfe die Verbindungen des Elternprozesses)
+        self._pools = {}
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+db_pool = None
+_pool_role = os.getenv("DB_POOL_ROLE", "batch")
+_pool_lock = threading.Lock()
+
+replica_router = ReplicaRouter(REPLICA_HOSTS) if REPLICA_HOSTS else None
+# Herkunftspool ausgegebener Replica-Verbindungen; alle anderen gehören zu db_pool
+_replica_connections = {}
+
+def set_pool_role(role):
+    """Legt die Pool-Vorgaben fest, ohne schon Verbindungen zu öffnen (z. B. beim Import der API)."""
+    global _pool_role
+    with _pool_lock:
+        _pool_role = role
+
+def init_pool(role=None):
+    """
+    Erstellt den Connection Pool des Prozesses. Die API ruft dies beim Start jedes
+    Worker-Prozesses mit role='api' auf (server.py), Batch-Skripte erhalten den Pool beim
+    ersten get_connection() mit den Batch-Vorgaben.
+    """
+    global db_pool, _pool_role
+    with _pool_lock:
+        if role:
+            _pool_role = role
         if db_pool:
-            conn = db_pool.getconn()
-            logger.debug("Verbindung aus dem Pool erhalten")
+            return db_pool
+        minconn, maxconn, timeout = pool_settings(_pool_role)
+        try:
+            db_pool = BlockingConnectionPool(minconn, maxconn, timeout, **DB_PARAMS)
+            logger.debug("Connection Pool erfolgreich erstellt (%s: %s-%s)", _pool_role, minconn, maxconn)
+        except (Exception, psycopg2.DatabaseError) as error:
+            logger.error("Fehler beim Erstellen des Connection Pools: %s", error)
+            db_pool = None
+        return db_pool
+
+def acquire_connection():
+    """
+    Holt eine Verbindung aus dem Pool und wartet dabei höchstens das konfigurierte Timeout.
+    Wirft PoolTimeout bei erschöpftem Pool und psycopg2-Fehler bei Datenbankproblemen.
+    """
+    current_pool = db_pool or init_pool()
+    if not current_pool:
+        raise psycopg2.OperationalError("Connection Pool ist nicht verfügbar")
+    conn = current_pool.getconn()
+    logger.debug("Verbindung aus dem Pool erhalten")
+    return conn
+
+def acquire_read_connection(consistency="replica"):
+    """
+    Holt eine Verbindung für reine Lesezugriffe. Mit konfigurierten Replicas wird
+    reihum ein Replica gewählt, bei Ausfall aller Replicas der Primary.
+    consistency="primary" erzwingt den Primary, z. B. für Aufrufer, die ihre
+    eigenen gerade geschriebenen Daten lesen müssen (Replikationsverzögerung).
+    Die Verbindung wird wie gewohnt mit return_connection() zurückgegeben.
+    """
+    if replica_router and consistency != "primary":
+        acquired = replica_router.acquire()
+        if acquired:
+            conn, replica_pool = acquired
+            _replica_connections[id(conn)] = replica_pool
+            READ_ROUTES.inc(target="replica")
             return conn
-        else:
-            logger.error("Connection Pool ist nicht verfügbar")
-            return None
+        READ_ROUTES.inc(target="primary_fallback")
+    else:
+        READ_ROUTES.inc(target="primary")
+    return acquire_connection()
+
+def get_connection():
+    try:
+        return acquire_connection()
+    except PoolTimeout as error:
+        logger.error("Connection Pool erschöpft: %s", error)
+        return None
+    except (Exception, psycopg2.DatabaseError) as error:
+        logger.error("Fehler beim Abrufen der Verbindung: %s", error)
+        return None
+
+def create_connection(autocommit=False):
+    """
+    Erstellt eine eigenständige Verbindung außerhalb des Pools,
+    z. B. für langlebige LISTEN-Verbindungen.
+    """
+    try:
+        conn = psycopg2.connect(**DB_PARAMS)
+        conn.autocommit = autocommit
+        logger.debug("Eigenständige Verbindung erstellt")
+        return conn
     except (Exception, psycopg2.DatabaseError) as error:
-        logger.error(f"Fehler beim Abrufen der Verbindung: {error}")
+        logger.error("Fehler beim Erstellen der Verbindung: %s", error)
         return None
 
 def return_connection(conn):
     try:
-        if db_pool:
+        replica_pool = _replica_connections.pop(id(conn), None)
+        if replica_pool:
+            if conn.closed and replica_router:
+                # Während einer Abfrage abgebrochen (OperationalError): Replica wie beim Holen überspringen
+                replica_router.mark_down(replica_pool.name, "Verbindung während der Abfrage abgebrochen")
+            replica_pool.putconn(conn)
+            logger.debug("Verbindung zurück in den Replica-Pool %s gegeben", replica_pool.name)
+        elif db_pool:
             db_pool.putconn(conn)
             logger.debug("Verbindung zurück in den Pool gegeben")
     except (Exception, psycopg2.DatabaseError) as error:
-        logger.error(f"Fehler beim Zurückgeben der Verbindung: {error}")
+        logger.error("Fehler beim Zurückgeben der Verbindung: %s", error)
 
 def close_all_connections():
+    # Ein späteres get_connection() erstellt den Pool neu
+    global db_pool
     try:
-        if db_pool:
-            db_pool.closeall()
+        with _pool_lock:
+            closing, db_pool = db_pool, None
+        if closing:
+            closing.closeall()
             logger.debug("Alle Verbindungen im Pool geschlossen")
+        if replica_router:
+            replica_router.closeall()
+            _replica_connections.clear()
     except (Exception, psycopg2.DatabaseError) as error:
-        logger.error(f"Fehler beim Schließen der Verbindungen: {error}")
+        logger.error("Fehler beim Schließen der Verbindungen: %s", error)
+
+def _forget_inherited_pools():
+    """
+    Läuft im Kindprozess nach fork(): Verbindungen des Elternprozesses dürfen nicht
+    weiterverwendet werden (gemeinsame Sockets) und auch nicht geschlossen werden.
+    Der Kindprozess erstellt beim nächsten Zugriff eigene Pools.
+    """
+    global db_pool, _pool_lock
+    db_pool = None
+    _pool_lock = threading.Lock()
+    _replica_connections.clear()
+    if replica_router:
+        replica_router.forget()
+
+os.register_at_fork(after_in_child=_forget_inherited_pools)
@@ -0,0 +1,75 @@
+# delta_sync.py
+
+from typing import List, NamedTuple, Optional, Tuple
+
+class SyncToken(NamedTuple):
+    """
+    Stand eines Clients: je Folge (Artikel, Publisher) die Untergrenze, die höchste bereits
+    gesehene Nummer und die Position der nächsten Abfrage. Wie beim Dimension-Cache läuft die
+    Untergrenze eine Synchronisation hinterher, damit Zeilen aus später committeten
+    Transaktionen mit kleinerer Nummer nicht verloren gehen; Clients erhalten solche Zeilen
+    ggf. doppelt. Nur beim Blättern durch abgeschnittene Seiten liegt die Position über der
+    Untergrenze, nach der letzten Seite wird wieder ab der Untergrenze gelesen.
+    """
+    article_floor: int
+    article_seen: int
+    publisher_floor: int
+    publisher_seen: int
+    article_cursor: int
+    publisher_cursor: int
+
+    def encode(self) -> str:
+        return ".".join(str(value) for value in self)
+
+def parse_sync_token(token: str) -> SyncToken:
+    # Wirft ValueError bei ungültigen Tokens; ältere Tokens ohne Position lesen ab der Untergrenze
+    parts = token.split(".")
+    if len(parts) not in (4, len(SyncToken._fields)):
+        raise ValueError(f"Ungültiges Sync-Token: {token!r}")
+    values = [int(part) for part in parts]
+    if any(value < 0 for value in values):
+        raise ValueError(f"Ungültiges Sync-Token: {token!r}")
+    if len(values) == 4:
+        values += [values[0], values[2]]
+    return SyncToken(*values)
+
+def current_token(cursor) -> SyncToken:
+    # Startpunkt für Clients ohne Token; direkt vor dem ersten Laden von /news abrufen
+    cursor.execute("""
+        SELECT (SELECT COALESCE(MAX(change_version), 0) FROM articles),
+               (SELECT COALESCE(MAX(row_version), 0) FROM publishers)
+    """)
+    article_version, publisher_version = cursor.fetchone()
+    return SyncToken(article_version, article_version, publisher_version, publisher_version,
+                     article_version, publisher_version)
+
+def next_token(token: SyncToken, article_versions: List[int], publisher_versions: List[int],
+               articles_truncated: bool, publishers_truncated: bool) -> SyncToken:
+    article_seen = max([token.article_seen] + article_versions)
+    publisher_seen = max([token.publisher_seen] + publisher_versions)
+    # Die Untergrenze folgt immer dem bisher Gesehenen; bei abgeschnittenen Seiten geht nur
+    # die Position direkt hinter die letzte Zeile
+    article_floor = token.article_seen
+    publisher_floor = token.publisher_seen
+    article_cursor = max(article_versions) if articles_truncated else article_floor
+    publisher_cursor = max(publisher_versions) if publishers_truncated else publisher_floor
+    return SyncToken(article_floor, article_seen, publisher_floor, publisher_seen,
+                     article_cursor, publisher_cursor)
+
+def changed_publishers(cursor, floor: int, country_id: Optional[int], limit: int) -> List[Tuple[int, int]]:
+    """
+    (publisher_id, row_version) der seit `floor` geänderten Publisher, z. B. neu geokodierte.
+    """
+    if country_id is not None:
+        cursor.execute("""
+            SELECT id, row_version FROM publishers
+            WHERE row_version > %s AND country_id = %s
+            ORDER BY row_version LIMIT %s
+        """, (floor, country_id, limit))
+    else:
+        cursor.execute("""
+            SELECT id, row_version FROM publishers
+            WHERE row_version > %s
+            ORDER BY row_version LIMIT %s
+        """, (floor, limit))
+    return cursor.fetchall()
@@ -0,0 +1,221 @@
+# dimension_cache.py
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api.schemas import ArticleBase, LocationBase, PublisherBase, TopicBase
+from db_connection import acquire_connection, return_connection
+
+logger = logging.getLogger(__name__)
+
+# Höchstens so oft wird die Datenbank nach geänderten Zeilen gefragt (Sekunden)
+REFRESH_INTERVAL = 5.0
+
+class DimensionCache:
+    """
+    Hält Themen, Länder, Feeds und Publisher (inkl. Standort) im API-Prozess.
+    Artikelabfragen liefern nur noch Fremdschlüssel; die Publisher- und Themenobjekte
+    werden hier einmal gebaut und für alle Antworten wiederverwendet.
+    Geänderte Zeilen werden über die Spalte row_version inkrementell nachgeladen
+    (siehe data/db_dimension_versions.sql). Gelöschte Zeilen werden nicht erkannt.
+    Nachgeladen wird immer vom Primary: Die Untergrenze setzt eine einzige, fortlaufende
+    Quelle voraus, Replicas mit unterschiedlicher Verzögerung würden Zeilen überspringen.
+    Geänderte Dicts werden kopiert und dann ausgetauscht, nie an Ort und Stelle verändert:
+    Leser in anderen Threads iterieren ohne Lock über den Stand, den sie gerade halten.
+    """
+
+    def __init__(self, refresh_interval: float = REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        # Höchste gesehene row_version je Tabelle und die Untergrenze der nächsten Abfrage.
+        # Die Untergrenze läuft eine Aktualisierung hinterher, damit Zeilen aus später
+        # committeten Transaktionen mit kleinerer Version nicht verloren gehen.
+        self._seen = {'topics': 0, 'countries': 0, 'publishers': 0, 'feeds': 0}
+        self._floor = dict(self._seen)
+
+        self.topics: Dict[int, TopicBase] = {}
+        self.countries: Dict[int, tuple] = {}  # id -> (country_name, iso_code)
+        self.country_ids_by_iso: Dict[str, int] = {}
+        self.feed_topics: Dict[int, int] = {}  # feed_id -> topic_id
+        self.topic_feeds: Dict[int, List[int]] = {}  # topic_id -> [feed_id, ...]
+        self._publisher_rows: Dict[int, tuple] = {}  # id -> (name, latitude, longitude, country_id, city)
+        self.publishers: Dict[int, PublisherBase] = {}
+
+        # Sortierte Listen für /topics und /publishers mit dem Dict, aus dem sie gebaut wurden;
+        # nach einem Austausch des Dicts werden sie neu gebaut
+        self._sorted_topics: Optional[Tuple[Dict[int, TopicBase], List[TopicBase]]] = None
+        self._sorted_publishers: Optional[Tuple[Dict[int, PublisherBase], List[PublisherBase]]] = None
+
+        # Werden mit alten und neuen Standorten geänderter Publisher aufgerufen (vector_tiles.py)
+        self._location_listeners: List[Callable[[List[Tuple[float, float]]], None]] = []
+
+    def add_location_listener(self, listener: Callable[[List[Tuple[float, float]]], None]):
+        self._location_listeners.append(listener)
+
+    def ensure_fresh(self, force: bool = False):
+        # Prüft höchstens alle refresh_interval Sekunden auf Änderungen
+        if not force and time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            if not force and time.monotonic() < self._next_check:
+                return
+            conn = acquire_connection()
+            try:
+                with conn.cursor() as cursor:
+                    self._refresh(cursor)
+            finally:
+                conn.rollback()
+                return_connection(conn)
+            self._next_check = time.monotonic() + self.refresh_interval
+
+    def _fetch_changed(self, cursor, table: str, columns: str):
+        cursor.execute(
+            f"SELECT id, {columns}, row_version FROM {table} WHERE row_version > %s",
+            (self._floor[table],)
+        )
+        rows = cursor.fetchall()
+        previous_seen = self._seen[table]
+        if rows:
+            self._seen[table] = max(previous_seen, max(row[-1] for row in rows))
+        # Beim ersten Laden gibt es noch keinen Vorgängerstand
+        self._floor[table] = previous_seen or self._seen[table]
+        return rows
+
+    def _refresh(self, cursor):
+        changed_topics = self._fetch_changed(cursor, 'topics', 'topic_name')
+        if changed_topics:
+            topics = dict(self.topics)
+            for topic_id, topic_name, _ in changed_topics:
+                topics[topic_id] = TopicBase(id=topic_id, topic_name=topic_name)
+            self.topics = topics
+
+        changed_countries = self._fetch_changed(cursor, 'countries', 'country_name, iso_code')
+        if changed_countries:
+            countries = dict(self.countries)
+            for country_id, country_name, iso_code, _ in changed_countries:
+                countries[country_id] = (country_name, iso_code)
+            self.countries = countries
+            self.country_ids_by_iso = {iso.upper(): cid for cid, (_, iso) in countries.items()}
+
+        changed_feeds = self._fetch_changed(cursor, 'feeds', 'topic_id')
+        if changed_feeds:
+            feed_topics = dict(self.feed_topics)
+            for feed_id, topic_id, _ in changed_feeds:
+                feed_topics[feed_id] = topic_id
+            topic_feeds: Dict[int, List[int]] = {}
+            for feed_id, topic_id in feed_topics.items():
+                topic_feeds.setdefault(topic_id, []).append(feed_id)
+            self.feed_topics = feed_topics
+            self.topic_feeds = topic_feeds
+
+        changed_publishers = self._fetch_changed(
+            cursor, 'publishers', 'name, latitude, longitude, country_id, city'
+        )
+        moved = []
+        if changed_publishers:
+            publisher_rows = dict(self._publisher_rows)
+            for row in changed_publishers:
+                previous = publisher_rows.get(row[0])
+                publisher_rows[row[0]] = row[1:6]
+                for latitude, longitude in ((row[2], row[3]), previous[1:3] if previous else (None, None)):
+                    if latitude is not None and longitude is not None:
+                        moved.append((float(latitude), float(longitude)))
+            self._publisher_rows = publisher_rows
+
+        # Ländernamen stecken in den Publisher-Objekten; bei Länderänderungen alle neu bauen
+        if changed_publishers or changed_countries:
+            rebuild = self._publisher_rows.keys() if changed_countries else [row[0] for row in changed_publishers]
+            publishers = dict(self.publishers)
+            for publisher_id in rebuild:
+                publishers[publisher_id] = self._build_publisher(publisher_id)
+            self.publishers = publishers
+        if moved:
+            for listener in self._location_listeners:
+                listener(moved)
+
+        if changed_publishers or changed_countries or changed_feeds:
+            logger.debug("Dimension-Cache aktualisiert: %s Publisher, %s Länder, %s Feeds",
+                         len(changed_publishers), len(changed_countries), len(changed_feeds))
+
+    def _build_publisher(self, publisher_id: int) -> PublisherBase:
+        name, latitude, longitude, country_id, city = self._publisher_rows[publisher_id]
+        country = self.countries.get(country_id)
+        location = LocationBase(
+            latitude=latitude,
+            longitude=longitude,
+            country=country[0] if country else None,
+            city=city
+        )
+        return PublisherBase(id=publisher_id, name=name, location=location)
+
+    def sorted_topics(self) -> List[TopicBase]:
+        topics = self.topics
+        cached = self._sorted_topics
+        if cached is None or cached[0] is not topics:
+            cached = self._sorted_topics = (topics, sorted(topics.values(), key=lambda t: t.topic_name))
+        return cached[1]
+
+    def sorted_publishers(self, country_id: Optional[int] = None) -> List[PublisherBase]:
+        publishers = self.publishers
+        cached = self._sorted_publishers
+        if cached is None or cached[0] is not publishers:
+            cached = self._sorted_publishers = (publishers, sorted(publishers.values(), key=lambda p: p.name))
+        if country_id is None:
+            return cached[1]
+        publisher_rows = self._publisher_rows
+        return [p for p in cached[1] if publisher_rows[p.id][3] == country_id]
+
+    def country_id(self, iso_code: str) -> Optional[int]:
+        return self.country_ids_by_iso.get(iso_code.upper())
+
+    def feed_ids_for_topics(self, topic_ids: List[int]) -> List[int]:
+        return [feed_id for topic_id in topic_ids for feed_id in self.topic_feeds.get(topic_id, ())]
+
+    def topic_for_feed(self, feed_id: int) -> Optional[TopicBase]:
+        topic_id = self.feed_topics.get(feed_id)
+        return self.topics.get(topic_id) if topic_id is not None else None
+
+    def is_complete(self, publisher_id: int, feed_id: int) -> bool:
+        return publisher_id in self.publishers and self.topic_for_feed(feed_id) is not None
+
+    def country_id_for_publisher(self, publisher_id: int) -> Optional[int]:
+        row = self._publisher_rows.get(publisher_id)
+        return row[3] if row else None
+
+    def country_iso_for_publisher(self, publisher_id: int) -> Optional[str]:
+        row = self._publisher_rows.get(publisher_id)
+        country = self.countries.get(row[3]) if row else None
+        return country[1].upper() if country else None
+
+    def hydrate_articles(self, rows) -> List[ArticleBase]:
+        """
+        Ergänzt Artikelzeilen um die Publisher- und Themenobjekte aus dem Cache.
+        Fehlen Einträge (z. B. gerade angelegte Publisher), wird der Cache einmal sofort aktualisiert.
+        Jede Zeile ergibt einen Artikel, damit Seiten zu ihrem total passen; was dann noch
+        fehlt, bleibt None.
+        """
+        if any(not self.is_complete(row['publisher_id'], row['feed_id']) for row in rows):
+            self.ensure_fresh(force=True)
+
+        items = []
+        for row in rows:
+            publisher = self.publishers.get(row['publisher_id'])
+            topic = self.topic_for_feed(row['feed_id'])
+            if publisher is None or topic is None:
+                logger.warning("Artikel %s verweist auf unbekannte Dimensionen", row['id'])
+            items.append(ArticleBase(
+                id=row['id'],
+                title=row['title'],
+                link=row['link'],
+                pub_date=row['pub_date'],
+                publisher=publisher,
+                topic=topic,
+                story_cluster_id=row.get('story_cluster_id'),
+                cluster_size=row.get('cluster_size')
+            ))
+        return items
+
+dimension_cache = DimensionCache()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# feed_health.py
+#
+# Zustand je Feed (Status, Antwortzeit, aufeinanderfolgende Fehlschläge) und Circuit Breaker:
+# Nach FAILURE_THRESHOLD Fehlschlägen in Folge wird ein Feed bis circuit_open_until
+# übersprungen; jeder weitere Fehlschlag nach Ablauf verdoppelt die Sperre, ein Erfolg hebt
+# sie auf. Erwartet data/db_feed_health.sql.
+# Bericht aus assets/: python feed_health.py [--limit 20]
+
+import argparse
+import logging
+import os
+from typing import Optional
+
+import psycopg2
+import requests
+
+import metrics
+from db_connection import get_connection, return_connection, close_all_connections
+from logging_config import setup_logging
+
+# Konfiguration
+CONFIG = {
+    'FAILURE_THRESHOLD': int(os.getenv('FEED_BREAKER_THRESHOLD', '3')),  # Fehlschläge in Folge bis zur Sperre
+    'BASE_BACKOFF': int(os.getenv('FEED_BREAKER_BACKOFF', '900')),  # Erste Sperrdauer in Sekunden
+    'MAX_BACKOFF': 24 * 3600,
+    'CYCLE_FAILURE_LIMIT': int(os.getenv('FEED_CYCLE_FAILURE_LIMIT', '25')),  # Abbruch eines Zyklus, siehe CycleBreaker
+    'LATENCY_SMOOTHING': 0.2,  # Gewicht der letzten Antwortzeit im gleitenden Mittel
+    'MAX_ERROR_LENGTH': 500
+}
+
+logger = logging.getLogger(__name__)
+
+# Metriken
+FEED_CIRCUITS_OPEN = metrics.Gauge('newsmap_feed_circuits_open', 'Feeds mit geöffnetem Circuit Breaker')
+FEED_CIRCUIT_TRIPS = metrics.Counter('newsmap_feed_circuit_trips_total', 'Gesperrte Feeds')
+FEED_FETCH_STATUS = metrics.Counter('newsmap_feed_fetch_status_total', 'Abrufe je Ergebnis', ['status'])
+
+# Bedingung für Feeds, deren Circuit geschlossen ist (oder deren Sperre abgelaufen ist)
+CIRCUIT_CLOSED = "(feeds.circuit_open_until IS NULL OR feeds.circuit_open_until <= now())"
+
+def classify_failure(error: Exception) -> Optional[str]:
+    """
+    Status für den Feed-Zustand; None bei Datenbankfehlern, die nicht am Feed liegen
+    und ihn daher auch nicht sperren.
+    """
+    if isinstance(error, psycopg2.Error):
+        return None
+    if isinstance(error, requests.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f'http_{error.response.status_code}'
+    if isinstance(error, requests.RequestException):
+        return 'connection'
+    # z. B. ungültiges XML
+    return 'invalid'
+
+def record_fetch(cursor, feed_id: int, status: str, latency_ms: Optional[float], error: Optional[str] = None):
+    """
+    Speichert das Ergebnis eines Abrufs; läuft in der Transaktion des Aufrufers.
+    Die Sperre wird in derselben Anweisung berechnet, sodass parallele Worker sich nicht überschreiben.
+    """
+    ok = status == 'ok'
+    cursor.execute("""
+        UPDATE feeds
+        SET total_fetches = total_fetches + 1,
+            total_failures = total_failures + CASE WHEN %(ok)s THEN 0 ELSE 1 END,
+            failure_count = CASE WHEN %(ok)s THEN 0 ELSE failure_count + 1 END,
+            last_status = %(status)s,
+            last_error = %(error)s,
+            last_latency_ms = %(latency)s,
+            avg_latency_ms = CASE
+                WHEN %(latency)s IS NULL THEN avg_latency_ms
+                WHEN avg_latency_ms IS NULL THEN %(latency)s
+                ELSE avg_latency_ms + %(smoothing)s * (%(latency)s - avg_latency_ms)
+            END,
+            last_checked_at = now(),
+            last_success_at = CASE WHEN %(ok)s THEN now() ELSE last_success_at END,
+            circuit_open_until = CASE
+                WHEN %(ok)s THEN NULL
+                WHEN failure_count + 1 >= %(threshold)s THEN now() + make_interval(secs => LEAST(
+                    %(max_backoff)s, %(base_backoff)s * power(2, LEAST(failure_count + 1 - %(threshold)s, 16))
+                ))
+                ELSE circuit_open_until
+            END
+        WHERE id = %(feed_id)s
+        RETURNING failure_count, circuit_open_until
+    """, {
+        'ok': ok,
+        'status': status,
+        'error': error[:CONFIG['MAX_ERROR_LENGTH']] if error else None,
+        'latency': int(latency_ms) if latency_ms is not None else None,
+        'smoothing': CONFIG['LATENCY_SMOOTHING'],
+        'threshold': CONFIG['FAILURE_THRESHOLD'],
+        'base_backoff': CONFIG['BASE_BACKOFF'],
+        'max_backoff': CONFIG['MAX_BACKOFF'],
+        'feed_id': feed_id,
+    })
+    FEED_FETCH_STATUS.inc(status=status)
+    row = cursor.fetchone()
+    if row and row[1] is not None and not ok:
+        if row[0] == CONFIG['FAILURE_THRESHOLD']:
+            FEED_CIRCUIT_TRIPS.inc()
+        logger.warning("Feed %s nach %s Fehlschlägen (%s) gesperrt bis %s", feed_id, row[0], status, row[1])
+
+def count_open_circuits(cursor) -> int:
+    cursor.execute("SELECT count(*) FROM feeds WHERE circuit_open_until > now()")
+    count = cursor.fetchone()[0]
+    FEED_CIRCUITS_OPEN.set(count)
+    return count
+
+class CycleBreaker:
+    """
+    Bricht einen Abrufzyklus ab, wenn CYCLE_FAILURE_LIMIT Feeds hintereinander fehlschlagen,
+    z. B. weil Google News oder das Netz ausgefallen ist. Ohne ihn kostet dann jeder Feed
+    bis zum Timeout, bevor seine eigene Sperre greift.
+    """
+
+    def __init__(self, limit: int = CONFIG['CYCLE_FAILURE_LIMIT']):
+        self.limit = limit
+        self.consecutive_failures = 0
+
+    def record(self, ok: bool):
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+    @property
+    def tripped(self) -> bool:
+        return self.limit > 0 and self.consecutive_failures >= self.limit
+
+def print_report(limit: int):
+    conn = get_connection()
+    if conn is None:
+        logger.error("Keine Datenbankverbindung verfügbar")
+        return
+    try:
+        with conn.cursor() as cursor:
+            open_circuits = count_open_circuits(cursor)
+            columns = """
+                feeds.id, topics.topic_name, countries.iso_code, feeds.last_status,
+                feeds.avg_latency_ms, feeds.last_latency_ms, feeds.failure_count,
+                feeds.total_failures, feeds.total_fetches, feeds.circuit_open_until
+            """
+            source = """
+                FROM feeds
+                JOIN topics ON topics.id = feeds.topic_id
+                JOIN countries ON countries.id = feeds.country_id
+                WHERE feeds.total_fetches > 0
+            """
+            cursor.execute(f"SELECT {columns} {source} AND feeds.avg_latency_ms IS NOT NULL"
+                           " ORDER BY feeds.avg_latency_ms DESC LIMIT %s", (limit,))
+            slowest = cursor.fetchall()
+            cursor.execute(f"SELECT {columns} {source} AND feeds.total_failures > 0"
+                           " ORDER BY feeds.failure_count DESC, feeds.total_failures::float / feeds.total_fetches DESC"
+                           " LIMIT %s", (limit,))
+            failing = cursor.fetchall()
+        conn.rollback()
+    finally:
+        return_connection(conn)
+
+    header = (f"{'Feed':>6}  {'Thema':<14}{'Land':<6}{'Status':<12}{'Ø ms':>8}{'letzte ms':>10}"
+              f"{'in Folge':>9}{'Fehler':>12}  gesperrt bis")
+    for title, rows in (("Langsamste Feeds", slowest), ("Feeds mit den meisten Fehlschlägen", failing)):
+        print(f"\n{title}")
+        print(header)
+        for (feed_id, topic, iso, status, avg_ms, last_ms, in_a_row, failures, fetches, open_until) in rows:
+            print(f"{feed_id:>6}  {topic[:13]:<14}{iso:<6}{status or '-':<12}"
+                  f"{avg_ms or 0:>8.0f}{last_ms if last_ms is not None else '-':>10}{in_a_row:>9}"
+                  f"{f'{failures}/{fetches}':>12}  {open_until.isoformat(timespec='minutes') if open_until else '-'}")
+    print(f"\nGesperrte Feeds: {open_circuits}")
+
+if __name__ == '__main__':
+    setup_logging()
+    arg_parser = argparse.ArgumentParser(description="Bericht über langsame und fehlschlagende Feeds")
+    arg_parser.add_argument('--limit', type=int, default=20, help="Feeds je Liste")
+    args = arg_parser.parse_args()
+    try:
+        print_report(args.limit)
+    finally:
+        close_all_connections()
@@ -0,0 +1,40 @@
+# feed_parser.py
+
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator
+
+# Größe der Blöcke, in denen der Response-Body gelesen wird
+CHUNK_SIZE = 16 * 1024
+
+def iter_feed_items(chunks: Iterable[bytes]) -> Iterator[ET.Element]:
+    """
+    Parst ein RSS-Dokument inkrementell und liefert jedes <item> einzeln, sobald es vollständig ist.
+    Bereits gelieferte Items werden geleert und aus dem Baum entfernt, damit der Speicherbedarf
+    unabhängig von der Feed-Größe bleibt. Bricht der Aufrufer die Iteration ab, werden keine
+    weiteren Blöcke mehr gelesen.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    parents = []
+
+    def completed_items():
+        for event, element in parser.read_events():
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag == "item":
+                yield element
+                element.clear()
+                if parents:
+                    parents[-1].remove(element)
+
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            yield from completed_items()
+    parser.close()
+    yield from completed_items()
+
+def iter_response_items(response) -> Iterator[ET.Element]:
+    # Streaming-Variante für eine mit stream=True geöffnete requests-Response
+    return iter_feed_items(response.iter_content(chunk_size=CHUNK_SIZE))
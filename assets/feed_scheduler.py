@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import heapq
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from db_connection import get_connection, return_connection
+from parse_feeds import claim_feed, lease_owner, process_feed, release_feeds, run_clustering
+import metrics
+from logging_config import setup_logging
+
+# Konfiguration (alle Zeiten in Sekunden)
+CONFIG = {
+    'DEFAULT_INTERVAL': 1800,
+    'MIN_INTERVAL': 300,
+    'MAX_INTERVAL': 6 * 3600,
+    'MAX_BACKOFF_INTERVAL': 24 * 3600,
+    'TARGET_NEW_ARTICLES': 5,  # Angestrebte Anzahl neuer Artikel pro Abruf
+    'MAX_ADJUST_FACTOR': 2.0,  # Maximale Änderung des Intervalls pro Abruf
+    'FEED_RELOAD_INTERVAL': 600  # Neu hinzugefügte Feeds werden so oft nachgeladen
+}
+
+logger = logging.getLogger(__name__)
+
+def next_poll_interval(current_interval: float, new_articles: Optional[int], failure_count: int) -> float:
+    """
+    Berechnet das nächste Abrufintervall eines Feeds.
+    Fehlgeschlagene Abrufe (new_articles is None) verdoppeln das Intervall pro Fehler,
+    erfolgreiche Abrufe passen es an die beobachtete Rate neuer Artikel an. Als neu zählen
+    auch vorhandene Artikel, die der Feed erstmals enthält (process_feed).
+    """
+    if new_articles is None:
+        backoff = CONFIG['DEFAULT_INTERVAL'] * 2 ** min(failure_count, 16)
+        return min(max(backoff, current_interval), CONFIG['MAX_BACKOFF_INTERVAL'])
+
+    if new_articles == 0:
+        factor = CONFIG['MAX_ADJUST_FACTOR']
+    else:
+        factor = CONFIG['TARGET_NEW_ARTICLES'] / new_articles
+        factor = min(max(factor, 1 / CONFIG['MAX_ADJUST_FACTOR']), CONFIG['MAX_ADJUST_FACTOR'])
+
+    return min(max(current_interval * factor, CONFIG['MIN_INTERVAL']), CONFIG['MAX_INTERVAL'])
+
+def load_feeds() -> Dict[int, Tuple]:
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, title, language, last_build_date, country_id, topic_id, query_params,
+                   COALESCE(poll_interval, %s),
+                   -- Gesperrte Feeds (feed_health.py) frühestens nach Ablauf der Sperre
+                   COALESCE(EXTRACT(EPOCH FROM GREATEST(next_poll_at, circuit_open_until)), 0),
+                   failure_count
+            FROM feeds
+        """, (CONFIG['DEFAULT_INTERVAL'],))
+        return {row[0]: row for row in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+def save_schedule(feed_id: int, interval: float, failure_count: int, polled_at: float):
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE feeds
+            SET poll_interval = %s,
+                failure_count = %s,
+                last_polled_at = to_timestamp(%s),
+                next_poll_at = to_timestamp(%s)
+            WHERE id = %s
+        """, (int(interval), failure_count, polled_at, polled_at + interval, feed_id))
+        conn.commit()
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error saving schedule for feed %s: %s", feed_id, e)
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+def run_scheduler():
+    """
+    Langlebiger Scheduler: hält die Feeds in einer Prioritätswarteschlange nach Fälligkeit
+    und ruft jeweils nur den nächsten fälligen Feed ab. Jeder Abruf läuft über dieselben
+    Leases wie parse_feeds.py, sodass parallele Scheduler oder Ingest-Läufe keinen Feed
+    doppelt abrufen.
+    """
+    logger.info("Starting feed scheduler")
+    owner = lease_owner()
+    metrics.start_http_server_from_env()
+
+    feeds: Dict[int, Tuple] = {}
+    queue: List[Tuple[float, int]] = []
+    next_reload = 0.0
+
+    try:
+        while True:
+            now = time.time()
+            if now >= next_reload:
+                # Neue Artikel seit dem letzten Nachladen Story-Clustern zuordnen
+                run_clustering()
+                try:
+                    loaded = load_feeds()
+                except Exception as e:
+                    logger.error("Error fetching feeds: %s", e)
+                    loaded = None
+                if loaded is not None:
+                    for feed_id, row in loaded.items():
+                        if feed_id not in feeds:
+                            heapq.heappush(queue, (float(row[8]), feed_id))
+                    feeds = loaded
+                    logger.info("Scheduled feeds: %s", len(feeds))
+                next_reload = now + CONFIG['FEED_RELOAD_INTERVAL']
+
+            if not queue:
+                time.sleep(max(0.0, next_reload - time.time()))
+                continue
+
+            due_at, feed_id = queue[0]
+            wait = due_at - time.time()
+            if wait > 0:
+                time.sleep(min(wait, max(0.0, next_reload - time.time())))
+                continue
+            heapq.heappop(queue)
+
+            feed = feeds.get(feed_id)
+            if feed is None:
+                # Feed wurde inzwischen gelöscht
+                continue
+
+            if not claim_feed(owner, feed_id):
+                # Läuft gerade anderswo oder ist gesperrt: später erneut versuchen
+                logger.debug("Feed %s is leased or its circuit is open, retrying later", feed_id)
+                heapq.heappush(queue, (time.time() + CONFIG['MIN_INTERVAL'], feed_id))
+                continue
+
+            interval, failure_count = float(feed[7]), feed[9]
+            polled_at = time.time()
+            result = process_feed(feed[:7])
+            release_feeds(owner, [feed_id], polled=True)
+            new_articles = sum(result) if result is not None else None
+
+            failure_count = failure_count + 1 if new_articles is None else 0
+            interval = next_poll_interval(interval, new_articles, failure_count)
+            save_schedule(feed_id, interval, failure_count, polled_at)
+
+            feeds[feed_id] = feed[:7] + (interval, polled_at + interval, failure_count)
+            heapq.heappush(queue, (polled_at + interval, feed_id))
+            logger.debug("Feed %s next poll in %.0fs", feed_id, interval)
+    except KeyboardInterrupt:
+        logger.info("Feed scheduler stopped")
+
+if __name__ == '__main__':
+    setup_logging()
+    run_scheduler()
@@ -1,25 +1,60 @@
 #!/usr/bin/env python3
 
+import argparse
 import logging
-import requests
+import os
+import select
+import sys
 import time
-from db_connection import get_connection, return_connection
+from geocode_queue import (
+    QUEUE_CHANNEL,
+    enqueue_missing_publishers,
+    claim_next_publisher,
+    complete_publisher,
+    retry_publisher,
+    queue_depth,
+    seconds_until_next_due,
+)
 from typing import Optional, Tuple
+import metrics
+from logging_config import setup_logging
+
+# requests und db_connection (psycopg2) werden erst in den Funktionen importiert,
+# damit --help und Argumentfehler ohne sie auskommen
 
 # Konfiguration
 CONFIG = {
-    'GEOCODE_RATE_LIMIT_DELAY': 1,  # Mindestens 1 Sekunde laut Nominatim-Nutzungsbedingungen
+    'NOMINATIM_URL': os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search'),  # z. B. benchmarks/stub_servers.py
+    # Mindestens 1 Sekunde laut Nominatim-Nutzungsbedingungen; nur gegen den Stub-Server kleiner
+    'GEOCODE_RATE_LIMIT_DELAY': float(os.getenv('GEOCODE_RATE_LIMIT_DELAY', '1')),
     'GEOCODE_MAX_RETRIES': 1,
-    'REQUEST_TIMEOUT': 2  # Timeout für HTTP-Anfragen in Sekunden
+    'REQUEST_TIMEOUT': 2,  # Timeout für HTTP-Anfragen in Sekunden
+    'WORKER_IDLE_TIMEOUT': 60  # Maximale Wartezeit des Workers auf ein NOTIFY in Sekunden
 }
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
+
+# Metriken
+GEOCODE_REQUEST_SECONDS = metrics.Histogram('newsmap_geocode_request_seconds', 'Dauer einer Nominatim-Anfrage')
+GEOCODE_RESULTS = metrics.Counter('newsmap_geocode_results_total', 'Ergebnisse der Geokodierung', ['outcome'])
+GEOCODE_QUEUE_DEPTH = metrics.Gauge('newsmap_geocode_queue_depth', 'Einträge in der geocode_queue')
+
+# Frühester Start der nächsten Nominatim-Anfrage (time.monotonic); einziger Taktgeber für
+# Batch-Lauf und Worker, Treffer im Gazetteer zählen nicht
+_next_request_at = 0.0
+
+def wait_for_rate_limit():
+    global _next_request_at
+    delay = _next_request_at - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    _next_request_at = time.monotonic() + CONFIG['GEOCODE_RATE_LIMIT_DELAY']
 
 def geocode_location(location_name: str, country_code: str) -> Tuple[Optional[float], Optional[float], Optional[str], Optional[str], Optional[str]]:
+    import requests
+
     try:
-        url = 'https://nominatim.openstreetmap.org/search'
+        url = CONFIG['NOMINATIM_URL']
         params = {
             'q': location_name,
             'countrycodes': country_code,
@@ -29,58 +64,80 @@ def geocode_location(location_name: str, country_code: str) -> Tuple[Optional[fl
         }
         headers = {'User-Agent': 'maptimes/1.0'}
         
-        logger.debug(f"Sending geocoding request to {url} with params {params}")
-        response = requests.get(url, params=params, headers=headers, timeout=CONFIG['REQUEST_TIMEOUT'])
+        logger.debug("Sending geocoding request to %s with params %s", url, params)
+        with GEOCODE_REQUEST_SECONDS.time():
+            response = requests.get(url, params=params, headers=headers, timeout=CONFIG['REQUEST_TIMEOUT'])
         response.raise_for_status()
-        logger.debug(f"Received response with status code {response.status_code}")
+        logger.debug("Received response with status code %s", response.status_code)
         data = response.json()
-        logger.debug(f"Response JSON data: {data}")
+        logger.debug("Response JSON data: %s", data)
         
         if data:
             first_result = data[0]
-            logger.debug(f"First geocoding result for '{location_name}': {first_result}")
+            logger.debug("First geocoding result for '%s': %s", location_name, first_result)
             latitude = float(first_result['lat'])
             longitude = float(first_result['lon'])
             address = first_result.get('address', {})
-            logger.debug(f"Extracted address: {address}")
+            logger.debug("Extracted address: %s", address)
             
             country_name = address.get('country')
             country_code = address.get('country_code', '').upper()  # ISO 3166-1 Alpha-2 Code
-            logger.debug(f"Extracted country name: {country_name}, country code: {country_code}")
+            logger.debug("Extracted country name: %s, country code: %s", country_name, country_code)
             
             city = address.get('city') or address.get('town') or address.get('village')
-            logger.debug(f"Extracted city: {city}")
+            logger.debug("Extracted city: %s", city)
             
             return latitude, longitude, country_name, city, country_code
         else:
-            logger.warning(f"No geocoding results for '{location_name}'")
+            logger.warning("No geocoding results for '%s'", location_name)
             return None, None, None, None, None
     except requests.exceptions.Timeout:
-        logger.error(f"Timeout error for '{location_name}' after {CONFIG['REQUEST_TIMEOUT']} seconds.")
+        logger.error("Timeout error for '%s' after %s seconds.", location_name, CONFIG['REQUEST_TIMEOUT'])
         return None, None, None, None, None
     except Exception as e:
-        logger.error(f"Geocoding error for '{location_name}': {e}")
+        logger.error("Geocoding error for '%s': %s", location_name, e)
         return None, None, None, None, None
 
 def geocode_with_rate_limit(location_name: str, iso_code: str) -> Optional[Tuple[float, float, str, str, str]]:
     for attempt in range(CONFIG['GEOCODE_MAX_RETRIES']):
-        logger.debug(f"Geocoding '{location_name}', attempt {attempt + 1} of {CONFIG['GEOCODE_MAX_RETRIES']}")
+        logger.debug("Geocoding '%s', attempt %s of %s", location_name, attempt + 1, CONFIG['GEOCODE_MAX_RETRIES'])
+        wait_for_rate_limit()
         result = geocode_location(location_name, iso_code)
         if result and result[0] is not None:
-            logger.debug(f"Successfully geocoded '{location_name}'")
-            time.sleep(CONFIG['GEOCODE_RATE_LIMIT_DELAY'])
+            logger.debug("Successfully geocoded '%s'", location_name)
+            GEOCODE_RESULTS.inc(outcome='success')
             return result
         else:
-            logger.debug(f"Geocoding failed for '{location_name}', attempt {attempt + 1}")
-            if attempt < CONFIG['GEOCODE_MAX_RETRIES'] - 1:
-                logger.debug(f"Retrying geocode for '{location_name}' after delay")
-                time.sleep(CONFIG['GEOCODE_RATE_LIMIT_DELAY'])
-    logger.warning(f"All attempts to geocode '{location_name}' failed")
+            logger.debug("Geocoding failed for '%s', attempt %s", location_name, attempt + 1)
+    GEOCODE_RESULTS.inc(outcome='failure')
+    logger.warning("All attempts to geocode '%s' failed", location_name)
+    return None
+
+def lookup_gazetteer(cursor, location_name: str, iso_code: str) -> Optional[Tuple[float, float, str, str, str]]:
+    # Bekannte Standorte aus data/gazetteer.csv (scripts/load_reference_data.py) brauchen keine Nominatim-Anfrage
+    cursor.execute("""
+        SELECT g.latitude, g.longitude, c.country_name, g.city, c.iso_code
+        FROM gazetteer AS g
+        JOIN countries AS c ON c.id = g.country_id
+        WHERE lower(g.name) = lower(%s) AND c.iso_code = %s
+    """, (location_name, iso_code))
+    row = cursor.fetchone()
+    if row:
+        GEOCODE_RESULTS.inc(outcome='gazetteer')
+        logger.debug("Found '%s' in gazetteer", location_name)
+        return tuple(row)
     return None
 
-def geocode_publishers():
+def locate_publisher(cursor, location_name: str, iso_code: str) -> Optional[Tuple[float, float, str, str, str]]:
+    return lookup_gazetteer(cursor, location_name, iso_code) or geocode_with_rate_limit(location_name, iso_code)
+
+def geocode_publishers() -> bool:
+    from db_connection import get_connection, return_connection
+
+    # Gibt False zurück, wenn der Lauf an einem Fehler abgebrochen ist
     logger.info("Starting geocoding publishers script")
 
+    succeeded = False
     conn = None
     cursor = None
     try:
@@ -109,44 +166,40 @@ def geocode_publishers():
         """)
 
         publishers = cursor.fetchall()
-        logger.info(f"Publishers to geocode: {len(publishers)}")
-        logger.debug(f"Publisher list: {publishers}")
+        logger.info("Publishers to geocode: %s", len(publishers))
+        logger.debug("Publisher list: %s", publishers)
 
         for publisher_id, publisher_name, iso_code in publishers:
-            logger.info(f"Geocoding publisher ID {publisher_id} - {publisher_name}")
+            logger.info("Geocoding publisher ID %s - %s", publisher_id, publisher_name)
 
             # Geokodierung durchführen
             start_time = time.time()
-            location_data = geocode_with_rate_limit(publisher_name, iso_code)
+            location_data = locate_publisher(cursor, publisher_name, iso_code)
             duration = time.time() - start_time
-            logger.debug(f"Geocoding took {duration:.2f} seconds for '{publisher_name}'")
+            logger.debug("Geocoding took %.2f seconds for '%s'", duration, publisher_name)
 
             if location_data:
                 latitude, longitude, country_name, city, country_code = location_data
-                logger.debug(f"Geocode result for '{publisher_name}': latitude={latitude}, longitude={longitude}, country_name={country_name}, city={city}, country_code={country_code}")
+                logger.debug("Geocode result for '%s': latitude=%s, longitude=%s, country_name=%s, city=%s, country_code=%s", publisher_name, latitude, longitude, country_name, city, country_code)
 
                 # Publisher aktualisieren
                 try:
-                    logger.debug(f"Updating publisher ID {publisher_id} with geocode data")
-                    cursor.execute("""
-                        UPDATE publishers
-                        SET latitude = %s,
-                            longitude = %s,
-                            city = %s
-                        WHERE id = %s
-                    """, (latitude, longitude, city, publisher_id))
+                    logger.debug("Updating publisher ID %s with geocode data", publisher_id)
+                    update_publisher_location(cursor, publisher_id, location_data)
+                    complete_publisher(cursor, publisher_id)
                     conn.commit()
-                    logger.info(f"Updated publisher ID {publisher_id} with geocoded data")
+                    logger.info("Updated publisher ID %s with geocoded data", publisher_id)
                 except Exception as e:
                     conn.rollback()
-                    logger.error(f"Failed to update publisher ID {publisher_id}: {e}")
+                    logger.error("Failed to update publisher ID %s: %s", publisher_id, e)
             else:
-                logger.warning(f"Could not geocode publisher ID {publisher_id} - {publisher_name}")
+                logger.warning("Could not geocode publisher ID %s - %s", publisher_id, publisher_name)
+        succeeded = True
 
     except Exception as e:
         if conn:
             conn.rollback()
-        logger.error(f"Error during geocoding publishers: {e}")
+        logger.error("Error during geocoding publishers: %s", e)
     finally:
         if cursor:
             cursor.close()
@@ -155,7 +208,164 @@ def geocode_publishers():
             return_connection(conn)
             logger.debug("Database connection returned")
 
+    metrics.write_textfile_from_env()
     logger.info("Geocoding publishers script completed")
+    return succeeded
+
+def update_publisher_location(cursor, publisher_id: int, location_data: Tuple[float, float, str, str, str]):
+    latitude, longitude, country_name, city, country_code = location_data
+    cursor.execute("""
+        UPDATE publishers
+        SET latitude = %s,
+            longitude = %s,
+            city = %s
+        WHERE id = %s
+    """, (latitude, longitude, city, publisher_id))
+
+def process_next_queued_publisher(conn) -> bool:
+    """
+    Geokodiert den nächsten fälligen Publisher aus der Queue.
+    Gibt False zurück, wenn die Queue keinen fälligen Eintrag enthält.
+    Der Eintrag wird vor der Nominatim-Anfrage beansprucht und committet, sodass während
+    der Anfrage weder Sperre noch Transaktion offen ist; bricht der Worker ab, wird er nach
+    CLAIM_TIMEOUT_SECONDS wieder fällig.
+    """
+    cursor = conn.cursor()
+    try:
+        claimed = claim_next_publisher(cursor)
+        conn.commit()
+        if not claimed:
+            return False
+
+        publisher_id, publisher_name, iso_code, attempts = claimed
+        logger.info("Geocoding queued publisher ID %s - %s", publisher_id, publisher_name)
+
+        location_data = lookup_gazetteer(cursor, publisher_name, iso_code)
+        conn.commit()
+        if location_data is None:
+            location_data = geocode_with_rate_limit(publisher_name, iso_code)
+        if location_data:
+            update_publisher_location(cursor, publisher_id, location_data)
+            complete_publisher(cursor, publisher_id)
+            dequeued = True
+            logger.info("Updated publisher ID %s with geocoded data", publisher_id)
+        else:
+            dequeued = retry_publisher(cursor, publisher_id, attempts)
+            logger.warning("Could not geocode publisher ID %s - %s", publisher_id, publisher_name)
+        conn.commit()
+        # Ein erneut eingeplanter Eintrag bleibt in der Queue
+        if dequeued:
+            GEOCODE_QUEUE_DEPTH.dec()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def wait_for_notification(listen_conn, timeout: float):
+    # Blockiert, bis ein NOTIFY eintrifft oder das Timeout abläuft
+    if select.select([listen_conn], [], [], timeout) != ([], [], []):
+        listen_conn.poll()
+        listen_conn.notifies.clear()
+
+def run_geocode_worker() -> bool:
+    """
+    Langlebiger Worker: arbeitet die geocode_queue ab und wartet per LISTEN auf neue Publisher.
+    Zwischen zwei Nominatim-Anfragen liegt immer mindestens GEOCODE_RATE_LIMIT_DELAY.
+    Gibt False zurück, wenn keine Verbindung zustande kommt, sonst True nach Strg+C.
+    """
+    from db_connection import create_connection, get_connection, return_connection
+
+    logger.info("Starting geocoding worker")
+    metrics.start_http_server_from_env()
+
+    listen_conn = create_connection(autocommit=True)
+    if listen_conn is None:
+        logger.error("LISTEN connection could not be established")
+        return False
+    conn = get_connection()
+    if conn is None:
+        listen_conn.close()
+        logger.error("Database connection could not be established")
+        return False
+
+    try:
+        with listen_conn.cursor() as listen_cursor:
+            listen_cursor.execute(f"LISTEN {QUEUE_CHANNEL}")
+
+        with conn.cursor() as cursor:
+            depth = queue_depth(cursor)
+        conn.commit()
+        GEOCODE_QUEUE_DEPTH.set(depth)
+        logger.info("Queued publishers: %s", depth)
+
+        while True:
+            # Den Abstand zwischen Nominatim-Anfragen hält geocode_with_rate_limit ein
+            try:
+                processed = process_next_queued_publisher(conn)
+            except Exception as e:
+                logger.error("Error while processing geocode queue: %s", e)
+                processed = False
+
+            if processed:
+                continue
+
+            # Queue leer: bis zum nächsten NOTIFY oder fälligen Retry warten
+            with conn.cursor() as cursor:
+                due_in = seconds_until_next_due(cursor)
+                GEOCODE_QUEUE_DEPTH.set(queue_depth(cursor))
+            conn.commit()
+            timeout = CONFIG['WORKER_IDLE_TIMEOUT']
+            if due_in is not None:
+                timeout = max(0.0, min(timeout, due_in))
+            wait_for_notification(listen_conn, timeout)
+    except KeyboardInterrupt:
+        logger.info("Geocoding worker stopped")
+    finally:
+        listen_conn.close()
+        return_connection(conn)
+    return True
+
+def backfill_geocode_queue() -> bool:
+    from db_connection import get_connection, return_connection
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        count = enqueue_missing_publishers(cursor)
+        conn.commit()
+        logger.info("Enqueued %s publishers without geocode data", count)
+        return True
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error while filling geocode queue: %s", e)
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+def run(argv=None) -> int:
+    # Kommandozeile, auch für python -m googlenewsmap geocode; gibt den Exit-Code zurück
+    arg_parser = argparse.ArgumentParser(description="Geokodierung der Publisher")
+    arg_parser.add_argument('--worker', action='store_true', help="Geocoding-Queue dauerhaft abarbeiten")
+    arg_parser.add_argument('--backfill', action='store_true', help="Alle Publisher ohne Geodaten in die Queue einreihen")
+    args = arg_parser.parse_args(argv)
+
+    succeeded = True
+    if args.backfill:
+        succeeded = backfill_geocode_queue()
+    if args.worker:
+        succeeded = run_geocode_worker() and succeeded
+    elif not args.backfill:
+        succeeded = geocode_publishers()
+    return 0 if succeeded else 1
 
 if __name__ == '__main__':
-    geocode_publishers()
+    setup_logging()
+    sys.exit(run())
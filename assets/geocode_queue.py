@@ -0,0 +1,92 @@
+# geocode_queue.py
+
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY-Kanal, auf dem der Geocoding-Worker lauscht
+QUEUE_CHANNEL = "geocode_queue"
+
+# Fehlgeschlagene Einträge werden mit exponentiellem Backoff erneut versucht
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 300
+# Beanspruchte Einträge werden nach dieser Dauer wieder fällig, falls der Worker abbricht
+CLAIM_TIMEOUT_SECONDS = 300
+
+def enqueue_publisher(cursor, publisher_id: int):
+    """
+    Stellt einen Publisher in die Geocoding-Queue ein.
+    Läuft in der Transaktion des Aufrufers; das NOTIFY wird erst beim Commit zugestellt.
+    """
+    cursor.execute("""
+        INSERT INTO geocode_queue (publisher_id)
+        VALUES (%s)
+        ON CONFLICT (publisher_id) DO NOTHING
+    """, (publisher_id,))
+    cursor.execute("SELECT pg_notify(%s, %s)", (QUEUE_CHANNEL, str(publisher_id)))
+
+def enqueue_missing_publishers(cursor) -> int:
+    # Einmaliges Nachfüllen mit allen Publishern ohne Geodaten
+    cursor.execute("""
+        INSERT INTO geocode_queue (publisher_id)
+        SELECT id FROM publishers
+        WHERE latitude IS NULL OR longitude IS NULL
+        ON CONFLICT (publisher_id) DO NOTHING
+    """)
+    count = cursor.rowcount
+    if count:
+        cursor.execute("SELECT pg_notify(%s, %s)", (QUEUE_CHANNEL, "backfill"))
+    return count
+
+def claim_next_publisher(cursor) -> Optional[Tuple[int, str, str, int]]:
+    """
+    Beansprucht den ältesten fälligen Queue-Eintrag, indem not_before um CLAIM_TIMEOUT_SECONDS
+    verschoben wird; nach dem Commit des Aufrufers übergehen ihn andere Worker.
+    complete_publisher oder retry_publisher beenden den Anspruch.
+    Gibt (publisher_id, name, iso_code, attempts) zurück oder None, wenn nichts fällig ist.
+    """
+    cursor.execute("""
+        WITH next AS (
+            SELECT publisher_id
+            FROM geocode_queue
+            WHERE not_before <= now()
+            ORDER BY enqueued_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE geocode_queue AS q
+        SET not_before = now() + make_interval(secs => %s)
+        FROM next, publishers AS p
+        JOIN countries AS c ON c.id = p.country_id
+        WHERE q.publisher_id = next.publisher_id AND p.id = q.publisher_id
+        RETURNING q.publisher_id, p.name, c.iso_code, q.attempts
+    """, (CLAIM_TIMEOUT_SECONDS,))
+    return cursor.fetchone()
+
+def complete_publisher(cursor, publisher_id: int):
+    cursor.execute("DELETE FROM geocode_queue WHERE publisher_id = %s", (publisher_id,))
+
+def retry_publisher(cursor, publisher_id: int, attempts: int) -> bool:
+    # Gibt True zurück, wenn der Eintrag nach MAX_ATTEMPTS aus der Queue entfernt wurde
+    attempts += 1
+    if attempts >= MAX_ATTEMPTS:
+        logger.warning("Publisher ID %s nach %s Versuchen aus der Queue entfernt", publisher_id, attempts)
+        complete_publisher(cursor, publisher_id)
+        return True
+    cursor.execute("""
+        UPDATE geocode_queue
+        SET attempts = %s,
+            not_before = now() + make_interval(secs => %s)
+        WHERE publisher_id = %s
+    """, (attempts, RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), publisher_id))
+    return False
+
+def queue_depth(cursor) -> int:
+    cursor.execute("SELECT COUNT(*) FROM geocode_queue")
+    return cursor.fetchone()[0]
+
+def seconds_until_next_due(cursor) -> Optional[float]:
+    cursor.execute("SELECT EXTRACT(EPOCH FROM MIN(not_before) - now()) FROM geocode_queue")
+    row = cursor.fetchone()
+    return float(row[0]) if row and row[0] is not None else None
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# googlenewsmap.py
+#
+# Gemeinsamer Einstiegspunkt der Batch-Skripte, z. B. für Cronjobs; der Exit-Code ist 1, wenn
+# der Befehl fehlgeschlagen ist, und 2 bei falschem Aufruf. Importiert wird nur das
+# Modul des gewählten Befehls und damit nur dessen Abhängigkeiten; der Connection Pool
+# entsteht erst bei der ersten Datenbankabfrage (db_connection.init_pool).
+# Aufruf aus assets/:
+#   python -m googlenewsmap ingest [--workers 4]
+#   python -m googlenewsmap geocode [--worker] [--backfill]
+#   python -m googlenewsmap add-feed <topic_code> <topic_name> [<topic_code> <topic_name> ...]
+#   python -m googlenewsmap import-countries [data/country_iso_codes.csv]
+# Startzeiten je Befehl: python -m benchmarks.bench_startup
+
+import importlib
+import sys
+
+from logging_config import setup_logging
+
+PROG = "googlenewsmap"
+
+# Befehl -> (Modul mit run(argv), Beschreibung)
+COMMANDS = {
+    "ingest": ("parse_feeds", "Alle Feeds abrufen und neue Artikel speichern"),
+    "geocode": ("geocode_publishers", "Publisher geokodieren oder die Geocoding-Queue abarbeiten"),
+    "add-feed": ("add_feed", "Feeds eines Themas für alle Länder anlegen"),
+    "import-countries": ("scripts.import_countries", "Länderliste importieren"),
+}
+
+def usage() -> str:
+    lines = [f"Verwendung: python -m {PROG} <befehl> [optionen]", "", "Befehle:"]
+    lines += [f"  {name:<18}{description}" for name, (_, description) in COMMANDS.items()]
+    lines += ["", f"Optionen eines Befehls: python -m {PROG} <befehl> --help"]
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Unbekannter Befehl: {command}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    # Vor dem Import des Befehls, dessen Module Logger nur anlegen
+    setup_logging()
+    # argparse des Befehls zeigt in Hilfe und Fehlermeldungen den vollständigen Aufruf
+    sys.argv = [f"{PROG} {command}", *rest]
+    module = importlib.import_module(COMMANDS[command][0])
+    try:
+        # run() gibt den Exit-Code zurück, z. B. 1 für einen abgebrochenen Import
+        exit_code = module.run(rest)
+    finally:
+        # Nur wenn der Befehl db_connection überhaupt geladen hat
+        db_connection = sys.modules.get("db_connection")
+        if db_connection:
+            db_connection.close_all_connections()
+    return exit_code or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
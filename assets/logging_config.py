@@ -1,12 +1,80 @@
 # logging_config.py
 
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import defaultdict
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,  # Setzen Sie dies auf INFO oder WARNING in der Produktion
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler()
-        ]
-    )
+# Konfiguration über Umgebungsvariablen:
+#   LOG_LEVEL        DEBUG, INFO (Standard), WARNING, ...
+#   LOG_FORMAT       text (Standard) oder json
+#   LOG_ASYNC        1 = Ausgabe über einen Hintergrund-Thread (QueueHandler/QueueListener)
+#   LOG_SAMPLE_EVERY nur jede N-te Meldung pro Artikel/Zeile ausgeben (Standard 100)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+
+_sample_every = max(1, int(os.getenv('LOG_SAMPLE_EVERY', '100')))
+_sample_counts = defaultdict(int)
+# Ingest- und API-Threads zählen gleichzeitig
+_sample_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def setup_logging(level=None):
+    """
+    Konfiguriert das Root-Logging einmal pro Prozess; weitere Aufrufe sind wirkungslos.
+    Nur von Einstiegspunkten aufzurufen (googlenewsmap.main, server.main, __main__-Blöcke),
+    Module legen lediglich ihre Logger an.
+    """
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+        level = level or os.getenv('LOG_LEVEL', 'INFO').upper()
+        handler = logging.StreamHandler()
+        if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        if os.getenv('LOG_ASYNC', '0') == '1':
+            # Formatierung und Schreiben erfolgen im Listener-Thread
+            log_queue = queue.SimpleQueue()
+            _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+            handler = logging.handlers.QueueHandler(log_queue)
+
+        logging.basicConfig(level=level, handlers=[handler], force=True)
+
+def log_sampled(logger, level, msg, *args):
+    """
+    Für Meldungen pro Artikel oder Zeile: gibt nur jede LOG_SAMPLE_EVERY-te Meldung
+    eines Formatstrings aus. Ist der Level deaktiviert, entstehen keine Kosten.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    with _sample_lock:
+        _sample_counts[msg] += 1
+        count = _sample_counts[msg]
+    if count % _sample_every == 1 or _sample_every == 1:
+        logger.log(level, msg + ' (%s. Vorkommen)', *args, count)
@@ -1,12 +1,16 @@
 # api/main.py
 
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+import asyncio
 import logging
+import os
+import time
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 from api.schemas import (
-    ArticleBase,
     NewsListResponse,
     NewsDetailResponse,
     PublisherBase,
@@ -17,35 +21,194 @@ from api.schemas import (
     LocationBase,
     PublisherWithArticles,
     PublishersArticlesListResponse,
+    StatsCountItem,
+    StatsCountResponse,
+    HeatmapPoint,
+    HeatmapResponse,
+    TrendSeries,
+    TrendResponse,
+    DeltaSyncResponse,
 )
 
-from db_connection import get_connection, return_connection
+from dimension_cache import dimension_cache
+from article_rollup import count_by, daily_trend
+from article_push import push_hub
+import vector_tiles
+from vector_tiles import filter_key, tile_cache
+from recent_index import recent_index
+from article_queries import (
+    build_article_filters,
+    execute_prepared,
+    prepare_common,
+    news_count_template,
+    news_page_template,
+    search_collapsed_page_template,
+    search_page_template,
+    changes_page_template,
+)
+from request_profiling import finish_profile, get_recent_profile, start_profile, token_valid
+from delta_sync import changed_publishers, current_token, next_token, parse_sync_token
+from db_connection import (
+    REPLICA_HOSTS,
+    PoolTimeout,
+    acquire_connection,
+    acquire_read_connection,
+    close_all_connections,
+    init_pool,
+    pool_settings,
+    return_connection,
+    set_pool_role,
+)
 from logging_config import setup_logging
+import metrics
 
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
-# Logging konfigurieren
-setup_logging()
 logger = logging.getLogger(__name__)
 
+def warm_up():
+    """
+    Läuft in jedem Worker-Prozess, bevor er Anfragen annimmt: eigenen Pool öffnen, auf allen
+    offenen Verbindungen die häufigsten Statements vorbereiten sowie Dimension-Cache und
+    Recent-Index laden. Ist die Datenbank nicht erreichbar, startet der Worker trotzdem und
+    lädt wie bisher bei den ersten Anfragen nach.
+    """
+    started = time.perf_counter()
+    init_pool('api')
+    connections = []
+    try:
+        for _ in range(pool_settings('api')[0]):
+            connections.append(acquire_connection())
+        for _ in range(pool_settings('read')[0] * len(REPLICA_HOSTS)):
+            connections.append(acquire_read_connection())
+        prepared = 0
+        for conn in connections:
+            with conn.cursor() as cursor:
+                prepared += prepare_common(cursor)
+            conn.commit()
+        dimension_cache.ensure_fresh(force=True)
+        recent_index.start(connections[0])
+        logger.info("Worker %s vorgewärmt: %s Verbindungen, %s Statements in %.2f s",
+                    os.getpid(), len(connections), prepared, time.perf_counter() - started)
+    except (Exception, psycopg2.DatabaseError) as e:
+        logger.error("Vorwärmen fehlgeschlagen, Worker startet kalt: %s", e)
+    finally:
+        for conn in connections:
+            return_connection(conn)
+
+# Gemeinsames Verzeichnis der Worker-Metriken, von server.py bei mehreren Workern gesetzt
+METRICS_DIR = os.getenv("API_METRICS_DIR")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Einstiegspunkt jedes Worker-Prozesses (server.py startet sie per spawn); mit einem
+    # Worker hat server.main das Logging bereits konfiguriert
+    setup_logging()
+    # Der Worker nimmt erst nach dem Vorwärmen Verbindungen an
+    warm_up()
+    if METRICS_DIR:
+        metrics.start_process_file_writer(METRICS_DIR)
+    yield
+    # Laufende Anfragen sind beendet (oder nach API_GRACEFUL_TIMEOUT abgebrochen)
+    if METRICS_DIR:
+        metrics.remove_process_file(METRICS_DIR)
+    close_all_connections()
+    logger.info("Worker %s beendet, Verbindungen geschlossen", os.getpid())
+
 app = FastAPI(
     title="News API",
     description="API für Nachrichten mit Georeferenzierung",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Dependency für den Datenbankzugriff
-def get_db():
-    conn = get_connection()
-    if not conn:
-        logger.error("Datenbankverbindung konnte nicht hergestellt werden")
+# Metriken
+API_REQUEST_SECONDS = metrics.Histogram('newsmap_api_request_seconds', 'Gesamtdauer einer API-Anfrage', ['endpoint', 'method', 'status'])
+API_DB_QUERY_SECONDS = metrics.Histogram('newsmap_api_db_query_seconds', 'Dauer der DB-Abfragen je Endpoint', ['endpoint'])
+API_SERIALIZATION_SECONDS = metrics.Histogram('newsmap_api_serialization_seconds', 'Aufbau der Antwortmodelle je Endpoint', ['endpoint'])
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # Der Router hinterlegt den Endpoint im Scope; so bleibt die Label-Kardinalität klein
+    endpoint = request.scope.get("endpoint")
+    API_REQUEST_SECONDS.observe(
+        elapsed,
+        endpoint=endpoint.__name__ if endpoint else "unmatched",
+        method=request.method,
+        status=response.status_code
+    )
+    # Von get_profile angelegt, wenn diese Anfrage profiliert wird
+    profile = getattr(request.state, "profile", None)
+    if profile is not None:
+        finish_profile(profile, elapsed, response.status_code)
+        # Stichproben landen nur im Log; Details bekommt nur, wer das Token mitschickt
+        if profile.trigger == "header":
+            response.headers["Server-Timing"] = profile.server_timing()
+            response.headers["X-Profile-Id"] = profile.id
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    # Mit mehreren Workern die Reihen aller Worker, sonst nur die dieses Prozesses
+    body = metrics.render_process_files(METRICS_DIR) if METRICS_DIR else metrics.render_metrics()
+    return PlainTextResponse(body, media_type=metrics.CONTENT_TYPE)
+
+# Pool-Vorgaben für den API-Prozess; der Pool selbst entsteht je Worker in warm_up()
+set_pool_role('api')
+
+def _connection_dependency(acquire):
+    try:
+        conn = acquire()
+    except PoolTimeout as e:
+        # Pool erschöpft: vorübergehende Überlast, kein Datenbankfehler
+        logger.warning("Keine freie Datenbankverbindung: %s", e)
+        raise HTTPException(status_code=503, detail="Datenbank ausgelastet, bitte erneut versuchen")
+    except (Exception, psycopg2.DatabaseError) as e:
+        logger.error("Datenbankverbindung konnte nicht hergestellt werden: %s", e)
         raise HTTPException(status_code=500, detail="Datenbankverbindung konnte nicht hergestellt werden")
     try:
         yield conn
     finally:
         return_connection(conn)
 
+# Dependency für Schreibzugriffe und alles, was den Primary braucht
+def get_db():
+    yield from _connection_dependency(acquire_connection)
+
+# Dependency für Lesezugriffe: Lese-Replica (DB_REPLICA_HOSTS), sonst Primary.
+# Mit "X-Read-Consistency: primary" liest ein Client seine eigenen Schreibzugriffe sofort.
+def get_read_db(
+    x_read_consistency: Optional[str] = Header(None, description="'primary' erzwingt Lesen vom Primary")
+):
+    consistency = (x_read_consistency or "replica").lower()
+    yield from _connection_dependency(lambda: acquire_read_connection(consistency))
+
+# Dependency für das Profiling: per Header X-Profile (API_PROFILE_TOKEN) oder per Stichprobe
+# (API_PROFILE_SAMPLE_RATE). Sonst ein Platzhalter, dessen Aufrufe nichts kosten.
+def get_profile(
+    request: Request,
+    x_profile: Optional[str] = Header(None, description="Admin-Token: Anfrage profilieren (Server-Timing, X-Profile-Id)")
+):
+    endpoint = request.scope.get("endpoint")
+    profile = start_profile(
+        endpoint.__name__ if endpoint else "unmatched", request.url.path, request.url.query, x_profile
+    )
+    if profile.enabled:
+        request.state.profile = profile
+    return profile
+
+def profiled_response(profile, response):
+    # Profilierte Anfragen serialisieren selbst, damit die Serialisierung messbar ist
+    if not profile.enabled:
+        return response
+    with profile.section("serialize"):
+        body = response.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
 @app.get("/api/v01/news", response_model=NewsListResponse)
 def get_news(
     keywords: Optional[str] = Query(None, description="Schlüsselwörter für die Suche"),
@@ -56,121 +219,133 @@ def get_news(
     date_to: Optional[datetime] = Query(None, description="Enddatum des Veröffentlichungszeitraums"),
     page: int = Query(1, ge=1, description="Seitenzahl"),
     page_size: int = Query(200, ge=1, le=1000, description="Anzahl der Artikel pro Seite"),
-    db: psycopg2.extensions.connection = Depends(get_db)
+    db: psycopg2.extensions.connection = Depends(get_read_db),
+    profile=Depends(get_profile)
 ):
     logger.debug("GET /news aufgerufen mit Parametern: keywords=%s, topics=%s, publishers=%s, country=%s, date_from=%s, date_to=%s, page=%s, page_size=%s",
                  keywords, topics, publishers, country, date_from, date_to, page, page_size)
     
     try:
-        with db.cursor(cursor_factory=RealDictCursor) as cursor:
-            query = """
-                SELECT 
-                    articles.id, articles.title, articles.link, articles.pub_date,
-                    publishers.id AS publisher_id, publishers.name AS publisher_name,
-                    topics.id AS topic_id, topics.topic_name AS topic_name,
-                    publishers.latitude, publishers.longitude, publishers.country_id, publishers.city,
-                    countries.country_name, countries.iso_code
-                FROM articles
-                JOIN publishers ON articles.publisher_id = publishers.id
-                JOIN feeds ON articles.feed_id = feeds.id
-                JOIN topics ON feeds.topic_id = topics.id
-                JOIN countries ON publishers.country_id = countries.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if keywords:
-                query += " AND articles.title ILIKE %s"
-                keyword_param = f"%{keywords}%"
-                params.extend([keyword_param])
-                logger.debug("Filter angewendet: keywords=%s", keywords)
-            
-            if topics:
-                query += " AND articles.topic_id = ANY(%s)"
-                params.append(topics)
-                logger.debug("Filter angewendet: topics=%s", topics)
-            
-            if publishers:
-                query += " AND articles.publisher_id = ANY(%s)"
-                params.append(publishers)
-                logger.debug("Filter angewendet: publishers=%s", publishers)
-            
-            if country:
-                query += " AND countries.iso_code ILIKE %s"
-                params.append(country)
-                logger.debug("Filter angewendet: country=%s", country)
-            
-            if date_from:
-                query += " AND articles.pub_date >= %s"
-                params.append(date_from)
-                logger.debug("Filter angewendet: date_from=%s", date_from)
-            
-            if date_to:
-                query += " AND articles.pub_date <= %s"
-                params.append(date_to)
-                logger.debug("Filter angewendet: date_to=%s", date_to)
-            
-            # Zählen der Gesamtanzahl
-            count_query = "SELECT COUNT(*) FROM (" + query + ") AS count_table"
-            cursor.execute(count_query, params)
-            total = cursor.fetchone()['count']
-            logger.debug("Gesamtanzahl der gefundenen Artikel: %s", total)
+        dimension_cache.ensure_fresh()
+        # Jede Filterkombination entspricht einem vorbereiteten Statement pro Verbindung
+        article_filter = build_article_filters(
+            dimension_cache, keywords, topics, publishers, country, date_from, date_to
+        )
+        logger.debug("Filterkombination: %s", news_page_template(article_filter.mask).name)
+
+        # Standardansicht (jüngste Artikel) aus dem Speicher, sonst wie bisher per SQL;
+        # die Dauer misst recent_index selbst (newsmap_recent_index_query_seconds)
+        with profile.section("recent_index"):
+            recent = recent_index.query(db, article_filter, (page - 1) * page_size, page_size)
+        if recent is not None:
+            total, articles = recent
+            logger.debug("Aus dem Recent-Index: %s von %s Artikeln", len(articles), total)
+        else:
+            with db.cursor(cursor_factory=RealDictCursor) as cursor:
+                # Zählen der Gesamtanzahl
+                with API_DB_QUERY_SECONDS.time(endpoint='get_news'), profile.section("query"):
+                    execute_prepared(cursor, news_count_template(article_filter.mask), article_filter.values)
+                    total = cursor.fetchone()['count']
+                logger.debug("Gesamtanzahl der gefundenen Artikel: %s", total)
+                profile.record_query(cursor, news_count_template(article_filter.mask), article_filter.values)
             
-            # Hinzufügen von Sortierung, Paginierung
-            query += " ORDER BY articles.pub_date DESC OFFSET %s LIMIT %s"
-            params.extend([(page - 1) * page_size, page_size])
-            logger.debug("Pagination angewendet: page=%s, page_size=%s", page, page_size)
+                # Sortierung und Paginierung sind Teil des Templates
+                params = article_filter.values + ((page - 1) * page_size, page_size)
+                logger.debug("Pagination angewendet: page=%s, page_size=%s", page, page_size)
             
-            cursor.execute(query, params)
-            articles = cursor.fetchall()
-            logger.debug("Anzahl der zurückgegebenen Artikel: %s", len(articles))
+                with API_DB_QUERY_SECONDS.time(endpoint='get_news'), profile.section("query"):
+                    execute_prepared(cursor, news_page_template(article_filter.mask), params)
+                    articles = cursor.fetchall()
+                logger.debug("Anzahl der zurückgegebenen Artikel: %s", len(articles))
+                profile.record_query(cursor, news_page_template(article_filter.mask), params)
             
-            # Umwandeln der Ergebnisse in die gewünschte Struktur
-            items = []
-            for article in articles:
-                logger.debug("Verarbeiteter Artikel: %s", article)
-                
-                location = LocationBase(
-                    latitude=article['latitude'],
-                    longitude=article['longitude'],
-                    country=article['country_name'],
-                    city=article['city']
-                )
-                
-                publisher = PublisherBase(
-                    id=article['publisher_id'],
-                    name=article['publisher_name'],
-                    location=location
-                )
-                
-                topic = TopicBase(
-                    id=article['topic_id'],
-                    topic_name=article['topic_name']
-                )
-                
-                article_base = ArticleBase(
-                    id=article['id'],
-                    title=article['title'],
-                    link=article['link'],
-                    pub_date=article['pub_date'],
-                    publisher=publisher,
-                    topic=topic
-                )
-                
-                items.append(article_base)
+        # Umwandeln der Ergebnisse in die gewünschte Struktur
+        serialization_started = time.perf_counter()
+        with profile.section("hydrate"):
+            items = dimension_cache.hydrate_articles(articles)
             
-            return NewsListResponse(
+            response = NewsListResponse(
                 total=total,
                 page=page,
                 page_size=page_size,
                 items=items
             )
+        API_SERIALIZATION_SECONDS.observe(time.perf_counter() - serialization_started, endpoint='get_news')
+        return profiled_response(profile, response)
     except Exception as e:
         logger.error("Fehler beim Abrufen der Nachrichten: %s", e)
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
+@app.get("/api/v01/news/changes", response_model=DeltaSyncResponse)
+def get_news_changes(
+    since: Optional[str] = Query(None, description="sync_token der vorigen Antwort; ohne Token nur der aktuelle Stand"),
+    keywords: Optional[str] = Query(None, description="Schlüsselwörter für die Suche"),
+    topics: Optional[List[int]] = Query(None, description="Themen-IDs zum Filtern"),
+    publishers: Optional[List[int]] = Query(None, description="Publisher-IDs zum Filtern"),
+    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern"),
+    date_from: Optional[datetime] = Query(None, description="Startdatum des Veröffentlichungszeitraums"),
+    date_to: Optional[datetime] = Query(None, description="Enddatum des Veröffentlichungszeitraums"),
+    limit: int = Query(1000, ge=1, le=5000, description="Maximale Anzahl Artikel pro Antwort"),
+    db: psycopg2.extensions.connection = Depends(get_read_db)
+):
+    """
+    Delta-Synchronisation: nur die seit `since` neuen oder geänderten Artikel (gleiche Filter
+    wie /news) und Publisher (z. B. neue Koordinaten) plus ein neues Token.
+    Artikel können wiederholt geliefert werden und sind per id zu aktualisieren.
+    Bei has_more sofort mit dem neuen Token erneut abfragen.
+    """
+    logger.debug("GET /news/changes aufgerufen mit since=%s", since)
+
+    try:
+        token = parse_sync_token(since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if token is None:
+            with db.cursor() as cursor:
+                token = current_token(cursor)
+            return DeltaSyncResponse(sync_token=token.encode(), has_more=False, items=[], publishers=[])
+
+        dimension_cache.ensure_fresh()
+        article_filter = build_article_filters(
+            dimension_cache, keywords, topics, publishers, country, date_from, date_to
+        )
+        params = article_filter.values + (token.article_cursor, limit)
+        with db.cursor(cursor_factory=RealDictCursor) as cursor:
+            with API_DB_QUERY_SECONDS.time(endpoint='get_news_changes'):
+                execute_prepared(cursor, changes_page_template(article_filter.mask), params)
+                rows = cursor.fetchall()
+        with db.cursor() as cursor:
+            country_id = (dimension_cache.country_id(country) or -1) if country else None
+            with API_DB_QUERY_SECONDS.time(endpoint='get_news_changes'):
+                publisher_rows = changed_publishers(cursor, token.publisher_cursor, country_id, limit)
+
+        # Geänderte Publisher müssen im Cache bereits ihren neuen Stand haben
+        if publisher_rows:
+            dimension_cache.ensure_fresh(force=True)
+        items = dimension_cache.hydrate_articles(rows)
+        changed = [dimension_cache.publishers[pid] for pid, _ in publisher_rows if pid in dimension_cache.publishers]
+
+        new_token = next_token(
+            token,
+            [row['change_version'] for row in rows],
+            [version for _, version in publisher_rows],
+            articles_truncated=len(rows) == limit,
+            publishers_truncated=len(publisher_rows) == limit,
+        )
+        return DeltaSyncResponse(
+            sync_token=new_token.encode(),
+            has_more=len(rows) == limit or len(publisher_rows) == limit,
+            items=items,
+            publishers=changed
+        )
+    except Exception as e:
+        logger.error("Fehler bei der Delta-Synchronisation: %s", e)
+        raise HTTPException(status_code=500, detail="Interner Serverfehler")
+
 @app.get("/api/v01/news/{article_id}", response_model=NewsDetailResponse)
-def get_news_detail(article_id: int, db: psycopg2.extensions.connection = Depends(get_db)):
+def get_news_detail(article_id: int, db: psycopg2.extensions.connection = Depends(get_read_db)):
     logger.debug("GET /news/%s aufgerufen", article_id)
     
     try:
@@ -197,6 +372,17 @@ def get_news_detail(article_id: int, db: psycopg2.extensions.connection = Depend
                 raise HTTPException(status_code=404, detail="Artikel nicht gefunden")
             
             logger.debug("Artikel gefunden: %s", article)
+
+            # Alle Themen, in deren Feeds der Artikel erschienen ist
+            cursor.execute("""
+                SELECT DISTINCT topics.topic_name
+                FROM article_feeds
+                JOIN feeds ON article_feeds.feed_id = feeds.id
+                JOIN topics ON feeds.topic_id = topics.id
+                WHERE article_feeds.article_id = %s
+                ORDER BY topics.topic_name
+            """, (article_id,))
+            all_topics = [row['topic_name'] for row in cursor.fetchall()]
             
             location = LocationBase(
                 latitude=article['latitude'],
@@ -223,7 +409,7 @@ def get_news_detail(article_id: int, db: psycopg2.extensions.connection = Depend
                 "pub_date": article['pub_date'],
                 "publisher": publisher,
                 "topic": topic,
-                "additional_info": {}  # Falls weitere Informationen vorhanden sind
+                "additional_info": {"topics": all_topics}
             }
             
             return NewsDetailResponse(**item)
@@ -232,73 +418,43 @@ def get_news_detail(article_id: int, db: psycopg2.extensions.connection = Depend
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
 @app.get("/api/v01/topics", response_model=TopicListResponse)
-def get_topics(db: psycopg2.extensions.connection = Depends(get_db)):
+def get_topics():
+    # Aus dem Dimension-Cache, ohne Verbindung aus dem Pool
     logger.debug("GET /topics aufgerufen")
     
     try:
-        with db.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute("SELECT id, topic_name FROM topics ORDER BY topic_name ASC")
-            topics = cursor.fetchall()
-            logger.debug("Anzahl der zurückgegebenen Themen: %s", len(topics))
-            return TopicListResponse(items=topics)
+        dimension_cache.ensure_fresh()
+        topics = dimension_cache.sorted_topics()
+        logger.debug("Anzahl der zurückgegebenen Themen: %s", len(topics))
+        return TopicListResponse(items=topics)
     except Exception as e:
         logger.error("Fehler beim Abrufen der Themen: %s", e)
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
 @app.get("/api/v01/publishers", response_model=PublisherListResponse)
 def get_publishers(
-    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern"),
-    db: psycopg2.extensions.connection = Depends(get_db)
+    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern")
 ):
+    # Aus dem Dimension-Cache, ohne Verbindung aus dem Pool
     logger.debug("GET /publishers aufgerufen mit country=%s", country)
     
     try:
-        with db.cursor(cursor_factory=RealDictCursor) as cursor:
-            query = """
-                SELECT 
-                    publishers.id, publishers.name, publishers.latitude, publishers.longitude,
-                    publishers.country_id, publishers.city,
-                    countries.country_name, countries.iso_code
-                FROM publishers
-                JOIN countries ON publishers.country_id = countries.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if country:
-                query += " AND countries.iso_code ILIKE %s"
-                params.append(country)
-                logger.debug("Filter angewendet: country=%s", country)
-            
-            query += " ORDER BY publishers.name ASC"
-            cursor.execute(query, params)
-            publishers = cursor.fetchall()
-            logger.debug("Anzahl der zurückgegebenen Publisher: %s", len(publishers))
-            
-            items = []
-            for publisher in publishers:
-                location = LocationBase(
-                    latitude=publisher['latitude'],
-                    longitude=publisher['longitude'],
-                    country=publisher['country_name'],
-                    city=publisher['city']
-                )
-                
-                publisher_base = PublisherBase(
-                    id=publisher['id'],
-                    name=publisher['name'],
-                    location=location
-                )
-                
-                items.append(publisher_base)
-            
-            return PublisherListResponse(items=items)
+        dimension_cache.ensure_fresh()
+        if country:
+            country_id = dimension_cache.country_id(country)
+            items = dimension_cache.sorted_publishers(country_id) if country_id is not None else []
+            logger.debug("Filter angewendet: country=%s", country)
+        else:
+            items = dimension_cache.sorted_publishers()
+        logger.debug("Anzahl der zurückgegebenen Publisher: %s", len(items))
+        
+        return PublisherListResponse(items=items)
     except Exception as e:
         logger.error("Fehler beim Abrufen der Publisher: %s", e)
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
 @app.get("/api/v01/search/autocomplete", response_model=AutocompleteResponse)
-def autocomplete_search(q: str = Query(..., min_length=1, description="Eingabewort für Autocomplete"), db: psycopg2.extensions.connection = Depends(get_db)):
+def autocomplete_search(q: str = Query(..., min_length=1, description="Eingabewort für Autocomplete"), db: psycopg2.extensions.connection = Depends(get_read_db)):
     logger.debug("GET /search/autocomplete aufgerufen mit q=%s", q)
     
     try:
@@ -329,6 +485,53 @@ def autocomplete_search(q: str = Query(..., min_length=1, description="Eingabewo
         logger.error("Fehler beim Autocomplete: %s", e)
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
+# Abstand der Keepalive-Kommentare im Live-Stream (Sekunden), hält Proxys die Verbindung offen
+STREAM_HEARTBEAT_SECONDS = 15
+
+@app.get("/api/v01/search/stream")
+async def stream_search(
+    request: Request,
+    keywords: Optional[str] = Query(None, description="Schlüsselwörter für die Suche"),
+    topics: Optional[List[int]] = Query(None, description="Themen-IDs zum Filtern"),
+    publishers: Optional[List[int]] = Query(None, description="Publisher-IDs zum Filtern"),
+    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern"),
+    date_from: Optional[datetime] = Query(None, description="Startdatum des Veröffentlichungszeitraums"),
+    date_to: Optional[datetime] = Query(None, description="Enddatum des Veröffentlichungszeitraums"),
+):
+    """
+    Server-Sent Events mit neu gespeicherten Artikeln, gefiltert wie /search.
+    Ereignisse: "articles" (JSON-Liste von Artikeln) und "resync" (Client war zu langsam
+    und sollte /search neu laden). Ersetzt das wiederholte Abfragen von /search.
+    """
+    logger.debug("GET /search/stream aufgerufen mit topics=%s, publishers=%s, country=%s", topics, publishers, country)
+    subscription = push_hub.subscribe(
+        asyncio.get_running_loop(),
+        keywords=keywords, topics=topics, publishers=publishers,
+        country=country, date_from=date_from, date_to=date_to
+    )
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.lagging:
+                    subscription.lagging = False
+                    yield "event: resync\ndata: {}\n\n"
+                yield message
+        finally:
+            push_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/v01/search", response_model=PublishersArticlesListResponse)
 def search_news(
     keywords: Optional[str] = Query(None, description="Schlüsselwörter für die Suche"),
@@ -339,7 +542,9 @@ def search_news(
     date_to: Optional[datetime] = Query(None, description="Enddatum des Veröffentlichungszeitraums"),
     page: int = Query(1, ge=1, description="Seitenzahl"),
     page_size: int = Query(200, ge=1, le=1000, description="Anzahl der Artikel pro Seite"),
-    db: psycopg2.extensions.connection = Depends(get_db)
+    collapse_stories: bool = Query(False, description="Nur einen Artikel je Story-Cluster, mit Anzahl"),
+    db: psycopg2.extensions.connection = Depends(get_read_db),
+    profile=Depends(get_profile)
 ):
     """
     Sucht nach Artikeln anhand verschiedener Filter und gruppiert sie nach Publisher.
@@ -349,112 +554,49 @@ def search_news(
                  keywords, topics, publishers, country, date_from, date_to, page, page_size)
 
     try:
-        with db.cursor(cursor_factory=RealDictCursor) as cursor:
-            # 1) Gleicher Start wie bei /news, nur ohne finalen COUNT.
-            query = """
-                SELECT 
-                    articles.id AS article_id,
-                    articles.title AS article_title,
-                    articles.link AS article_link,
-                    articles.pub_date AS article_pub_date,
-                    publishers.id AS publisher_id,
-                    publishers.name AS publisher_name,
-                    publishers.latitude,
-                    publishers.longitude,
-                    publishers.country_id,
-                    publishers.city,
-                    countries.country_name,
-                    countries.iso_code,
-                    topics.id AS topic_id,
-                    topics.topic_name AS topic_name
-                FROM articles
-                JOIN publishers ON articles.publisher_id = publishers.id
-                JOIN feeds ON articles.feed_id = feeds.id
-                JOIN topics ON feeds.topic_id = topics.id
-                JOIN countries ON publishers.country_id = countries.id
-                WHERE 1=1
-            """
-            params = []
+        # 1) Gleiche Filter wie bei /news, nur ohne finalen COUNT.
+        dimension_cache.ensure_fresh()
+        article_filter = build_article_filters(
+            dimension_cache, keywords, topics, publishers, country, date_from, date_to
+        )
+        params = article_filter.values + ((page - 1) * page_size, page_size)
+        # Mit collapse_stories fasst SQL die Story-Cluster vor der Pagination zusammen
+        if collapse_stories:
+            template = search_collapsed_page_template(article_filter.mask)
+        else:
+            template = search_page_template(article_filter.mask)
 
-            if keywords:
-                query += " AND articles.title ILIKE %s"
-                keyword_param = f"%{keywords}%"
-                params.append(keyword_param)
-            
-            if topics:
-                query += " AND topics.id = ANY(%s)"
-                params.append(topics)
-            
-            if publishers:
-                query += " AND articles.publisher_id = ANY(%s)"
-                params.append(publishers)
-            
-            if country:
-                query += " AND countries.iso_code ILIKE %s"
-                params.append(country)
-            
-            if date_from:
-                query += " AND articles.pub_date >= %s"
-                params.append(date_from)
-            
-            if date_to:
-                query += " AND articles.pub_date <= %s"
-                params.append(date_to)
-
-            # Hinzufügen von Sortierung, Paginierung
-            query += " ORDER BY (publishers.latitude IS NULL) ASC, articles.pub_date DESC OFFSET %s LIMIT %s"
-            params.extend([(page - 1) * page_size, page_size])
-
-            # 2) Hole alle passenden Datensätze
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-
-            logger.debug("Anzahl der gefundenen Datensätze vor Gruppierung: %s", len(rows))
-
-            # 3) Gruppierung nach Publisher
-            #    Key = publisher_id, Value = { "publisher": PublisherBase, "articles": [ArticleBase...] }
-            grouped = {}
-
-            for row in rows:
-                pub_id = row["publisher_id"]
-                
-                # Publisher-Objekt erzeugen (wird für jeden Artikel identisch sein)
-                location = LocationBase(
-                    latitude=row['latitude'],
-                    longitude=row['longitude'],
-                    country=row['country_name'],
-                    city=row['city']
-                )
-                publisher_obj = PublisherBase(
-                    id=row['publisher_id'],
-                    name=row['publisher_name'],
-                    location=location
-                )
+        # 2) Hole alle passenden Datensätze
+        with db.cursor(cursor_factory=RealDictCursor) as cursor:
+            with API_DB_QUERY_SECONDS.time(endpoint='search_news'), profile.section("query"):
+                execute_prepared(cursor, template, params)
+                rows = cursor.fetchall()
+            profile.record_query(cursor, template, params)
 
-                # Topic-Objekt
-                topic_obj = TopicBase(
-                    id=row['topic_id'],
-                    topic_name=row['topic_name']
-                )
+        logger.debug("Anzahl der gefundenen Datensätze vor Gruppierung: %s", len(rows))
 
-                # Artikel-Objekt
-                article_obj = ArticleBase(
-                    id=row['article_id'],
-                    title=row['article_title'],
-                    link=row['article_link'],
-                    pub_date=row['article_pub_date'],
-                    publisher=publisher_obj,
-                    topic=topic_obj
-                )
+        # 3) Gruppierung nach Publisher
+        #    Key = publisher_id, Value = { "publisher": PublisherBase, "articles": [ArticleBase...] }
+        #    Publisher- und Themenobjekte stammen aus dem Dimension-Cache
+        serialization_started = time.perf_counter()
+        grouped = {}
 
+        with profile.section("hydrate"):
+            articles = dimension_cache.hydrate_articles(rows)
+        with profile.section("group"):
+            for article_obj in articles:
+                # Ohne Publisher (unbekannt im Dimension-Cache) keine Gruppe
+                if article_obj.publisher is None:
+                    continue
+                pub_id = article_obj.publisher.id
                 if pub_id not in grouped:
                     grouped[pub_id] = {
-                        "publisher": publisher_obj,
+                        "publisher": article_obj.publisher,
                         "articles": []
                     }
-                
-                grouped[pub_id]["articles"].append(article_obj)
             
+                grouped[pub_id]["articles"].append(article_obj)
+        
             # 4) Gesamte Anzahl passender Artikel
             total_articles = sum(len(g["articles"]) for g in grouped.values())
             # 5) Sortierung der Publisher-Gruppen kann optional sein, z. B. nach Publisher-Name
@@ -477,13 +619,171 @@ def search_news(
                     )
                 )
 
-            return PublishersArticlesListResponse(
+            response = PublishersArticlesListResponse(
                 total_publishers=len(grouped_values),  # Gesamtanzahl Publisher
                 total_articles=total_articles,         # Gesamtanzahl Artikel
                 page=page,
                 page_size=page_size,
                 items=items
             )
+        API_SERIALIZATION_SECONDS.observe(time.perf_counter() - serialization_started, endpoint='search_news')
+        return profiled_response(profile, response)
     except Exception as e:
         logger.error("Fehler beim /api/v01/search: %s", e)
-        raise HTTPException(status_code=500, detail="Interner Serverfehler")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Interner Serverfehler")
+
+# Statistik-Endpoints: lesen nur die Tageszähler in article_daily_counts,
+# ihre Kosten hängen daher nicht von der Größe der Tabelle articles ab.
+
+def _stats_filters(topics, publishers, country):
+    return {
+        "topic_ids": topics,
+        "publisher_ids": publishers,
+        # Unbekannter Ländercode: keine Treffer
+        "country_id": (dimension_cache.country_id(country) or -1) if country else None,
+    }
+
+def _dimension_name(group_by: str, key: int) -> Optional[str]:
+    if group_by == "country":
+        country = dimension_cache.countries.get(key)
+        return country[0] if country else None
+    if group_by == "topic":
+        topic = dimension_cache.topics.get(key)
+        return topic.topic_name if topic else None
+    publisher = dimension_cache.publishers.get(key)
+    return publisher.name if publisher else None
+
+@app.get("/api/v01/stats/counts", response_model=StatsCountResponse)
+def get_stats_counts(
+    group_by: str = Query("country", pattern="^(country|topic|publisher)$", description="Gruppierung: country, topic oder publisher"),
+    days: int = Query(7, ge=1, le=365, description="Zeitraum in Tagen bis einschließlich heute"),
+    topics: Optional[List[int]] = Query(None, description="Themen-IDs zum Filtern"),
+    publishers: Optional[List[int]] = Query(None, description="Publisher-IDs zum Filtern"),
+    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern"),
+    limit: int = Query(50, ge=1, le=1000, description="Maximale Anzahl Gruppen"),
+    db: psycopg2.extensions.connection = Depends(get_read_db)
+):
+    """
+    Artikelzahlen je Land, Thema oder Publisher, z. B. die aktivsten Publisher der letzten Tage.
+    """
+    logger.debug("GET /stats/counts aufgerufen mit group_by=%s, days=%s", group_by, days)
+
+    try:
+        dimension_cache.ensure_fresh()
+        with db.cursor() as cursor:
+            with API_DB_QUERY_SECONDS.time(endpoint='get_stats_counts'):
+                rows = count_by(cursor, group_by, days, limit, **_stats_filters(topics, publishers, country))
+        items = [StatsCountItem(id=key, name=_dimension_name(group_by, key), count=count) for key, count in rows]
+        return StatsCountResponse(group_by=group_by, days=days, total=sum(item.count for item in items), items=items)
+    except Exception as e:
+        logger.error("Fehler beim Abrufen der Artikelzahlen: %s", e)
+        raise HTTPException(status_code=500, detail="Interner Serverfehler")
+
+@app.get("/api/v01/stats/heatmap", response_model=HeatmapResponse)
+def get_stats_heatmap(
+    days: int = Query(7, ge=1, le=365, description="Zeitraum in Tagen bis einschließlich heute"),
+    topics: Optional[List[int]] = Query(None, description="Themen-IDs zum Filtern"),
+    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern"),
+    limit: int = Query(5000, ge=1, le=50000, description="Maximale Anzahl Punkte"),
+    db: psycopg2.extensions.connection = Depends(get_read_db)
+):
+    """
+    Gewichtete Punkte für eine Heatmap: Artikelzahl je Publisher an dessen Standort.
+    Publisher ohne Koordinaten werden ausgelassen.
+    """
+    logger.debug("GET /stats/heatmap aufgerufen mit days=%s", days)
+
+    try:
+        dimension_cache.ensure_fresh()
+        with db.cursor() as cursor:
+            with API_DB_QUERY_SECONDS.time(endpoint='get_stats_heatmap'):
+                rows = count_by(cursor, "publisher", days, limit, **_stats_filters(topics, None, country))
+        points = []
+        for publisher_id, count in rows:
+            publisher = dimension_cache.publishers.get(publisher_id)
+            location = publisher.location if publisher else None
+            if location is None or location.latitude is None or location.longitude is None:
+                continue
+            points.append(HeatmapPoint(
+                publisher_id=publisher_id,
+                latitude=location.latitude,
+                longitude=location.longitude,
+                weight=count
+            ))
+        return HeatmapResponse(days=days, max_weight=max((p.weight for p in points), default=0), points=points)
+    except Exception as e:
+        logger.error("Fehler beim Abrufen der Heatmap: %s", e)
+        raise HTTPException(status_code=500, detail="Interner Serverfehler")
+
+@app.get("/api/v01/stats/trend", response_model=TrendResponse)
+def get_stats_trend(
+    days: int = Query(30, ge=1, le=365, description="Zeitraum in Tagen bis einschließlich heute"),
+    group_by: Optional[str] = Query(None, pattern="^(country|topic|publisher)$", description="Optional eine Reihe je Land, Thema oder Publisher"),
+    topics: Optional[List[int]] = Query(None, description="Themen-IDs zum Filtern"),
+    publishers: Optional[List[int]] = Query(None, description="Publisher-IDs zum Filtern"),
+    country: Optional[str] = Query(None, description="ISO-Ländercode zum Filtern"),
+    limit: int = Query(10, ge=1, le=100, description="Maximale Anzahl Reihen bei group_by"),
+    db: psycopg2.extensions.connection = Depends(get_read_db)
+):
+    """
+    Tägliche Artikelzahlen für Sparklines, als Gesamtreihe oder je Gruppe.
+    """
+    logger.debug("GET /stats/trend aufgerufen mit days=%s, group_by=%s", days, group_by)
+
+    try:
+        dimension_cache.ensure_fresh()
+        with db.cursor() as cursor:
+            with API_DB_QUERY_SECONDS.time(endpoint='get_stats_trend'):
+                day_list, series = daily_trend(
+                    cursor, days, group_by, limit, **_stats_filters(topics, publishers, country)
+                )
+        items = [
+            TrendSeries(id=key, name=_dimension_name(group_by, key) if group_by else None, counts=counts)
+            for key, counts in series.items()
+        ]
+        # Stärkste Reihe zuerst
+        items.sort(key=lambda item: sum(item.counts), reverse=True)
+        return TrendResponse(days=day_list, series=items)
+    except Exception as e:
+        logger.error("Fehler beim Abrufen des Trends: %s", e)
+        raise HTTPException(status_code=500, detail="Interner Serverfehler")
+
+@app.get("/api/v01/tiles/{z}/{x}/{y}.mvt", response_class=Response)
+def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    topics: Optional[List[int]] = Query(None, description="Themen-IDs zum Filtern"),
+    date_from: Optional[date] = Query(None, description="Erster Tag des Zeitraums (UTC)"),
+    date_to: Optional[date] = Query(None, description="Letzter Tag des Zeitraums (UTC)"),
+    # Vom Primary: die Invalidierung folgt dessen Commits, eine nachlaufende Replica
+    # würde veraltete Kacheln bis zur nächsten Invalidierung in den Cache bringen
+    db: psycopg2.extensions.connection = Depends(get_db)
+):
+    """
+    Vektorkachel (Mapbox Vector Tile) mit einer Ebene "publishers": je Publisher ein Punkt
+    mit Artikelzahl, häufigstem Thema, Land und Stadt. Kacheln werden je Filter einmal
+    erzeugt und verworfen, sobald neue Artikel oder Standorte sie betreffen.
+    """
+    if not 0 <= z <= vector_tiles.MAX_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise HTTPException(status_code=400, detail="Ungültige Kachelkoordinaten")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from liegt nach date_to")
+
+    try:
+        with API_DB_QUERY_SECONDS.time(endpoint='get_tile'):
+            tile = tile_cache.fetch(db, z, x, y, filter_key(topics, date_from, date_to))
+        return Response(content=tile, media_type=vector_tiles.MEDIA_TYPE)
+    except Exception as e:
+        logger.error("Fehler beim Erzeugen der Kachel %s/%s/%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail="Interner Serverfehler")
+
+@app.get("/api/v01/admin/profiles/{profile_id}", include_in_schema=False)
+def get_request_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    # Vollständiges Profil (inkl. EXPLAIN-Pläne und Replay-SQL) zur ID aus X-Profile-Id
+    if not token_valid(x_profile):
+        raise HTTPException(status_code=403, detail="Kein gültiges Profiling-Token")
+    entry = get_recent_profile(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden")
+    return entry
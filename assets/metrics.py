@@ -0,0 +1,307 @@
+# metrics.py
+
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Standard-Buckets in Sekunden, passend für HTTP- und DB-Latenzen
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Mehrere Prozesse hinter einem Port (server.py --workers N): Jeder Worker schreibt seine Werte
+# so oft in PROCESS_DIR, /metrics liefert alle mit dem Label worker="<pid>". Dateien, die
+# länger als PROCESS_FILE_MAX_AGE nicht geschrieben wurden, stammen von beendeten Workern.
+PROCESS_FILE_INTERVAL = float(os.getenv("METRICS_PROCESS_FILE_INTERVAL", "5"))
+PROCESS_FILE_MAX_AGE = 3 * PROCESS_FILE_INTERVAL
+
+_registry: List["Metric"] = []
+_registry_lock = threading.Lock()
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        """Zeilen im Prometheus-Textformat, ohne HELP und TYPE."""
+        return self.format_samples(self.snapshot())
+
+    @abstractmethod
+    def format_samples(self, values: dict, extra: str = "") -> List[str]:
+        """Zeilen für Werte wie aus snapshot(); extra ist ein zusätzliches Label, z. B. worker="12"."""
+
+    @abstractmethod
+    def snapshot(self) -> dict:
+        """Kopie der Werte je Labelkombination, für merge() in einem anderen Prozess."""
+
+    @abstractmethod
+    def merge(self, values: dict):
+        """Übernimmt die Werte aus snapshot() eines anderen Prozesses."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def format_samples(self, values, extra=""):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def merge(self, values):
+        # Ein Gauge beschreibt den Zustand des eigenen Prozesses (z. B. seines Pools); Summen
+        # über Prozesse wären bedeutungslos
+        pass
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Je Labelkombination: [Zähler je Bucket..., Summe, Anzahl]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def format_samples(self, values, extra=""):
+        lines = []
+        for key, state in values.items():
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                le = ",".join(filter(None, (extra, f'le="{_format_value(bound)}"')))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key, extra)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key, extra)} {state[-1]}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(state) for key, state in self._values.items()}
+
+    def merge(self, values):
+        with self._lock:
+            for key, other in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    self._values[key] = list(other)
+                else:
+                    self._values[key] = [mine + theirs for mine, theirs in zip(state, other)]
+
+def snapshot() -> Dict[str, dict]:
+    """
+    Werte aller Metriken dieses Prozesses, z. B. als Rückgabe eines Worker-Prozesses
+    an den Elternprozess, der sie mit merge_snapshot() übernimmt.
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+def merge_snapshot(values: Dict[str, dict]):
+    with _registry_lock:
+        by_name = {metric.name: metric for metric in _registry}
+    for name, metric_values in values.items():
+        metric = by_name.get(name)
+        if metric is not None:
+            metric.merge(metric_values)
+
+def render_metrics() -> str:
+    # Ausgabe im Prometheus-Textformat
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+def _process_file(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+def write_process_file(directory: str):
+    # Labelkombinationen (Tupel) als Listen, da JSON keine Tupel-Schlüssel kennt
+    values = {name: [[list(key), value] for key, value in metric_values.items()]
+              for name, metric_values in snapshot().items()}
+    path = _process_file(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(values, f)
+    os.replace(tmp_path, path)
+
+def remove_process_file(directory: str):
+    try:
+        os.remove(_process_file(directory, os.getpid()))
+    except OSError:
+        pass
+
+def start_process_file_writer(directory: str):
+    """
+    Schreibt die Metriken dieses Prozesses alle PROCESS_FILE_INTERVAL Sekunden nach
+    directory, damit /metrics jedes Workers sie ausliefern kann (render_process_files).
+    """
+    def write_forever():
+        while True:
+            try:
+                write_process_file(directory)
+            except OSError as e:
+                logger.error("Metrics could not be written to %s: %s", directory, e)
+            time.sleep(PROCESS_FILE_INTERVAL)
+
+    threading.Thread(target=write_forever, name="metrics-writer", daemon=True).start()
+
+def render_process_files(directory: str) -> str:
+    """
+    Metriken aller Worker aus directory im Prometheus-Textformat, je Reihe mit dem Label
+    worker="<pid>". Die eigenen Werte sind aktuell, die der anderen Worker höchstens
+    PROCESS_FILE_INTERVAL Sekunden alt.
+    """
+    write_process_file(directory)
+    workers = []
+    now = time.time()
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            if now - os.path.getmtime(path) > PROCESS_FILE_MAX_AGE:
+                os.remove(path)
+                continue
+            with open(path, encoding="utf-8") as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            # Gerade ersetzt oder entfernt
+            continue
+        workers.append((filename[:-len(".json")], values))
+
+    with _registry_lock:
+        metrics = list(_registry)
+    blocks = []
+    for metric in metrics:
+        lines = [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.kind}"]
+        for pid, values in workers:
+            metric_values = {tuple(key): value for key, value in values.get(metric.name, [])}
+            lines.extend(metric.format_samples(metric_values, f'worker="{_escape(pid)}"'))
+        blocks.append("\n".join(lines))
+    return "\n".join(blocks) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server_from_env():
+    """
+    Startet für langlebige Prozesse (Scheduler, Geocoding-Worker) einen /metrics-Server
+    in einem Hintergrund-Thread, sofern METRICS_PORT gesetzt ist.
+    """
+    port = os.getenv("METRICS_PORT")
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("", int(port)), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Metrics server listening on port %s", port)
+    return server
+
+def write_textfile_from_env():
+    """
+    Schreibt die Metriken einmaliger Läufe (Cronjobs) in die Datei aus METRICS_TEXTFILE,
+    z. B. für den Textfile-Collector des node_exporter.
+    """
+    path = os.getenv("METRICS_TEXTFILE")
+    if not path:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_metrics())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error("Metrics could not be written to %s: %s", path, e)
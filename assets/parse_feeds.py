@@ -1,29 +1,68 @@
 #!/usr/bin/env python3
 
+import argparse
 import logging
-import requests
-import xml.etree.ElementTree as ET
-from dateutil import parser as date_parser
-from db_connection import get_connection, return_connection
-from typing import Optional, Tuple, List
+import os
+import socket
+import sys
+import time
+from collections import Counter
+from geocode_queue import enqueue_publisher
+from article_dedup import canonical_url, title_hash
+from feed_parser import iter_response_items
+from date_parsing import parse_pub_date
+import metrics
+from logging_config import setup_logging, log_sampled
+from typing import Dict, Optional, Tuple, List
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger()
+# requests, psycopg2 und die davon abhängigen Module (db_connection, feed_health,
+# story_clustering, ...) werden erst in den Funktionen importiert, damit --help und
+# Argumentfehler ohne sie auskommen
+
+# Konfiguration
+CONFIG = {
+    'WORKERS': int(os.getenv('INGEST_WORKERS', '1')),  # Anzahl der Worker-Prozesse
+    'LEASE_SECONDS': int(os.getenv('INGEST_LEASE_SECONDS', '600')),  # Sperrdauer eines geclaimten Feeds
+    'CLAIM_BATCH_SIZE': 5,  # Feeds pro Claim-Abfrage
+    'FETCH_TIMEOUT': (float(os.getenv('FEED_CONNECT_TIMEOUT', '3.05')), float(os.getenv('FEED_READ_TIMEOUT', '10'))),
+    'FETCH_DEADLINE': float(os.getenv('FEED_FETCH_DEADLINE', '30')),  # Obergrenze für Abruf und Parsing eines Feeds
+    'CLUSTERING': os.getenv('INGEST_CLUSTERING', '1') == '1'  # Story-Clustering nach jedem Zyklus
+}
+
+logger = logging.getLogger(__name__)
+
+# Metriken
+FEED_FETCH_SECONDS = metrics.Histogram('newsmap_feed_fetch_seconds', 'Zeit bis zum Eintreffen der Feed-Antwort')
+FEED_PARSE_SECONDS = metrics.Histogram('newsmap_feed_parse_seconds', 'Zeit für Parsing und Dedup-Prüfung eines Feeds')
+FEED_DB_SECONDS = metrics.Histogram('newsmap_feed_db_seconds', 'Zeit für das Einfügen der Artikel eines Feeds')
+FEEDS_PROCESSED = metrics.Counter('newsmap_feeds_processed_total', 'Verarbeitete Feeds', ['outcome'])
+ARTICLES_INSERTED = metrics.Counter('newsmap_articles_inserted_total', 'Neu eingefügte Artikel')
+ARTICLES_DEDUPLICATED = metrics.Counter('newsmap_articles_deduplicated_total', 'Mit einem weiteren Feed verknüpfte, bereits gespeicherte Artikel')
+PUBLISHER_LOOKUPS = metrics.Counter('newsmap_publisher_lookups_total', 'Publisher-Auflösungen', ['result'])
+
+# Publisher-Name -> ID, damit bekannte Publisher keine DB-Abfrage mehr kosten
+_publisher_cache: Dict[str, int] = {}
 
 def parse_date(date_str: Optional[str]):
     if not date_str:
         return None
     try:
-        return date_parser.parse(date_str)
-    except Exception as e:
-        logger.error(f"Date parsing error for '{date_str}': {e}")
+        return parse_pub_date(date_str)
+    except ValueError as e:
+        logger.error("Date parsing error for '%s': %s", date_str, e)
         return None
 
 def get_or_create_publisher(publisher_name: str, country_id: int) -> Optional[int]:
+    from db_connection import get_connection, return_connection
+
     if not publisher_name:
         return None
 
+    publisher_id = _publisher_cache.get(publisher_name)
+    if publisher_id is not None:
+        PUBLISHER_LOOKUPS.inc(result='cache_hit')
+        return publisher_id
+
     conn = None
     cursor = None
     try:
@@ -34,6 +73,8 @@ def get_or_create_publisher(publisher_name: str, country_id: int) -> Optional[in
         cursor.execute("SELECT id FROM publishers WHERE name = %s", (publisher_name,))
         publisher = cursor.fetchone()
         if publisher:
+            PUBLISHER_LOOKUPS.inc(result='db_hit')
+            _publisher_cache[publisher_name] = publisher[0]
             return publisher[0]
 
         # Publisher ohne geografische Daten einfügen
@@ -42,14 +83,20 @@ def get_or_create_publisher(publisher_name: str, country_id: int) -> Optional[in
             VALUES (%s, %s)
             RETURNING id
         """, (publisher_name, country_id))
-        
+        publisher_id = cursor.fetchone()[0]
+
+        # Neuen Publisher für den Geocoding-Worker einreihen
+        enqueue_publisher(cursor, publisher_id)
+
         conn.commit()
-        return cursor.fetchone()[0]
+        PUBLISHER_LOOKUPS.inc(result='created')
+        _publisher_cache[publisher_name] = publisher_id
+        return publisher_id
 
     except Exception as e:
         if conn:
             conn.rollback()
-        logger.error(f"Publisher creation error for '{publisher_name}': {e}")
+        logger.error("Publisher creation error for '%s': %s", publisher_name, e)
         return None
     finally:
         if cursor:
@@ -57,12 +104,96 @@ def get_or_create_publisher(publisher_name: str, country_id: int) -> Optional[in
         if conn:
             return_connection(conn)
 
-def process_feed(feed):
+def insert_articles(cursor, feed_id: int, topic_id: int, articles_batch: List[Tuple]) -> Tuple[int, int]:
+    """
+    Speichert die Artikel eines Feeds feed-übergreifend nur einmal und verknüpft sie in
+    article_feeds mit dem Feed. Läuft in der Transaktion des Aufrufers.
+    Gibt (neu gespeicherte Artikel, neu verknüpfte vorhandene Artikel) zurück.
+    """
+    from psycopg2.extras import execute_values
+    from article_events import publish_new_articles
+    from article_rollup import record_article_counts
+
+    inserted = execute_values(cursor, """
+        INSERT INTO articles (title, link, canonical_url, title_hash, pub_date, publisher_id, feed_id)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING id
+    """, articles_batch, fetch=True)
+    inserted_ids = {row[0] for row in inserted}
+
+    # IDs aller Artikel des Batches auflösen, auch der schon von anderen Feeds gespeicherten
+    cursor.execute("""
+        SELECT id, canonical_url, publisher_id, title_hash, pub_date
+        FROM articles
+        WHERE canonical_url = ANY(%s)
+           OR (publisher_id = ANY(%s) AND title_hash = ANY(%s))
+    """, (
+        [article[2] for article in articles_batch],
+        list({article[5] for article in articles_batch if article[5] is not None}),
+        [article[3] for article in articles_batch],
+    ))
+    stored = cursor.fetchall()
+    by_url = {row[1]: row for row in stored}
+    by_title = {(row[2], row[3]): row for row in stored}
+    resolved = {}
+    for article in articles_batch:
+        row = by_url.get(article[2]) or by_title.get((article[5], article[3]))
+        if row:
+            resolved[row[0]] = row
+
+    linked = execute_values(cursor, """
+        INSERT INTO article_feeds (article_id, feed_id)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING article_id
+    """, [(article_id, feed_id) for article_id in sorted(resolved)], fetch=True)
+    newly_linked = {row[0] for row in linked} - inserted_ids
+
+    if newly_linked:
+        # Neue Verknüpfung ändert die Themen des Artikels: neue Änderungsnummer für
+        # /news/changes (data/db_article_versions.sql) und recent_index.catch_up
+        cursor.execute(
+            "UPDATE articles SET change_version = nextval('article_change_seq') WHERE id = ANY(%s)",
+            (sorted(newly_linked),)
+        )
+
+    # Tageszähler je Thema: vorhandene Artikel nur, wenn sie in diesem Thema neu sind
+    counted = set(inserted_ids)
+    if newly_linked:
+        cursor.execute("""
+            SELECT DISTINCT article_feeds.article_id
+            FROM article_feeds
+            JOIN feeds ON feeds.id = article_feeds.feed_id
+            WHERE article_feeds.article_id = ANY(%s) AND feeds.topic_id = %s AND article_feeds.feed_id <> %s
+        """, (list(newly_linked), topic_id, feed_id))
+        counted |= newly_linked - {row[0] for row in cursor.fetchall()}
+    record_article_counts(cursor, topic_id, [
+        (resolved[article_id][2], resolved[article_id][4]) for article_id in counted if article_id in resolved
+    ])
+    # Live-Push an die API, auch für vorhandene Artikel, die so in ein weiteres Thema kommen.
+    # Umfasst alle Artikel in counted, deren Tageszähler sich geändert haben; vector_tiles.py
+    # verwirft danach die Kacheln ihrer Publisher. Wird erst mit dem Commit zugestellt
+    publish_new_articles(cursor, sorted(inserted_ids | newly_linked))
+    return len(inserted_ids), len(newly_linked)
+
+def process_feed(feed) -> Optional[Tuple[int, int]]:
+    """
+    Ruft einen Feed ab und speichert neue Artikel.
+    Gibt (eingefügte Artikel, neu verknüpfte vorhandene Artikel) zurück oder None, wenn der
+    Abruf fehlgeschlagen ist.
+    """
+    import requests
+    from db_connection import get_connection, return_connection
+    from feed_health import classify_failure
+
     feed_id, title, language, last_build_date, country_id, topic_id, query_params = feed
-    logger.info(f"Processing Feed ID {feed_id} - {title}")
+    logger.info("Processing Feed ID %s - %s", feed_id, title)
 
     conn = None
     cursor = None
+    fetch_started = None
+    fetch_seconds = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
@@ -80,105 +211,387 @@ def process_feed(feed):
         # Feed-URL mit query_params erstellen
         feed_url = f"{base_topic_link}?{query_params}"
 
-        # Feed abrufen
-        response = requests.get(feed_url, timeout=10)
-        response.raise_for_status()
-        root = ET.fromstring(response.content)
-
         articles_batch: List[Tuple] = []
 
         consecutive_existing_articles = 0  # Zähler für aufeinanderfolgende vorhandene Artikel
         max_consecutive_existing = 10       # Schwellenwert für Abbruch
 
-        # Artikel verarbeiten
-        for item in root.findall(".//item"):
-            pub_date_str = item.findtext("pubDate")
-            pub_date = parse_date(pub_date_str)
-
-            article_link = item.findtext("link")
-            if not article_link:
-                logger.warning("Kein Link im Artikel gefunden")
-                continue
-
-            article_title = item.findtext("title") or "Unbekannter Titel"
-
-            # Prüfen, ob der Artikel bereits in der Datenbank vorhanden ist
-            cursor.execute("""
-                SELECT 1 FROM articles WHERE link = %s AND feed_id = %s
-            """, (article_link, feed_id))
-            if cursor.fetchone():
-                consecutive_existing_articles += 1
-                logger.info(f"Artikel bereits vorhanden: {article_title}")
-                if consecutive_existing_articles >= max_consecutive_existing:
-                    logger.info(f"{max_consecutive_existing} aufeinanderfolgende vorhandene Artikel gefunden. Abbruch der Verarbeitung.")
-                    break
-                continue
-            else:
-                consecutive_existing_articles = 0  # Zähler zurücksetzen
-
-            # Publisher aus dem <source>-Element extrahieren
-            source_element = item.find("source")
-            publisher_name = source_element.text.strip() if source_element is not None else "Unbekannter Herausgeber"
-
-            # Publisher abrufen oder erstellen
-            publisher_id = get_or_create_publisher(publisher_name, country_id)
-            
-            articles_batch.append((article_title, article_link, pub_date, publisher_id, feed_id))
-
-        # Artikel in die Datenbank einfügen
+        # Feed abrufen; die Items werden beim Lesen des Bodys geparst,
+        # sodass ein Abbruch auch das Herunterladen des Rests beendet
+        fetch_started = time.perf_counter()
+        with requests.get(feed_url, timeout=CONFIG['FETCH_TIMEOUT'], stream=True) as response:
+            fetch_seconds = time.perf_counter() - fetch_started
+            FEED_FETCH_SECONDS.observe(fetch_seconds)
+            response.raise_for_status()
+            parse_started = time.perf_counter()
+            for item in iter_response_items(response):
+                # Der Read-Timeout gilt je Lesevorgang; ein tröpfelnder Body wird hier begrenzt
+                if time.perf_counter() - fetch_started > CONFIG['FETCH_DEADLINE']:
+                    raise requests.Timeout(f"Feed nach {CONFIG['FETCH_DEADLINE']:.0f}s nicht vollständig gelesen")
+
+                pub_date_str = item.findtext("pubDate")
+                pub_date = parse_date(pub_date_str)
+
+                article_link = item.findtext("link")
+                if not article_link:
+                    logger.warning("Kein Link im Artikel gefunden")
+                    continue
+
+                article_title = item.findtext("title") or "Unbekannter Titel"
+
+                # Publisher aus dem <source>-Element extrahieren
+                source_element = item.find("source")
+                publisher_name = source_element.text.strip() if source_element is not None else "Unbekannter Herausgeber"
+
+                # Publisher abrufen oder erstellen; meist aus dem Cache
+                publisher_id = get_or_create_publisher(publisher_name, country_id)
+
+                # Prüfen, ob der Artikel in diesem Feed bereits gesehen wurde; wie in
+                # insert_articles über die URL oder über Publisher und Titel, denn Google News
+                # liefert denselben Artikel teils mit wechselnder URL
+                article_url = canonical_url(article_link)
+                article_title_hash = title_hash(article_title, publisher_name)
+                cursor.execute("""
+                    SELECT 1 FROM articles
+                    JOIN article_feeds ON article_feeds.article_id = articles.id
+                    WHERE (articles.canonical_url = %s
+                           OR (articles.publisher_id = %s AND articles.title_hash = %s))
+                      AND article_feeds.feed_id = %s
+                    LIMIT 1
+                """, (article_url, publisher_id, article_title_hash, feed_id))
+                if cursor.fetchone():
+                    consecutive_existing_articles += 1
+                    log_sampled(logger, logging.DEBUG, "Artikel bereits vorhanden: %s", article_title)
+                    if consecutive_existing_articles >= max_consecutive_existing:
+                        logger.info("%s aufeinanderfolgende vorhandene Artikel gefunden. Abbruch der Verarbeitung.", max_consecutive_existing)
+                        break
+                    continue
+                else:
+                    consecutive_existing_articles = 0  # Zähler zurücksetzen
+
+                articles_batch.append((
+                    article_title, article_link, article_url, article_title_hash,
+                    pub_date, publisher_id, feed_id
+                ))
+            FEED_PARSE_SECONDS.observe(time.perf_counter() - parse_started)
+
+        # Artikel in die Datenbank einfügen; Tageszähler in derselben Transaktion
+        new_articles = linked_articles = 0
         if articles_batch:
-            cursor.executemany("""
-                INSERT INTO articles 
-                (title, link, pub_date, publisher_id, feed_id)
-                VALUES (%s, %s, %s, %s, %s)
-            """, articles_batch)
+            db_started = time.perf_counter()
+            new_articles, linked_articles = insert_articles(cursor, feed_id, topic_id, articles_batch)
             conn.commit()
-            logger.info(f"Inserted {len(articles_batch)} new articles for feed {feed_id}")
+            FEED_DB_SECONDS.observe(time.perf_counter() - db_started)
+            ARTICLES_INSERTED.inc(new_articles)
+            ARTICLES_DEDUPLICATED.inc(linked_articles)
+            logger.info("Inserted %s new articles for feed %s (%s already stored by other feeds)",
+                        new_articles, feed_id, linked_articles)
         else:
-            logger.info(f"No new articles to process for feed {feed_id}")
+            logger.info("No new articles to process for feed %s", feed_id)
+
+        record_feed_health(conn, cursor, feed_id, 'ok', fetch_seconds)
+        FEEDS_PROCESSED.inc(outcome='ok')
+        return new_articles, linked_articles
 
     except Exception as e:
         if conn:
             conn.rollback()
-        logger.error(f"Feed processing error for '{title}': {e}")
+        FEEDS_PROCESSED.inc(outcome='error')
+        logger.error("Feed processing error for '%s': %s", title, e)
+        status = classify_failure(e)
+        if status and cursor:
+            if fetch_seconds is None and fetch_started is not None:
+                fetch_seconds = time.perf_counter() - fetch_started
+            record_feed_health(conn, cursor, feed_id, status, fetch_seconds, str(e))
+        return None
     finally:
         if cursor:
             cursor.close()
         if conn:
             return_connection(conn)
 
-def main():
-    logger.info("Starting feed parsing script")
+def record_feed_health(conn, cursor, feed_id: int, status: str, fetch_seconds: Optional[float], error: Optional[str] = None):
+    from feed_health import record_fetch
+
+    # Eigene Transaktion, damit der Zustand auch nach einem Rollback der Artikel gespeichert wird
+    try:
+        record_fetch(cursor, feed_id, status, fetch_seconds * 1000 if fetch_seconds is not None else None, error)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error saving health of feed %s: %s", feed_id, e)
+
+def record_feed_result(report: Counter, result: Optional[Tuple[int, int]]):
+    report['feeds'] += 1
+    if result is None:
+        report['failed_feeds'] += 1
+    else:
+        report['articles'] += result[0]
+        report['linked_articles'] += result[1]
+
+def log_cycle_report(report: Counter, duration: float):
+    logger.info(
+        "Cycle report: %s feeds (%s failed, %s skipped after repeated failures), %s circuits open, "
+        "%s new articles, %s linked to another feed, %s workers, %.1fs",
+        report['feeds'], report['failed_feeds'], report['aborted_feeds'], report['open_circuits'],
+        report['articles'], report['linked_articles'], report['workers'], duration
+    )
+
+def cycle_start():
+    from db_connection import get_connection, return_connection
+
+    # Zeitpunkt des Zyklusbeginns nach der Uhr der Datenbank, mit der auch last_polled_at gesetzt wird
+    conn = get_connection()
+    if conn is None:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT now()")
+            started_at = cursor.fetchone()[0]
+        conn.rollback()
+        return started_at
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error reading cycle start: %s", e)
+        return None
+    finally:
+        return_connection(conn)
+
+def lease_owner() -> str:
+    # Kennung für lease_owner, eindeutig je Prozess, auch über Rechner hinweg
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim_feed(owner: str, feed_id: int) -> bool:
+    """
+    Least einen einzelnen Feed für feed_scheduler.py. Gibt False zurück, wenn ein anderer
+    Worker ihn gerade abruft oder er gesperrt ist (feed_health.py).
+    """
+    from db_connection import get_connection, return_connection
+    from feed_health import CIRCUIT_CLOSED
 
     conn = None
     cursor = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        
-        # Alle Feeds abrufen
-        cursor.execute("""
-            SELECT id, title, language, last_build_date, country_id, topic_id, query_params
-            FROM feeds
-            ORDER BY topic_id DESC, country_id ASC
-        """)
+        cursor.execute(f"""
+            UPDATE feeds
+            SET lease_until = now() + make_interval(secs => %s),
+                lease_owner = %s
+            WHERE id = %s
+              AND (lease_until IS NULL OR lease_until < now())
+              AND {CIRCUIT_CLOSED}
+            RETURNING id
+        """, (CONFIG['LEASE_SECONDS'], owner, feed_id))
+        claimed = cursor.fetchone() is not None
+        conn.commit()
+        return claimed
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error claiming feed %s: %s", feed_id, e)
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+def claim_feeds(owner: str, limit: int, cycle_started) -> List[Tuple]:
+    """
+    Least bis zu `limit` Feeds für diesen Worker. Ein Feed kann erst nach Ablauf seiner Lease
+    erneut geclaimt werden, auch von Workern auf anderen Rechnern. Feeds, die seit
+    `cycle_started` schon abgerufen wurden, gehören nicht mehr zu diesem Zyklus, auch wenn
+    der Zyklus länger als LEASE_SECONDS dauert. Gesperrte Feeds (feed_health.py) bleiben
+    bis zum Ablauf der Sperre liegen.
+    """
+    from db_connection import get_connection, return_connection
+    from feed_health import CIRCUIT_CLOSED
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            UPDATE feeds
+            SET lease_until = now() + make_interval(secs => %s),
+                lease_owner = %s
+            WHERE id IN (
+                SELECT id FROM feeds
+                WHERE (lease_until IS NULL OR lease_until < now())
+                  AND (last_polled_at IS NULL OR last_polled_at < %s)
+                  AND {CIRCUIT_CLOSED}
+                ORDER BY topic_id DESC, country_id ASC
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, title, language, last_build_date, country_id, topic_id, query_params
+        """, (CONFIG['LEASE_SECONDS'], owner, cycle_started, limit))
         feeds = cursor.fetchall()
-        logger.info(f"Feeds to process: {len(feeds)}")
+        conn.commit()
+        return feeds
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error("Error claiming feeds: %s", e)
+        return []
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            return_connection(conn)
+
+def release_feeds(owner: str, feed_ids: List[int], polled: bool):
+    """
+    Gibt die Leases von `feed_ids` frei. Mit polled=True gelten die Feeds als in diesem
+    Zyklus abgerufen (auch bei Fehlschlag) und werden nicht erneut geclaimt.
+    """
+    from db_connection import get_connection, return_connection
 
+    conn = None
+    cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE feeds
+            SET lease_until = NULL,
+                lease_owner = NULL,
+                last_polled_at = CASE WHEN %s THEN now() ELSE last_polled_at END
+            WHERE id = ANY(%s) AND lease_owner = %s
+        """, (polled, feed_ids, owner))
+        conn.commit()
     except Exception as e:
-        logger.error(f"Error fetching feeds: {e}")
-        return
+        # Die Lease läuft dann nach LEASE_SECONDS ab
+        if conn:
+            conn.rollback()
+        logger.error("Error releasing feeds %s: %s", feed_ids, e)
     finally:
         if cursor:
             cursor.close()
         if conn:
             return_connection(conn)
 
-    # Feeds verarbeiten
-    for feed in feeds:
-        process_feed(feed)
+def run_worker(worker_index: int, cycle_started) -> Counter:
+    """
+    Verarbeitet geclaimte Feeds, bis für den Zyklus keine mehr übrig sind. Einstiegspunkt
+    eines Worker-Prozesses; jeder Prozess importiert db_connection neu (Start-Methode
+    'spawn') und nutzt damit einen eigenen Connection Pool. Ohne --workers läuft er im
+    Hauptprozess, sodass auch dieser Weg die Leases anderer Worker respektiert.
+    """
+    from feed_health import CycleBreaker
+
+    owner = lease_owner()
+    logger.info("Worker %s started as %s", worker_index, owner)
+
+    report = Counter(workers=1)
+    breaker = CycleBreaker()
+    while not breaker.tripped:
+        feeds = claim_feeds(owner, CONFIG['CLAIM_BATCH_SIZE'], cycle_started)
+        if not feeds:
+            break
+        for index, feed in enumerate(feeds):
+            if breaker.tripped:
+                # Der nächste Zyklus holt die übrigen Feeds nach
+                remaining = [remaining_feed[0] for remaining_feed in feeds[index:]]
+                release_feeds(owner, remaining, polled=False)
+                report['aborted_feeds'] += len(remaining)
+                logger.error("Worker %s stopped after %s consecutive feed failures", worker_index, breaker.consecutive_failures)
+                break
+            result = process_feed(feed)
+            release_feeds(owner, [feed[0]], polled=True)
+            breaker.record(result is not None)
+            record_feed_result(report, result)
+    return report
+
+def run_clustering():
+    # Ordnet die neuen Artikel des Zyklus Story-Clustern zu (einmal, nicht pro Worker)
+    if not CONFIG['CLUSTERING']:
+        return
+    from db_connection import get_connection, return_connection
+    from story_clustering import cluster_new_articles
+
+    conn = get_connection()
+    if conn is None:
+        return
+    try:
+        cluster_new_articles(conn)
+    except Exception as e:
+        logger.error("Error clustering articles: %s", e)
+    finally:
+        return_connection(conn)
+
+def open_circuits() -> int:
+    from db_connection import get_connection, return_connection
+    from feed_health import count_open_circuits
 
+    conn = get_connection()
+    if conn is None:
+        return 0
+    try:
+        with conn.cursor() as cursor:
+            count = count_open_circuits(cursor)
+        conn.rollback()
+        return count
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error counting open circuits: %s", e)
+        return 0
+    finally:
+        return_connection(conn)
+
+def run_worker_process(worker_index: int, cycle_started) -> Tuple[Counter, Dict[str, dict]]:
+    # Im Worker-Prozess: Bericht und Metriken gehen an den Elternprozess, der die Textdatei schreibt.
+    # Der Prozess startet per spawn ohne die Logging-Konfiguration des Elternprozesses
+    setup_logging()
+    report = run_worker(worker_index, cycle_started)
+    return report, metrics.snapshot()
+
+def run_sharded(workers: int, cycle_started) -> Counter:
+    # Erst hier importiert; Läufe mit einem Worker brauchen multiprocessing nicht
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=workers) as worker_pool:
+        results = worker_pool.starmap(run_worker_process, [(index, cycle_started) for index in range(workers)])
+    for _, worker_metrics in results:
+        metrics.merge_snapshot(worker_metrics)
+    return sum((report for report, _ in results), Counter())
+
+def main(workers: int = CONFIG['WORKERS']) -> Optional[Counter]:
+    # Gibt den Zyklusbericht zurück, None wenn der Zyklus nicht starten konnte
+    logger.info("Starting feed parsing script")
+    started = time.monotonic()
+
+    cycle_started = cycle_start()
+    if cycle_started is None:
+        return None
+
+    # Auch ohne --workers über Leases, damit parallel laufende Worker keinen Feed doppelt abrufen
+    if workers > 1:
+        logger.info("Processing feeds with %s worker processes", workers)
+        report = run_sharded(workers, cycle_started)
+    else:
+        report = run_worker(0, cycle_started)
+    report['open_circuits'] = open_circuits()
+
+    run_clustering()
+    log_cycle_report(report, time.monotonic() - started)
+    metrics.write_textfile_from_env()
     logger.info("Feed parsing script completed")
+    return report
+
+def run(argv=None) -> int:
+    # Kommandozeile, auch für python -m googlenewsmap ingest; gibt den Exit-Code zurück.
+    # Einzelne fehlgeschlagene Feeds sind normal (feed_health.py), ein abgebrochener Zyklus nicht
+    arg_parser = argparse.ArgumentParser(description="Parsing aller Feeds")
+    arg_parser.add_argument('--workers', type=int, default=CONFIG['WORKERS'],
+                            help="Anzahl der Worker-Prozesse; die Feeds werden per Lease verteilt")
+    args = arg_parser.parse_args(argv)
+    report = main(args.workers)
+    return 0 if report is not None and not report['aborted_feeds'] else 1
 
 if __name__ == '__main__':
-    main()
+    setup_logging()
+    sys.exit(run())
@@ -0,0 +1,449 @@
+# recent_index.py
+
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+import metrics
+from article_events import ArticleEventHub, article_hub
+from article_queries import (
+    ARTICLE_COLUMNS, FEED_IDS_COLUMN, FILTERS, ArticleFilter, execute_prepared, news_count_template
+)
+from db_connection import acquire_connection, return_connection
+from dimension_cache import DimensionCache, dimension_cache
+
+logger = logging.getLogger(__name__)
+
+# Konfiguration über Umgebungsvariablen:
+#   API_RECENT_WINDOW_HOURS     Zeitfenster der Artikel im Speicher (Standard 24, 0 schaltet den Index ab)
+#   API_RECENT_RELOAD_SECONDS   Abstand der vollständigen Neuladungen, die auch den Fensteranfang
+#                               verschieben (Standard 600)
+#   API_RECENT_CATCHUP_SECONDS  So oft werden Änderungen per change_version nachgeladen, zusätzlich
+#                               zu den per NOTIFY gemeldeten Artikeln (Standard 30)
+WINDOW_HOURS = float(os.getenv('API_RECENT_WINDOW_HOURS', '24'))
+RELOAD_SECONDS = float(os.getenv('API_RECENT_RELOAD_SECONDS', '600'))
+CATCHUP_SECONDS = float(os.getenv('API_RECENT_CATCHUP_SECONDS', '30'))
+# Ab so vielen nachgeladenen Artikeln werden sie in die sortierten Spalten übernommen
+COMPACT_AT = 2000
+# Gültigkeit der gezählten Artikel vor dem Fenster je Filterkombination (Sekunden)
+COLD_COUNT_TTL = 60.0
+
+# Metriken
+RECENT_QUERIES = metrics.Counter('newsmap_recent_index_queries_total', 'Abfragen an den Recent-Index', ['result'])
+RECENT_ARTICLES = metrics.Gauge('newsmap_recent_index_articles', 'Artikel im Recent-Index')
+RECENT_QUERY_SECONDS = metrics.Histogram('newsmap_recent_index_query_seconds', 'Dauer einer Abfrage an den Recent-Index')
+RECENT_LOAD_SECONDS = metrics.Histogram('newsmap_recent_index_load_seconds', 'Laden des Recent-Index', ['kind'])
+
+_FILTER_NAMES = tuple(name for name, _, _ in FILTERS)
+_NONZERO = re.compile(rb'[^\x00]')
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Angaben ohne Zeitzone gelten als UTC (wie in article_push.py)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+class RecentArticle:
+    """Ein Artikel im Fenster; Felder wie ARTICLE_COLUMNS plus Feeds, Land und Sortierschlüssel."""
+    __slots__ = ('id', 'title', 'link', 'pub_date', 'publisher_id', 'feed_id', 'story_cluster_id',
+                 'feed_ids', 'country_id', 'ts')
+
+    def __init__(self, row: dict, country_id: Optional[int]):
+        self.id = row['id']
+        self.title = row['title']
+        self.link = row['link']
+        self.pub_date = row['pub_date']
+        self.publisher_id = row['publisher_id']
+        self.feed_id = row['feed_id']
+        self.story_cluster_id = row['story_cluster_id']
+        self.feed_ids = tuple(row['feed_ids'] or ())
+        self.country_id = country_id
+        # Ohne Datum: +inf, also ganz vorne wie bei ORDER BY pub_date DESC in Postgres
+        self.ts = _as_utc(self.pub_date).timestamp() if self.pub_date is not None else float('inf')
+
+    def sort_key(self) -> Tuple[float, int]:
+        return (-self.ts, -self.id)
+
+    def as_row(self) -> dict:
+        return {
+            'id': self.id, 'title': self.title, 'link': self.link, 'pub_date': self.pub_date,
+            'publisher_id': self.publisher_id, 'feed_id': self.feed_id, 'story_cluster_id': self.story_cluster_id,
+        }
+
+def _bitmap(positions: Iterable[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+def _first_positions(mask: int, count: int) -> List[int]:
+    # Die ersten count gesetzten Bits; Null-Bytes überspringt die Regex in C
+    positions: List[int] = []
+    if count <= 0 or not mask:
+        return positions
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for match in _NONZERO.finditer(data):
+        index = match.start()
+        positions.extend(index * 8 + bit for bit in _BYTE_BITS[data[index]])
+        if len(positions) >= count:
+            break
+    return positions[:count]
+
+class _Snapshot:
+    """
+    Unveränderliche, nach pub_date absteigend sortierte Spalten. Bit i eines Bitmaps steht
+    für Position i. Feeds und Länder sind dicht besetzt und liegen als Bitmaps (int) vor,
+    die vielen Publisher als Positionslisten (array).
+    """
+    __slots__ = ('boundary', 'records', 'neg_ts', 'positions', 'undated', 'by_feed', 'by_country', 'by_publisher')
+
+    def __init__(self, records: List[RecentArticle], boundary: datetime):
+        records.sort(key=RecentArticle.sort_key)
+        self.boundary = boundary
+        self.records = records
+        self.neg_ts = array('d', (-record.ts for record in records))
+        self.positions = {record.id: position for position, record in enumerate(records)}
+        self.undated = bisect_right(self.neg_ts, float('-inf'))
+
+        feeds: Dict[int, List[int]] = {}
+        countries: Dict[int, List[int]] = {}
+        self.by_publisher: Dict[int, array] = {}
+        for position, record in enumerate(records):
+            for feed_id in record.feed_ids:
+                feeds.setdefault(feed_id, []).append(position)
+            if record.country_id is not None:
+                countries.setdefault(record.country_id, []).append(position)
+            self.by_publisher.setdefault(record.publisher_id, array('I')).append(position)
+        self.by_feed = {key: _bitmap(values, len(records)) for key, values in feeds.items()}
+        self.by_country = {key: _bitmap(values, len(records)) for key, values in countries.items()}
+
+class _State:
+    """Snapshot plus seither nachgeladene Artikel; wird bei jeder Änderung als Ganzes ersetzt."""
+    __slots__ = ('snapshot', 'live', 'delta', 'removed')
+
+    def __init__(self, snapshot: _Snapshot, live: int, delta: Dict[int, RecentArticle], removed: FrozenSet[int]):
+        self.snapshot = snapshot
+        self.live = live          # Bitmap der noch gültigen Snapshot-Positionen
+        self.delta = delta        # id -> neuere Fassung oder neuer Artikel
+        self.removed = removed    # IDs, die das Fenster verlassen haben
+
+    def size(self) -> int:
+        return self.live.bit_count() + len(self.delta)
+
+class RecentIndex:
+    """
+    Hält die Artikel der letzten WINDOW_HOURS Stunden für /news im Speicher. Abfragen ohne
+    Schlüsselwörter, deren Seite im Fenster liegt, brauchen Postgres höchstens für die Anzahl
+    der älteren Artikel (je Filterkombination COLD_COUNT_TTL Sekunden gecacht); alle anderen
+    gehen wie bisher an SQL. Ein Hintergrund-Thread übernimmt die per NOTIFY gemeldeten Artikel,
+    die der gemeinsame Listener (article_events.article_hub) bereits geladen hat, darunter auch
+    mit weiteren Feeds verknüpfte. Alle CATCHUP_SECONDS lädt er zusätzlich alle Artikel mit
+    höherer change_version nach und alle RELOAD_SECONDS das ganze Fenster neu. Erst dabei
+    werden gelöschte Artikel und Länderwechsel von Publishern sichtbar.
+    """
+
+    def __init__(self, cache: DimensionCache, window_hours: float = WINDOW_HOURS,
+                 events: ArticleEventHub = article_hub):
+        self.cache = cache
+        self.events = events
+        self.window = timedelta(hours=window_hours)
+        self._state: Optional[_State] = None
+        self._seen = 0
+        self._floor = 0
+        self._cold_counts: Dict[tuple, Tuple[int, float]] = {}
+        self._cold_lock = threading.Lock()
+        # Per NOTIFY gemeldete Artikelzeilen (id -> Zeile) bis zur nächsten Übernahme
+        self._pending: Dict[int, dict] = {}
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._next_reload = 0.0
+        self._next_sweep = 0.0
+        if self.enabled:
+            events.subscribe(self._on_articles, on_reset=self._on_reset)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > timedelta(0)
+
+    def ensure_started(self):
+        if not self.enabled:
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._maintain_forever, name="recent-index", daemon=True)
+                self._thread.start()
+        self.events.ensure_started()
+
+    def start(self, conn):
+        # Beim Start des Worker-Prozesses: Fenster sofort laden, damit schon die ersten Anfragen treffen
+        if self.enabled:
+            self.reload(conn)
+            self.ensure_started()
+
+    def _on_articles(self, rows: List[dict]):
+        # Mehrere Meldungen kurz hintereinander ergeben eine Übernahme
+        with self._pending_lock:
+            self._pending.update((row['id'], row) for row in rows if row['publisher_id'] is not None)
+        self._wake.set()
+
+    def _on_reset(self):
+        # Meldungen können verloren sein: sofort per change_version nachladen
+        self._next_sweep = 0.0
+        self._wake.set()
+
+    def _take_pending(self) -> List[dict]:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        return list(pending.values())
+
+    def _maintain_forever(self):
+        while True:
+            conn = None
+            try:
+                now = time.monotonic()
+                if now >= self._next_reload:
+                    conn = acquire_connection()
+                    self.reload(conn)
+                elif now >= self._next_sweep:
+                    conn = acquire_connection()
+                    self.catch_up(conn)
+                else:
+                    # Nur die vom Listener bereits geladenen Zeilen, ohne eigene Abfrage
+                    self.catch_up()
+            except Exception as e:
+                logger.error("Recent-Index konnte nicht aktualisiert werden: %s", e)
+            finally:
+                if conn is not None:
+                    conn.rollback()
+                    return_connection(conn)
+            now = time.monotonic()
+            self._wake.wait(max(0.0, min(self._next_sweep, self._next_reload) - now))
+            self._wake.clear()
+
+    def _fetch(self, conn, condition: str, params) -> List[RecentArticle]:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                f"SELECT {ARTICLE_COLUMNS}, articles.change_version, {FEED_IDS_COLUMN} FROM articles"
+                f" WHERE articles.publisher_id IS NOT NULL AND {condition}",
+                params
+            )
+            rows = cursor.fetchall()
+        conn.rollback()
+        return self._records(rows)
+
+    def _records(self, rows: List[dict]) -> List[RecentArticle]:
+        # Neue Publisher müssen im Dimension-Cache sein, bevor ihr Land bekannt ist
+        self.cache.ensure_fresh(force=any(row['publisher_id'] not in self.cache.publishers for row in rows))
+        self._seen = max([self._seen] + [row['change_version'] for row in rows])
+        return [RecentArticle(row, self.cache.country_id_for_publisher(row['publisher_id'])) for row in rows]
+
+    def reload(self, conn):
+        """Lädt das ganze Fenster neu; sein Anfang rückt dabei auf jetzt minus WINDOW_HOURS vor."""
+        with RECENT_LOAD_SECONDS.time(kind='reload'):
+            boundary = datetime.now(timezone.utc) - self.window
+            # Bis hierher gemeldete Artikel sind im neuen Fenster enthalten
+            self._take_pending()
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT COALESCE(MAX(change_version), 0) FROM articles")
+                seen = cursor.fetchone()[0]
+            self._seen = seen
+            records = self._fetch(conn, "(articles.pub_date >= %s OR articles.pub_date IS NULL)", (boundary,))
+            self.replace(records, boundary)
+            self._floor = seen
+            self._next_reload = time.monotonic() + RELOAD_SECONDS
+            self._next_sweep = time.monotonic() + CATCHUP_SECONDS
+        logger.info("Recent-Index geladen: %s Artikel seit %s", len(records), boundary.isoformat())
+
+    def replace(self, records: List[RecentArticle], boundary: datetime):
+        # Neues Fenster ab boundary; records müssen alle Artikel ab boundary enthalten
+        self._state = _State(_Snapshot(records, boundary), (1 << len(records)) - 1, {}, frozenset())
+        with self._cold_lock:
+            self._cold_counts.clear()
+        RECENT_ARTICLES.set(len(records))
+
+    def catch_up(self, conn=None):
+        """
+        Übernimmt die gemeldeten Artikel als neue Fassung, mit conn zusätzlich alle mit höherer
+        change_version. Deren Untergrenze läuft eine Runde hinterher, damit spät committete
+        Transaktionen nicht verloren gehen.
+        """
+        state = self._state
+        if state is None:
+            return
+        with RECENT_LOAD_SECONDS.time(kind='catch_up' if conn is not None else 'notify'):
+            previous_seen = self._seen
+            pending = self._take_pending()
+            try:
+                records = self._records(pending) if pending else []
+                if conn is not None:
+                    records += self._fetch(
+                        conn, "articles.change_version > %s ORDER BY articles.change_version", (self._floor,)
+                    )
+                    self._floor = previous_seen
+                    self._next_sweep = time.monotonic() + CATCHUP_SECONDS
+            except Exception:
+                # Beim nächsten Versuch erneut übernehmen
+                with self._pending_lock:
+                    for row in pending:
+                        self._pending.setdefault(row['id'], row)
+                raise
+            if not records:
+                return
+
+            snapshot = state.snapshot
+            delta = dict(state.delta)
+            removed = set(state.removed)
+            cleared = []
+            older = False
+            for record in records:
+                position = snapshot.positions.get(record.id)
+                if position is not None:
+                    cleared.append(position)
+                if record.pub_date is None or _as_utc(record.pub_date) >= snapshot.boundary:
+                    delta[record.id] = record
+                    removed.discard(record.id)
+                else:
+                    # Fällt vor das Fenster: zählt ab jetzt zu den älteren Artikeln
+                    older = True
+                    if delta.pop(record.id, None) is not None or position is not None:
+                        removed.add(record.id)
+            live = state.live & ~_bitmap(cleared, len(snapshot.records)) if cleared else state.live
+
+            if len(delta) >= COMPACT_AT:
+                kept = [r for r in snapshot.records if r.id not in delta and r.id not in removed]
+                snapshot = _Snapshot(kept + list(delta.values()), snapshot.boundary)
+                state = _State(snapshot, (1 << len(snapshot.records)) - 1, {}, frozenset())
+            else:
+                state = _State(snapshot, live, delta, frozenset(removed))
+            self._state = state
+        if older:
+            with self._cold_lock:
+                self._cold_counts.clear()
+        RECENT_ARTICLES.set(state.size())
+
+    def query(self, conn, article_filter: ArticleFilter, offset: int, limit: int) -> Optional[Tuple[int, List[dict]]]:
+        """
+        Liefert (Gesamtanzahl, Artikelzeilen) wie die Templates news_count/news_page oder
+        None, wenn die Anfrage an SQL gehen muss. conn dient nur dem Zählen älterer Artikel.
+        """
+        with RECENT_QUERY_SECONDS.time():
+            return self._query(conn, article_filter, offset, limit)
+
+    def _query(self, conn, article_filter: ArticleFilter, offset: int, limit: int) -> Optional[Tuple[int, List[dict]]]:
+        self.ensure_started()
+        state = self._state
+        if state is None:
+            RECENT_QUERIES.inc(result='not_loaded')
+            return None
+        filters = self.decode(article_filter)
+        if 'keywords' in filters:
+            RECENT_QUERIES.inc(result='keywords')
+            return None
+
+        snapshot = state.snapshot
+        date_from = _as_utc(filters.get('date_from'))
+        date_to = _as_utc(filters.get('date_to'))
+        feed_ids = frozenset(filters['topics']) if 'topics' in filters else None
+        publisher_ids = frozenset(filters['publishers']) if 'publishers' in filters else None
+        country_id = filters.get('country')
+
+        # Snapshot: Zeitraum als Positionsbereich, Filter als Bitmaps
+        size = len(snapshot.records)
+        low = snapshot.undated if date_from or date_to else 0
+        high = size
+        if date_from:
+            high = bisect_right(snapshot.neg_ts, -date_from.timestamp())
+        if date_to:
+            low = max(low, bisect_left(snapshot.neg_ts, -date_to.timestamp()))
+        mask = state.live & (((1 << high) - 1) ^ ((1 << low) - 1)) if low < high else 0
+        if mask and feed_ids is not None:
+            topic_mask = 0
+            for feed_id in feed_ids:
+                topic_mask |= snapshot.by_feed.get(feed_id, 0)
+            mask &= topic_mask
+        if mask and publisher_ids is not None:
+            mask &= _bitmap(
+                (position for publisher_id in publisher_ids for position in snapshot.by_publisher.get(publisher_id, ())),
+                size
+            )
+        if mask and country_id is not None:
+            mask &= snapshot.by_country.get(country_id, 0)
+
+        # Nachgeladene Artikel: wenige, daher direkt prüfen
+        from_ts = date_from.timestamp() if date_from else None
+        to_ts = date_to.timestamp() if date_to else None
+        recent = sorted(
+            (
+                record for record in state.delta.values()
+                if (feed_ids is None or not feed_ids.isdisjoint(record.feed_ids))
+                and (publisher_ids is None or record.publisher_id in publisher_ids)
+                and (country_id is None or record.country_id == country_id)
+                and (from_ts is None or (record.pub_date is not None and record.ts >= from_ts))
+                and (to_ts is None or (record.pub_date is not None and record.ts <= to_ts))
+            ),
+            key=RecentArticle.sort_key
+        )
+
+        window_total = mask.bit_count() + len(recent)
+        needs_older = date_from is None or date_from < snapshot.boundary
+        if needs_older and offset + limit > window_total:
+            # Die Seite reicht über den Fensteranfang hinaus
+            RECENT_QUERIES.inc(result='beyond_window')
+            return None
+
+        records = [snapshot.records[position] for position in _first_positions(mask, offset + limit)]
+        page = islice(heapq.merge(records, recent, key=RecentArticle.sort_key), offset, offset + limit)
+        total = window_total
+        if needs_older:
+            total += self._older_count(conn, filters, snapshot.boundary)
+        RECENT_QUERIES.inc(result='hit')
+        return total, [record.as_row() for record in page]
+
+    def _older_count(self, conn, filters: Dict[str, object], boundary: datetime) -> int:
+        # Artikel vor dem Fenster (pub_date < boundary) mit denselben Filtern, über news_count
+        older = dict(filters)
+        latest = boundary - timedelta(microseconds=1)
+        older['date_to'] = min(_as_utc(older['date_to']), latest) if older.get('date_to') else latest
+        older_filter = self.encode(older)
+        key = (older_filter.mask, repr(older_filter.values))
+        now = time.monotonic()
+        with self._cold_lock:
+            cached = self._cold_counts.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, news_count_template(older_filter.mask), older_filter.values)
+            count = cursor.fetchone()[0]
+        with self._cold_lock:
+            self._cold_counts[key] = (count, now + COLD_COUNT_TTL)
+        return count
+
+    @staticmethod
+    def decode(article_filter: ArticleFilter) -> Dict[str, object]:
+        values = iter(article_filter.values)
+        return {name: next(values) for index, name in enumerate(_FILTER_NAMES) if article_filter.mask & (1 << index)}
+
+    @staticmethod
+    def encode(filters: Dict[str, object]) -> ArticleFilter:
+        mask = 0
+        values = []
+        for index, name in enumerate(_FILTER_NAMES):
+            if filters.get(name) is not None:
+                mask |= 1 << index
+                values.append(filters[name])
+        return ArticleFilter(mask, tuple(values))
+
+recent_index = RecentIndex(dimension_cache)
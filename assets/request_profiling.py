@@ -0,0 +1,149 @@
+# request_profiling.py
+
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import metrics
+from article_queries import QueryTemplate, explain_prepared, replay_sql
+
+logger = logging.getLogger(__name__)
+# Eigener Logger, damit Profile getrennt geroutet oder abgeschaltet werden können
+profile_logger = logging.getLogger("newsmap.profiling")
+
+# Konfiguration über Umgebungsvariablen:
+#   API_PROFILE_TOKEN        Geheimnis für den Header X-Profile; ohne Token kein Profiling per Header
+#   API_PROFILE_SAMPLE_RATE  Anteil zufällig profilierter Anfragen, z. B. 0.01 (Standard 0)
+PROFILE_TOKEN = os.getenv('API_PROFILE_TOKEN')
+SAMPLE_RATE = float(os.getenv('API_PROFILE_SAMPLE_RATE', '0'))
+# Zuletzt erstellte Profile für /api/v01/admin/profiles/{id}
+KEEP_PROFILES = 200
+
+PROFILED_REQUESTS = metrics.Counter('newsmap_api_profiled_requests_total', 'Profilierte API-Anfragen', ['trigger'])
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+class RequestProfile:
+    """
+    Sammelt für eine Anfrage die Zeit je Abschnitt (Abfrage, Modellaufbau, Gruppierung,
+    Serialisierung) sowie für jede aufgezeichnete Abfrage SQL, Parameter und
+    EXPLAIN (ANALYZE, BUFFERS). Die EXPLAIN-Läufe selbst zählen zu keinem Abschnitt.
+    """
+    enabled = True
+
+    def __init__(self, endpoint: str, path: str, query: str, trigger: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.endpoint = endpoint
+        self.path = path
+        self.query = query
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.sections: Dict[str, float] = {}
+        self.queries: List[dict] = []
+
+    @contextmanager
+    def section(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - started
+
+    def record_query(self, cursor, template: QueryTemplate, params):
+        entry = {
+            "statement": template.name,
+            "sql": template.sql,
+            "params": _jsonable(list(params)),
+            "replay": replay_sql(cursor, template, params),
+        }
+        try:
+            entry.update(explain_prepared(cursor, template, params, buffers=True))
+        except Exception as e:
+            # Das Profil darf die eigentliche Antwort nicht verhindern
+            cursor.connection.rollback()
+            entry["explain_error"] = str(e)
+        self.queries.append(entry)
+
+    def server_timing(self) -> str:
+        # Für den Header Server-Timing (Browser-Devtools zeigen ihn direkt an)
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.sections.items()]
+        parts.extend(
+            f"sql{index};desc=\"{query['statement']}\";dur={query.get('execution_ms', 0.0):.1f}"
+            for index, query in enumerate(self.queries)
+        )
+        return ", ".join(parts)
+
+    def as_dict(self, total_seconds: float, status: int) -> dict:
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "path": self.path,
+            "query": self.query,
+            "trigger": self.trigger,
+            "status": status,
+            "total_ms": round(total_seconds * 1000, 2),
+            "sections_ms": {name: round(seconds * 1000, 2) for name, seconds in self.sections.items()},
+            "queries": self.queries,
+        }
+
+class _NoProfile:
+    # Platzhalter für nicht profilierte Anfragen; alle Aufrufe kosten praktisch nichts
+    enabled = False
+
+    def section(self, name: str):
+        return nullcontext()
+
+    def record_query(self, cursor, template: QueryTemplate, params):
+        pass
+
+NO_PROFILE = _NoProfile()
+
+_recent: "OrderedDict[str, dict]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+def token_valid(header_value: Optional[str]) -> bool:
+    # compare_digest akzeptiert str nur mit ASCII-Zeichen; Header können beliebige Bytes enthalten
+    return bool(PROFILE_TOKEN and header_value and hmac.compare_digest(header_value.encode(), PROFILE_TOKEN.encode()))
+
+def start_profile(endpoint: str, path: str, query: str, header_value: Optional[str]):
+    if token_valid(header_value):
+        trigger = "header"
+    elif SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+        trigger = "sample"
+    else:
+        return NO_PROFILE
+    PROFILED_REQUESTS.inc(trigger=trigger)
+    return RequestProfile(endpoint, path, query, trigger)
+
+def finish_profile(profile: RequestProfile, total_seconds: float, status: int) -> dict:
+    """
+    Schreibt das Profil als JSON-Zeile in den Logger newsmap.profiling und hält es
+    für den Abruf über die Profil-ID bereit.
+    """
+    entry = profile.as_dict(total_seconds, status)
+    profile_logger.info("%s", json.dumps(entry, ensure_ascii=False, default=str))
+    with _recent_lock:
+        _recent[profile.id] = entry
+        while len(_recent) > KEEP_PROFILES:
+            _recent.popitem(last=False)
+    return entry
+
+def get_recent_profile(profile_id: str) -> Optional[dict]:
+    with _recent_lock:
+        return _recent.get(profile_id)
@@ -0,0 +1,109 @@
+# dedup_articles.py
+#
+# Einmalige Nacharbeit zu data/db_article_dedup.sql: befüllt canonical_url und title_hash
+# der vorhandenen Artikel und führt dabei feed-übergreifende Duplikate zusammen.
+# Der älteste Artikel bleibt erhalten und übernimmt die Feed-Verknüpfungen der Duplikate.
+# Danach werden die Tageszähler neu aufgebaut. Während des Laufs die Ingestion anhalten.
+# Aufruf aus assets/: python -m scripts.dedup_articles
+
+import argparse
+import logging
+from collections import Counter
+
+from article_dedup import canonical_url, title_hash
+from db_connection import get_connection, return_connection, close_all_connections
+from logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+def merge_duplicates(cursor, batch_size: int = BATCH_SIZE) -> Counter:
+    report = Counter()
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT articles.id, articles.link, articles.title, articles.publisher_id, publishers.name
+            FROM articles
+            LEFT JOIN publishers ON publishers.id = articles.publisher_id
+            WHERE articles.canonical_url IS NULL AND articles.id > %s
+            ORDER BY articles.id
+            LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return report
+
+        for article_id, link, title, publisher_id, publisher_name in rows:
+            article_url = canonical_url(link)
+            article_hash = title_hash(title, publisher_name)
+            # Nur bereits bearbeitete (ältere) Artikel haben eine canonical_url
+            cursor.execute("""
+                SELECT id FROM articles
+                WHERE canonical_url = %s OR (publisher_id = %s AND title_hash = %s)
+                ORDER BY id
+                LIMIT 1
+            """, (article_url, publisher_id, article_hash))
+            original = cursor.fetchone()
+            if original:
+                cursor.execute("""
+                    INSERT INTO article_feeds (article_id, feed_id)
+                    SELECT %s, feed_id FROM article_feeds WHERE article_id = %s
+                    ON CONFLICT DO NOTHING
+                """, (original[0], article_id))
+                cursor.execute("DELETE FROM articles WHERE id = %s", (article_id,))
+                report['merged'] += 1
+            else:
+                cursor.execute("""
+                    UPDATE articles SET canonical_url = %s, title_hash = %s WHERE id = %s
+                """, (article_url, article_hash, article_id))
+                report['kept'] += 1
+
+        last_id = rows[-1][0]
+        cursor.connection.commit()
+        logger.info("Bis Artikel %s: %s behalten, %s zusammengeführt", last_id, report['kept'], report['merged'])
+
+def rebuild_rollup(cursor):
+    # Jeder Artikel zählt einmal je Thema, in dem er erschienen ist
+    cursor.execute("TRUNCATE article_daily_counts")
+    cursor.execute("""
+        INSERT INTO article_daily_counts (country_id, topic_id, publisher_id, day, article_count)
+        SELECT country_id, topic_id, publisher_id, day, COUNT(*)
+        FROM (
+            SELECT DISTINCT articles.id, publishers.country_id, feeds.topic_id, articles.publisher_id,
+                   (articles.pub_date AT TIME ZONE 'UTC')::date AS day
+            FROM articles
+            JOIN article_feeds ON article_feeds.article_id = articles.id
+            JOIN feeds ON feeds.id = article_feeds.feed_id
+            JOIN publishers ON publishers.id = articles.publisher_id
+            WHERE articles.pub_date IS NOT NULL AND publishers.country_id IS NOT NULL
+        ) AS article_topics
+        GROUP BY country_id, topic_id, publisher_id, day
+    """)
+    cursor.connection.commit()
+
+def dedup_articles(batch_size: int = BATCH_SIZE):
+    conn = get_connection()
+    if conn is None:
+        logger.error("Keine Datenbankverbindung verfügbar")
+        return
+    cursor = conn.cursor()
+    try:
+        report = merge_duplicates(cursor, batch_size)
+        rebuild_rollup(cursor)
+        logger.info("Deduplizierung abgeschlossen: %s Artikel behalten, %s Duplikate zusammengeführt",
+                    report['kept'], report['merged'])
+    except Exception as e:
+        conn.rollback()
+        logger.error("Fehler bei der Deduplizierung: %s", e)
+    finally:
+        cursor.close()
+        return_connection(conn)
+
+if __name__ == '__main__':
+    setup_logging()
+    arg_parser = argparse.ArgumentParser(description="Vorhandene Artikel feed-übergreifend deduplizieren")
+    arg_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = arg_parser.parse_args()
+    dedup_articles(args.batch_size)
+    close_all_connections()
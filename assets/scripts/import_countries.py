@@ -1,56 +1,38 @@
 # import_countries.py
+#
+# Importiert die Länderliste (Name;ISO-Code) per COPY und Upsert, siehe load_reference_data.py.
+# Aufruf aus assets/: python -m scripts.import_countries [data/country_iso_codes.csv]
 
-import csv
+import argparse
 import logging
-from db_connection import get_connection, return_connection, close_all_connections
+import sys
+from db_connection import close_all_connections
+from logging_config import setup_logging
+from scripts.load_reference_data import load_reference_data
 
-# Logging konfigurieren
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def import_countries(csv_file):
-    conn = None
-    cursor = None
+def import_countries(csv_file=None):
+    """
+    Gibt den LoadReport (gelesen, eingefügt, aktualisiert, übersprungen) zurück,
+    bei Fehlern None. Der gemeinsame Verbindungspool bleibt geöffnet.
+    """
     try:
-        conn = get_connection()
-        conn.autocommit = True
-        if conn is None:
-            logger.error("Keine Datenbankverbindung verfügbar")
-            return
-
-        cursor = conn.cursor()
-
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f, delimiter=';')
-            for row in reader:
-                if len(row) != 2:
-                    logger.warning(f"Ungültige Zeile in CSV-Datei: {row}")
-                    continue
-
-                country_name = row[0].strip()
-                iso_code = row[1].strip().upper()
-
-                # Einfügen in die Datenbank
-                try:
-                    cursor.execute("""
-                        INSERT INTO countries (country_name, iso_code)
-                        VALUES (%s, %s)
-                        ON CONFLICT (iso_code) DO NOTHING
-                    """, (country_name, iso_code))
-                    conn.commit()
-                    logger.info(f"Land eingefügt: {country_name} ({iso_code})")
-                except Exception as e:
-                    conn.rollback()
-                    logger.error(f"Fehler beim Einfügen von {country_name} ({iso_code}): {e}")
-
+        return load_reference_data('countries', csv_file)
     except Exception as e:
-        logger.error(f"Fehler beim Importieren der Länder: {e}")
+        logger.error("Fehler beim Importieren der Länder: %s", e)
+        return None
+
+def run(argv=None) -> int:
+    # Kommandozeile, auch für python -m googlenewsmap import-countries; gibt den Exit-Code zurück
+    arg_parser = argparse.ArgumentParser(description="Länderliste (Name;ISO-Code) importieren")
+    arg_parser.add_argument('csv_file', nargs='?', help="CSV-Datei, Standard: data/country_iso_codes.csv")
+    args = arg_parser.parse_args(argv)
+    try:
+        return 0 if import_countries(args.csv_file) else 1
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            return_connection(conn)
         close_all_connections()
 
 if __name__ == '__main__':
-    import_countries('/Users/peterwolters/Desktop/Uni/3_Semester/Geoinformatik/googlemaptimes/data/country_iso_codes.csv')
+    setup_logging()
+    sys.exit(run())
@@ -0,0 +1,203 @@
+# load_reference_data.py
+#
+# Lädt Stammdaten (Länder, Themen, Feeds, Gazetteer) aus CSV-Dateien: die Datei wird per
+# COPY in eine temporäre Staging-Tabelle gestreamt und mit einem einzigen Upsert in die
+# Zieltabelle übernommen. Unveränderte Zeilen werden nicht angefasst; ungültige Zeilen und
+# Zeilen mit unbekanntem Thema oder Land werden übersprungen und gezählt.
+# Der gemeinsame Verbindungspool bleibt bestehen.
+# Aufruf aus assets/:
+#   python -m scripts.load_reference_data --seed
+#   python -m scripts.load_reference_data countries data/country_iso_codes.csv [feeds meine_feeds.csv ...]
+
+import argparse
+import logging
+import os
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from db_connection import get_connection, return_connection, close_all_connections
+from logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+STAGING_TABLE = "reference_staging"
+
+class Dataset(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]          # Spalten der CSV-Datei (Staging, alle als Text)
+    header: bool                      # Erste Zeile enthält Spaltennamen
+    target_columns: Tuple[str, ...]
+    select: str                       # Liefert target_columns aus der Staging-Tabelle, je Schlüssel eine Zeile
+    conflict: str                     # Konfliktziel des Upserts
+    update_columns: Tuple[str, ...]
+    default_file: str
+
+# Reihenfolge von --seed: Feeds und Gazetteer verweisen auf Länder und Themen
+DATASETS = {
+    "countries": Dataset(
+        table="countries",
+        columns=("country_name", "iso_code"),
+        header=False,
+        target_columns=("country_name", "iso_code"),
+        select=f"""
+            SELECT DISTINCT ON (upper(trim(iso_code))) trim(country_name), upper(trim(iso_code))
+            FROM {STAGING_TABLE}
+            WHERE trim(iso_code) ~ '^[A-Za-z]{{2}}$' AND trim(country_name) <> ''
+            ORDER BY upper(trim(iso_code))
+        """,
+        conflict="(iso_code)",
+        update_columns=("country_name",),
+        default_file="country_iso_codes.csv",
+    ),
+    "topics": Dataset(
+        table="topics",
+        columns=("topic_name", "link"),
+        header=True,
+        target_columns=("topic_name", "link"),
+        select=f"""
+            SELECT DISTINCT ON (trim(topic_name)) trim(topic_name), nullif(trim(link), '')
+            FROM {STAGING_TABLE}
+            WHERE trim(topic_name) <> ''
+            ORDER BY trim(topic_name)
+        """,
+        conflict="(topic_name)",
+        update_columns=("link",),
+        default_file="topics.csv",
+    ),
+    "feeds": Dataset(
+        table="feeds",
+        columns=("topic_name", "iso_code", "title", "language", "query_params"),
+        header=True,
+        target_columns=("title", "language", "country_id", "topic_id", "query_params"),
+        select=f"""
+            SELECT DISTINCT ON (topics.id, trim(s.query_params))
+                   nullif(trim(s.title), ''), nullif(trim(s.language), ''), countries.id, topics.id, trim(s.query_params)
+            FROM {STAGING_TABLE} AS s
+            JOIN topics ON topics.topic_name = trim(s.topic_name)
+            JOIN countries ON countries.iso_code = upper(trim(s.iso_code))
+            WHERE trim(s.query_params) <> ''
+            ORDER BY topics.id, trim(s.query_params)
+        """,
+        conflict="(topic_id, query_params)",
+        update_columns=("title", "language", "country_id"),
+        default_file="feeds.csv",
+    ),
+    "gazetteer": Dataset(
+        table="gazetteer",
+        columns=("name", "iso_code", "latitude", "longitude", "city"),
+        header=True,
+        target_columns=("name", "country_id", "latitude", "longitude", "city"),
+        # Postgres darf die Bedingungen einer WHERE-Klausel umordnen; die Casts stehen deshalb
+        # hinter CASE, das nicht numerische Koordinaten zu NULL macht, gefiltert wird außen
+        select=f"""
+            SELECT DISTINCT ON (lower(g.name), g.country_id)
+                   g.name, g.country_id, g.latitude, g.longitude, g.city
+            FROM (
+                SELECT trim(s.name) AS name, countries.id AS country_id,
+                       CASE WHEN s.latitude ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$'
+                            THEN s.latitude::double precision END AS latitude,
+                       CASE WHEN s.longitude ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$'
+                            THEN s.longitude::double precision END AS longitude,
+                       nullif(trim(s.city), '') AS city
+                FROM {STAGING_TABLE} AS s
+                JOIN countries ON countries.iso_code = upper(trim(s.iso_code))
+                WHERE trim(s.name) <> ''
+            ) AS g
+            WHERE g.latitude BETWEEN -90 AND 90
+              AND g.longitude BETWEEN -180 AND 180
+            ORDER BY lower(g.name), g.country_id
+        """,
+        conflict="((lower(name)), country_id)",
+        update_columns=("name", "latitude", "longitude", "city"),
+        default_file="gazetteer.csv",
+    ),
+}
+
+class LoadReport(NamedTuple):
+    staged: int
+    inserted: int
+    updated: int
+    skipped: int
+
+def merge_sql(dataset: Dataset) -> str:
+    # Ein Upsert; geändert wird nur, was sich unterscheidet (xmax = 0 kennzeichnet neue Zeilen)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in dataset.update_columns)
+    current = ", ".join(f"{dataset.table}.{column}" for column in dataset.update_columns)
+    incoming = ", ".join(f"EXCLUDED.{column}" for column in dataset.update_columns)
+    return f"""
+        WITH merged AS (
+            INSERT INTO {dataset.table} ({', '.join(dataset.target_columns)})
+            {dataset.select}
+            ON CONFLICT {dataset.conflict} DO UPDATE SET {updates}
+            WHERE ({current}) IS DISTINCT FROM ({incoming})
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged
+    """
+
+def load_into(conn, dataset: Dataset, path: str, delimiter: str = ";") -> LoadReport:
+    """
+    Lädt eine Datei in einer Transaktion auf der übergebenen Verbindung und committet.
+    Bei Fehlern wird zurückgerollt und die Ausnahme weitergereicht.
+    """
+    columns = ", ".join(f"{column} TEXT" for column in dataset.columns)
+    try:
+        with conn.cursor() as cursor, open(path, encoding="utf-8-sig", newline="") as f:
+            cursor.execute(f"CREATE TEMP TABLE {STAGING_TABLE} ({columns}) ON COMMIT DROP")
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(dataset.columns)}) FROM STDIN "
+                f"WITH (FORMAT csv, DELIMITER '{delimiter}', HEADER {'true' if dataset.header else 'false'})",
+                f,
+            )
+            cursor.execute(f"SELECT count(*) FROM {STAGING_TABLE}")
+            staged = cursor.fetchone()[0]
+            cursor.execute(merge_sql(dataset))
+            inserted, updated = cursor.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    # Übersprungen: ungültig, doppelt in der Datei, unbekannte Bezüge oder unverändert
+    return LoadReport(staged, inserted, updated, staged - inserted - updated)
+
+def load_reference_data(name: str, path: Optional[str] = None, delimiter: str = ";") -> Optional[LoadReport]:
+    dataset = DATASETS[name]
+    path = path or os.path.join(DATA_DIR, dataset.default_file)
+    conn = get_connection()
+    if conn is None:
+        logger.error("Keine Datenbankverbindung verfügbar")
+        return None
+    try:
+        started = time.perf_counter()
+        report = load_into(conn, dataset, path, delimiter)
+        logger.info("%s aus %s: %s gelesen, %s eingefügt, %s aktualisiert, %s übersprungen (%.2f s)",
+                    name, path, report.staged, report.inserted, report.updated, report.skipped,
+                    time.perf_counter() - started)
+        return report
+    finally:
+        return_connection(conn)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Stammdaten per COPY und Upsert laden")
+    arg_parser.add_argument("--seed", action="store_true", help="Alle Datensätze aus data/ laden")
+    arg_parser.add_argument("--delimiter", default=";")
+    arg_parser.add_argument("files", nargs="*", help="Paare aus Datensatz und Datei, z. B. feeds feeds.csv")
+    args = arg_parser.parse_args()
+    if len(args.files) % 2 or any(name not in DATASETS for name in args.files[::2]):
+        arg_parser.error(f"Erwartet Paare <Datensatz> <Datei>; Datensätze: {', '.join(DATASETS)}")
+
+    jobs = [(name, None) for name in DATASETS] if args.seed else list(zip(args.files[::2], args.files[1::2]))
+    try:
+        for name, path in jobs:
+            load_reference_data(name, path, args.delimiter)
+    except Exception as e:
+        logger.error("Fehler beim Laden der Stammdaten: %s", e)
+        raise SystemExit(1)
+    finally:
+        # Nur beim Aufruf als Skript: der Prozess endet hier
+        close_all_connections()
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# server.py
+#
+# Startet die API (main:app) mit uvicorn in mehreren Worker-Prozessen. Jeder Worker öffnet
+# seinen eigenen Connection Pool und wärmt Caches und Prepared Statements vor, bevor er
+# Anfragen annimmt (main.warm_up); beim Beenden (SIGTERM/SIGINT) laufen offene Anfragen bis
+# zu --graceful-timeout Sekunden weiter, danach werden die Verbindungen geschlossen.
+# Jeder Worker hat bis zu DB_POOL_API_MAX Verbindungen (zusammen Worker x Maximum).
+# Mit mehreren Workern schreibt jeder seine Metriken in ein gemeinsames Verzeichnis
+# (API_METRICS_DIR, sonst ein temporäres); /metrics liefert dann jede Reihe aller Worker
+# mit dem Label worker="<pid>", unabhängig davon, welcher Worker die Anfrage annimmt.
+# Aufruf aus assets/: python server.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+from logging_config import setup_logging
+
+# Konfiguration über Umgebungsvariablen, überschreibbar per Kommandozeile
+CONFIG = {
+    'HOST': os.getenv('API_HOST', '127.0.0.1'),
+    'PORT': int(os.getenv('API_PORT', '8000')),
+    'WORKERS': int(os.getenv('API_WORKERS', os.cpu_count() or 1)),
+    'LOOP': os.getenv('API_LOOP', 'auto'),  # auto: uvloop, falls installiert, sonst asyncio
+    'GRACEFUL_TIMEOUT': float(os.getenv('API_GRACEFUL_TIMEOUT', '30')),  # offene SSE-Streams enden spätestens dann
+    'BACKLOG': int(os.getenv('API_BACKLOG', '2048')),
+    'KEEPALIVE_TIMEOUT': int(os.getenv('API_KEEPALIVE_TIMEOUT', '5')),
+}
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="News-API mit mehreren Worker-Prozessen starten")
+    arg_parser.add_argument('--host', default=CONFIG['HOST'])
+    arg_parser.add_argument('--port', type=int, default=CONFIG['PORT'])
+    arg_parser.add_argument('--workers', type=int, default=CONFIG['WORKERS'])
+    arg_parser.add_argument('--loop', choices=['auto', 'asyncio', 'uvloop'], default=CONFIG['LOOP'])
+    arg_parser.add_argument('--graceful-timeout', type=float, default=CONFIG['GRACEFUL_TIMEOUT'])
+    arg_parser.add_argument('--proxy-headers', action='store_true', help="X-Forwarded-* eines Reverse Proxys übernehmen")
+    args = arg_parser.parse_args()
+    setup_logging()
+
+    workers = max(1, args.workers)
+    metrics_dir = None
+    if workers > 1 and not os.getenv('API_METRICS_DIR'):
+        # Die Worker erben die Umgebung
+        metrics_dir = tempfile.mkdtemp(prefix='newsmap-metrics-')
+        os.environ['API_METRICS_DIR'] = metrics_dir
+
+    # Die Worker importieren main:app jeweils selbst (spawn), es werden keine Verbindungen vererbt
+    try:
+        uvicorn.run(
+            'main:app',
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            loop=args.loop,
+            lifespan='on',
+            timeout_graceful_shutdown=args.graceful_timeout,
+            timeout_keep_alive=CONFIG['KEEPALIVE_TIMEOUT'],
+            backlog=CONFIG['BACKLOG'],
+            proxy_headers=args.proxy_headers,
+            # Logging kommt aus logging_config.setup_logging()
+            log_config=None,
+        )
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+# story_clustering.py
+
+import logging
+import os
+import zlib
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import metrics
+from article_dedup import normalize_title
+
+logger = logging.getLogger(__name__)
+
+# MinHash/LSH-Parameter: 64 Signaturwerte in 16 Bändern à 4 Zeilen. Zwei Titel landen
+# ab einer Jaccard-Ähnlichkeit von etwa (1/16)^(1/4) ≈ 0.5 wahrscheinlich im selben Bucket.
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# Mindestähnlichkeit (Anteil gleicher MinHash-Werte) für die Zuordnung zu einem Cluster
+SIMILARITY_THRESHOLD = 0.6
+
+# Höchstens so viele Cluster je Bucket vergleichen (die zuletzt eingetragenen). Sehr volle
+# Buckets entstehen durch häufige Phrasen und sagen wenig über die Meldung aus.
+MAX_BUCKET_CANDIDATES = 16
+# Ab dieser Ähnlichkeit wird ohne weitere Vergleiche zugeordnet
+EARLY_MATCH_SIMILARITY = 0.9
+
+# Speichergrenze des Index und Zeitfenster, in dem neue Artikel einem Cluster beitreten können
+MAX_ENTRIES = int(os.getenv('CLUSTER_MAX_ENTRIES', '200000'))
+WINDOW_HOURS = int(os.getenv('CLUSTER_WINDOW_HOURS', '48'))
+BATCH_SIZE = 2000
+
+# Verhindert, dass mehrere Ingestion-Läufe gleichzeitig clustern
+ADVISORY_LOCK_KEY = 0x5354_4F52  # "STOR"
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15  # Multiplikativer Hash, verteilt die CRC32-Werte auf 64 Bit
+_BIN_SHIFT = 64 - (NUM_PERM - 1).bit_length()
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_EMPTY = 1 << 64
+
+# Vergleich zweier Signaturen als große Ganzzahlen (32 Bit je Wert): nach XOR werden die
+# Bits jedes Werts auf dessen niedrigstes Bit zusammengefaltet (SWAR) und die gesetzten
+# Bits gezählt. Das ersetzt NUM_PERM einzelne Vergleiche in Python.
+def _lane_mask(bits: int) -> int:
+    return sum(((1 << bits) - 1) << (32 * lane) for lane in range(NUM_PERM))
+
+_FOLDS = [(shift, _lane_mask(32 - shift)) for shift in (16, 8, 4, 2, 1)]
+_LANE_LSB = _lane_mask(1)
+_popcount = getattr(int, "bit_count", lambda value: bin(value).count("1"))
+
+# Metriken
+ARTICLES_CLUSTERED = metrics.Counter('newsmap_articles_clustered_total', 'Artikel mit Story-Cluster', ['result'])
+CLUSTERING_SECONDS = metrics.Histogram('newsmap_clustering_seconds', 'Dauer eines Clustering-Laufs')
+
+def shingles(text: str) -> List[int]:
+    # Zeichen-Shingles funktionieren auch für Sprachen ohne Leerzeichen zwischen Wörtern
+    if len(text) <= SHINGLE_SIZE:
+        return [zlib.crc32(text.encode("utf-8"))]
+    return list({zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8")) for i in range(len(text) - SHINGLE_SIZE + 1)})
+
+def minhash(title: str, publisher_name: Optional[str] = None) -> array:
+    """
+    MinHash-Signatur eines Titels als 32-Bit-Werte (NUM_PERM * 4 Byte).
+    Statt NUM_PERM Hashfunktionen pro Shingle wird jedes Shingle einmal gehasht und einem
+    von NUM_PERM Fächern zugeordnet, das das Minimum behält (One Permutation Hashing).
+    Leere Fächer übernehmen den Wert des nächsten belegten Fachs (Densification).
+    """
+    bins = [_EMPTY] * NUM_PERM
+    for shingle_hash in shingles(normalize_title(title, publisher_name)):
+        mixed = (shingle_hash * _GOLDEN) & _MASK64
+        position = mixed >> _BIN_SHIFT
+        value = mixed & _VALUE_MASK
+        if value < bins[position]:
+            bins[position] = value
+    for position in range(NUM_PERM):
+        if bins[position] == _EMPTY:
+            for distance in range(1, NUM_PERM):
+                donor = bins[(position + distance) % NUM_PERM]
+                if donor != _EMPTY:
+                    # Abstand einrechnen, damit geliehene Werte nicht zufällig übereinstimmen
+                    bins[position] = donor + distance * _GOLDEN
+                    break
+    return array("I", (value & 0xFFFFFFFF for value in bins))
+
+def pack(signature: array) -> int:
+    return int.from_bytes(signature.tobytes(), "little")
+
+def similarity(left: int, right: int) -> float:
+    """
+    Anteil übereinstimmender Werte zweier gepackter Signaturen (siehe pack), ein Schätzwert
+    der Jaccard-Ähnlichkeit der Shingle-Mengen.
+    """
+    folded = left ^ right
+    for shift, mask in _FOLDS:
+        folded |= (folded >> shift) & mask
+    return (NUM_PERM - _popcount(folded & _LANE_LSB)) / NUM_PERM
+
+class LshIndex:
+    """
+    Inkrementeller LSH-Index über MinHash-Signaturen. Hält höchstens max_entries Artikel;
+    die ältesten werden verdrängt, sodass der Speicherbedarf begrenzt bleibt.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, threshold: float = SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, Tuple[int, int]]" = OrderedDict()  # article_id -> (cluster_id, gepackte Signatur)
+        # Band -> {cluster_id: jüngstes Mitglied mit diesem Band}; je Cluster und Bucket
+        # wird so nur ein Artikel verglichen, auch wenn der Cluster sehr groß ist
+        self._buckets: Dict[Tuple[int, bytes], Dict[int, int]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _band_keys(signature: array) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def query(self, signature: array) -> Optional[int]:
+        # Cluster des ähnlichsten Kandidaten oberhalb der Schwelle
+        best_cluster, best_score = None, self.threshold
+        packed = pack(signature)
+        seen_clusters = set()
+        for key in self._band_keys(signature):
+            members = self._buckets.get(key)
+            if not members:
+                continue
+            for cluster_id, article_id in islice(reversed(members.items()), MAX_BUCKET_CANDIDATES):
+                if cluster_id in seen_clusters:
+                    continue
+                seen_clusters.add(cluster_id)
+                score = similarity(packed, self._entries[article_id][1])
+                if score >= best_score:
+                    best_cluster, best_score = cluster_id, score
+                    if score >= EARLY_MATCH_SIMILARITY:
+                        return best_cluster
+        return best_cluster
+
+    def add(self, article_id: int, cluster_id: int, signature: array):
+        self._entries[article_id] = (cluster_id, pack(signature))
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, {})[cluster_id] = article_id
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def assign(self, article_id: int, signature: array) -> Tuple[int, bool]:
+        """
+        Ordnet einen Artikel einem bestehenden Cluster zu oder eröffnet einen neuen
+        (Cluster-ID = Artikel-ID). Gibt (cluster_id, neu) zurück.
+        """
+        cluster_id = self.query(signature)
+        is_new = cluster_id is None
+        if is_new:
+            cluster_id = article_id
+        self.add(article_id, cluster_id, signature)
+        return cluster_id, is_new
+
+    def _evict_oldest(self):
+        # Jüngere Mitglieder desselben Clusters haben den Eintrag bereits überschrieben,
+        # ältere sind schon verdrängt; nur ein noch auf diesen Artikel zeigender Eintrag fällt weg
+        article_id, (cluster_id, packed) = self._entries.popitem(last=False)
+        signature = array("I", packed.to_bytes(NUM_PERM * 4, "little"))
+        for key in self._band_keys(signature):
+            members = self._buckets.get(key)
+            if members is None or members.get(cluster_id) != article_id:
+                continue
+            del members[cluster_id]
+            if not members:
+                del self._buckets[key]
+
+def load_index(cursor, window_hours: int = WINDOW_HOURS, max_entries: int = MAX_ENTRIES) -> LshIndex:
+    # Signaturen der letzten Stunden aus der Datenbank, damit jeder Lauf an den vorigen anschließt
+    index = LshIndex(max_entries)
+    cursor.execute("""
+        SELECT article_id, cluster_id, signature FROM story_signatures
+        WHERE created_at > now() - make_interval(hours => %s)
+        ORDER BY article_id DESC
+        LIMIT %s
+    """, (window_hours, max_entries))
+    for article_id, cluster_id, signature in reversed(cursor.fetchall()):
+        index.add(article_id, cluster_id, array("I", bytes(signature)))
+    return index
+
+def _assign_batch(index: LshIndex, rows: Iterable[Tuple[int, str, Optional[str]]]):
+    updates = []
+    for article_id, title, publisher_name in rows:
+        signature = minhash(title, publisher_name)
+        cluster_id, is_new = index.assign(article_id, signature)
+        ARTICLES_CLUSTERED.inc(result='new_cluster' if is_new else 'joined')
+        updates.append((article_id, cluster_id, signature.tobytes()))
+    return updates
+
+def cluster_new_articles(conn, window_hours: int = WINDOW_HOURS, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Ordnet alle Artikel ohne story_cluster_id in Reihenfolge ihrer ID einem Story-Cluster zu.
+    Läuft nach den Inserts eines Ingestion-Zyklus; gleichzeitig läuft höchstens ein Lauf.
+    Gibt die Anzahl zugeordneter Artikel zurück.
+    """
+    # Erst hier importiert, damit MinHash und Index ohne Datenbanktreiber nutzbar sind
+    from psycopg2.extras import execute_values
+
+    with CLUSTERING_SECONDS.time(), conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            logger.info("Clustering läuft bereits in einem anderen Prozess")
+            conn.rollback()
+            return 0
+        try:
+            index = load_index(cursor, window_hours)
+            total = 0
+            last_id = 0
+            while True:
+                cursor.execute("""
+                    SELECT articles.id, articles.title, publishers.name
+                    FROM articles
+                    LEFT JOIN publishers ON publishers.id = articles.publisher_id
+                    WHERE articles.story_cluster_id IS NULL AND articles.id > %s
+                    ORDER BY articles.id
+                    LIMIT %s
+                """, (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                updates = _assign_batch(index, rows)
+                execute_values(cursor, """
+                    UPDATE articles SET story_cluster_id = v.cluster_id
+                    FROM (VALUES %s) AS v(article_id, cluster_id, signature)
+                    WHERE articles.id = v.article_id
+                """, updates, template="(%s::integer, %s::integer, %s::bytea)")
+                execute_values(cursor, """
+                    INSERT INTO story_signatures (article_id, cluster_id, signature)
+                    VALUES %s
+                    ON CONFLICT (article_id) DO NOTHING
+                """, updates)
+                conn.commit()
+                total += len(updates)
+                last_id = rows[-1][0]
+
+            cursor.execute("""
+                DELETE FROM story_signatures WHERE created_at < now() - make_interval(hours => %s)
+            """, (window_hours,))
+            conn.commit()
+            logger.info("%s Artikel Story-Clustern zugeordnet (Index: %s Einträge)", total, len(index))
+            return total
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+            conn.commit()
@@ -0,0 +1,319 @@
+# vector_tiles.py
+
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import metrics
+from article_events import ArticleEventHub, article_hub
+from dimension_cache import DimensionCache, dimension_cache
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+LAYER_NAME = "publishers"
+EXTENT = 4096
+# Punkte knapp außerhalb der Kachel mitliefern, damit Symbole am Rand nicht abgeschnitten werden
+BUFFER = 64
+MAX_ZOOM = 20
+MAX_LATITUDE = 85.05112878
+
+# Höchstzahl gecachter Kacheln im API-Prozess
+CACHE_ENTRIES = int(os.getenv('API_TILE_CACHE_ENTRIES', '20000'))
+
+# Metriken
+TILE_REQUESTS = metrics.Counter('newsmap_tile_requests_total', 'Kachelabrufe', ['result'])
+TILE_INVALIDATIONS = metrics.Counter('newsmap_tile_invalidations_total', 'Verworfene Kacheln')
+TILE_RENDER_SECONDS = metrics.Histogram('newsmap_tile_render_seconds', 'Erzeugen einer Kachel')
+
+FilterKey = Tuple[Tuple[int, ...], Optional[date], Optional[date]]
+
+def filter_key(topics: Optional[List[int]], date_from: Optional[date], date_to: Optional[date]) -> FilterKey:
+    # Kanonische Form, damit gleiche Filter in beliebiger Reihenfolge denselben Cacheeintrag treffen
+    return tuple(sorted(set(topics or ()))), date_from, date_to
+
+# --- Web-Mercator -------------------------------------------------------------
+
+def tile_position(latitude: float, longitude: float, zoom: int) -> Tuple[float, float]:
+    # Position in Kacheleinheiten der Zoomstufe; der ganzzahlige Teil ist die Kachel
+    n = 1 << zoom
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    x = (longitude + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * n
+    return x, y
+
+def tiles_for_point(latitude: float, longitude: float, zoom: int) -> List[Tuple[int, int]]:
+    # Alle Kacheln der Zoomstufe, die den Punkt einschließlich Puffer enthalten
+    x, y = tile_position(latitude, longitude, zoom)
+    margin = BUFFER / EXTENT
+    last = (1 << zoom) - 1
+    xs = range(max(0, math.floor(x - margin)), min(last, math.floor(x + margin)) + 1)
+    ys = range(max(0, math.floor(y - margin)), min(last, math.floor(y + margin)) + 1)
+    return [(tile_x, tile_y) for tile_x in xs for tile_y in ys]
+
+# --- MVT-Kodierung (Protocol Buffers, vector_tile.proto Version 2) --------------
+
+def _varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+def _length_delimited(out: bytearray, field: int, payload: bytes):
+    _varint(out, (field << 3) | 2)
+    _varint(out, len(payload))
+    out += payload
+
+def _encode_value(value) -> bytes:
+    out = bytearray()
+    if isinstance(value, bool):
+        _varint(out, (7 << 3) | 0)
+        _varint(out, int(value))
+    elif isinstance(value, int) and value >= 0:
+        _varint(out, (5 << 3) | 0)
+        _varint(out, value)
+    elif isinstance(value, int):
+        _varint(out, (6 << 3) | 0)
+        _varint(out, _zigzag(value))
+    else:
+        _length_delimited(out, 1, str(value).encode("utf-8"))
+    return bytes(out)
+
+def encode_point_layer(name: str, features: Iterable[Tuple[int, int, int, Dict[str, object]]],
+                       extent: int = EXTENT) -> bytes:
+    """
+    Kodiert Punkt-Features (id, x, y, Attribute) als eine Ebene einer Vektorkachel.
+    x/y sind Kachelkoordinaten in [0, extent); Attribute mit None entfallen.
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[object, int] = {}
+    layer = bytearray()
+    _varint(layer, (15 << 3) | 0)
+    _varint(layer, 2)
+    _length_delimited(layer, 1, name.encode("utf-8"))
+
+    for feature_id, x, y, attributes in features:
+        tags = bytearray()
+        for key, value in attributes.items():
+            if value is None:
+                continue
+            _varint(tags, keys.setdefault(key, len(keys)))
+            # Typ mitschlüsseln, damit 1 und True verschiedene Werte bleiben
+            _varint(tags, values.setdefault((type(value), value), len(values)))
+        geometry = bytearray()
+        _varint(geometry, (1 << 3) | 1)  # MoveTo, ein Punkt
+        _varint(geometry, _zigzag(x))
+        _varint(geometry, _zigzag(y))
+
+        feature = bytearray()
+        _varint(feature, (1 << 3) | 0)
+        _varint(feature, feature_id)
+        _length_delimited(feature, 2, bytes(tags))
+        _varint(feature, (3 << 3) | 0)
+        _varint(feature, 1)  # POINT
+        _length_delimited(feature, 4, bytes(geometry))
+        _length_delimited(layer, 2, bytes(feature))
+
+    for key in keys:
+        _length_delimited(layer, 3, key.encode("utf-8"))
+    for _, value in values:
+        _length_delimited(layer, 4, _encode_value(value))
+    _varint(layer, (5 << 3) | 0)
+    _varint(layer, extent)
+
+    tile = bytearray()
+    _length_delimited(tile, 3, bytes(layer))
+    return bytes(tile)
+
+# --- Kacheln erzeugen ------------------------------------------------------------
+
+def _publishers_in_tile(cache: DimensionCache, zoom: int, tile_x: int, tile_y: int) -> Dict[int, Tuple[int, int]]:
+    # Publisher mit Standort in der Kachel (inkl. Puffer) -> Kachelkoordinaten
+    found = {}
+    # Der Cache tauscht das Dict bei Änderungen aus, die Iteration bleibt auf diesem Stand
+    for publisher_id, publisher in cache.publishers.items():
+        location = publisher.location
+        if location.latitude is None or location.longitude is None:
+            continue
+        x, y = tile_position(float(location.latitude), float(location.longitude), zoom)
+        px = round((x - tile_x) * EXTENT)
+        py = round((y - tile_y) * EXTENT)
+        if -BUFFER <= px < EXTENT + BUFFER and -BUFFER <= py < EXTENT + BUFFER:
+            found[publisher_id] = (px, py)
+    return found
+
+def render_tile(cursor, cache: DimensionCache, zoom: int, tile_x: int, tile_y: int, filters: FilterKey) -> bytes:
+    """
+    Erzeugt die Publisher-Ebene einer Kachel: je Publisher mit passenden Artikeln ein Punkt
+    mit Artikelzahl und häufigstem Thema. Die Zahlen kommen aus article_daily_counts,
+    Standorte und Namen aus dem Dimension-Cache.
+    """
+    positions = _publishers_in_tile(cache, zoom, tile_x, tile_y)
+    if not positions:
+        return encode_point_layer(LAYER_NAME, [])
+
+    topic_ids, date_from, date_to = filters
+    conditions = ["publisher_id = ANY(%s)"]
+    params: list = [list(positions)]
+    if topic_ids:
+        conditions.append("topic_id = ANY(%s)")
+        params.append(list(topic_ids))
+    if date_from:
+        conditions.append("day >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("day <= %s")
+        params.append(date_to)
+    cursor.execute(f"""
+        SELECT publisher_id, topic_id, SUM(article_count)
+        FROM article_daily_counts
+        WHERE {' AND '.join(conditions)}
+        GROUP BY publisher_id, topic_id
+    """, params)
+
+    totals: Dict[int, int] = {}
+    top_topics: Dict[int, Tuple[int, int]] = {}  # publisher_id -> (Anzahl, topic_id)
+    for publisher_id, topic_id, article_count in cursor.fetchall():
+        article_count = int(article_count)
+        totals[publisher_id] = totals.get(publisher_id, 0) + article_count
+        # Bei Gleichstand gewinnt die kleinere Themen-ID, damit Kacheln stabil bleiben
+        best = top_topics.get(publisher_id)
+        if best is None or article_count > best[0] or (article_count == best[0] and topic_id < best[1]):
+            top_topics[publisher_id] = (article_count, topic_id)
+
+    features = []
+    for publisher_id in sorted(totals):
+        publisher = cache.publishers[publisher_id]
+        top_topic_id = top_topics[publisher_id][1]
+        top_topic = cache.topics.get(top_topic_id)
+        x, y = positions[publisher_id]
+        features.append((publisher_id, x, y, {
+            "name": publisher.name,
+            "article_count": totals[publisher_id],
+            "top_topic_id": top_topic_id,
+            "top_topic": top_topic.topic_name if top_topic else None,
+            "country_iso": cache.country_iso_for_publisher(publisher_id),
+            "city": publisher.location.city,
+        }))
+    return encode_point_layer(LAYER_NAME, features)
+
+# --- Cache ---------------------------------------------------------------------
+
+class TileCache:
+    """
+    Fertig kodierte Kacheln je (z, x, y, Filter). Jede Kachel wird nur einmal erzeugt und
+    verworfen, sobald die Ingestion Artikel eines Publishers darin speichert (NOTIFY auf
+    ARTICLES_CHANNEL über article_events.article_hub) oder ein Publisher darin seinen Standort
+    ändert (Dimension-Cache). Der Listener startet mit dem ersten Abruf; nach einem
+    Verbindungsabbruch wird alles verworfen.
+    """
+
+    def __init__(self, cache: DimensionCache, events: ArticleEventHub, max_entries: int = CACHE_ENTRIES):
+        self.cache = cache
+        self.events = events
+        self.max_entries = max_entries
+        self._tiles: "OrderedDict[Tuple[int, int, int, FilterKey], bytes]" = OrderedDict()
+        self._by_tile: Dict[Tuple[int, int, int], Set[FilterKey]] = {}
+        self._zoom_counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # Zählt Invalidierungen; während der Erzeugung invalidierte Kacheln werden nicht gecacht
+        self._generation = 0
+        cache.add_location_listener(self.invalidate_points)
+        events.subscribe(self._on_articles, on_reset=self.clear)
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, key, tile: bytes, generation: int):
+        zoom, tile_x, tile_y, filters = key
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key not in self._tiles:
+                self._by_tile.setdefault((zoom, tile_x, tile_y), set()).add(filters)
+                self._zoom_counts[zoom] = self._zoom_counts.get(zoom, 0) + 1
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_entries:
+                self._forget(next(iter(self._tiles)))
+
+    def _forget(self, key):
+        # Aufrufer hält den Lock
+        zoom, tile_x, tile_y, filters = key
+        del self._tiles[key]
+        variants = self._by_tile[(zoom, tile_x, tile_y)]
+        variants.discard(filters)
+        if not variants:
+            del self._by_tile[(zoom, tile_x, tile_y)]
+        self._zoom_counts[zoom] -= 1
+        if not self._zoom_counts[zoom]:
+            del self._zoom_counts[zoom]
+
+    def invalidate_points(self, points: List[Tuple[float, float]]):
+        dropped = 0
+        with self._lock:
+            self._generation += 1
+            for zoom in list(self._zoom_counts):
+                tiles = {tile for latitude, longitude in points for tile in tiles_for_point(latitude, longitude, zoom)}
+                for tile_x, tile_y in tiles:
+                    for filters in list(self._by_tile.get((zoom, tile_x, tile_y), ())):
+                        self._forget((zoom, tile_x, tile_y, filters))
+                        dropped += 1
+        if dropped:
+            TILE_INVALIDATIONS.inc(dropped)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            dropped = len(self._tiles)
+            self._tiles.clear()
+            self._by_tile.clear()
+            self._zoom_counts.clear()
+        TILE_INVALIDATIONS.inc(dropped)
+
+    def _on_articles(self, rows: List[dict]):
+        # Gemeldet werden neue und neu verknüpfte Artikel, also alle, deren Zeilen in
+        # article_daily_counts sich geändert haben (parse_feeds.insert_articles)
+        if not self._tiles:
+            return
+        publisher_ids = {row['publisher_id'] for row in rows if row['publisher_id'] is not None}
+
+        points = []
+        for publisher_id in publisher_ids:
+            publisher = self.cache.publishers.get(publisher_id)
+            if publisher and publisher.location.latitude is not None and publisher.location.longitude is not None:
+                points.append((float(publisher.location.latitude), float(publisher.location.longitude)))
+        if points:
+            self.invalidate_points(points)
+
+    def fetch(self, conn, zoom: int, tile_x: int, tile_y: int, filters: FilterKey) -> bytes:
+        # Kachel aus dem Cache oder neu erzeugt; conn sollte auf den Primary zeigen
+        self.events.ensure_started()
+        self.cache.ensure_fresh()
+        key = (zoom, tile_x, tile_y, filters)
+        tile = self.get(key)
+        if tile is not None:
+            TILE_REQUESTS.inc(result='hit')
+            return tile
+        TILE_REQUESTS.inc(result='miss')
+        generation = self._generation
+        with TILE_RENDER_SECONDS.time():
+            try:
+                with conn.cursor() as cursor:
+                    tile = render_tile(cursor, self.cache, zoom, tile_x, tile_y, filters)
+            finally:
+                conn.rollback()
+        self.put(key, tile, generation)
+        return tile
+
+tile_cache = TileCache(dimension_cache, article_hub)
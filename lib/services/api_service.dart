@@ -136,4 +136,60 @@ class ApiService {
       throw Exception('Fehler beim Aufrufen von /api/v01/search: ${response.statusCode}');
     }
   }
+
+  /// Live-Stream neuer Artikel (Server-Sent Events) mit denselben Filtern wie die Suche.
+  /// Ersetzt das wiederholte Aufrufen von /search; bei "resync" sollte die Suche neu geladen werden.
+  Stream<List<Article>> streamNewArticles({
+    String? keywords,
+    List<int>? topics,
+    List<int>? publisherIds,
+    String? country,
+    DateTime? dateFrom,
+    DateTime? dateTo,
+    void Function()? onResync,
+  }) async* {
+    final queryParams = <String, dynamic>{};
+    if (keywords != null && keywords.isNotEmpty) queryParams['keywords'] = keywords;
+    if (topics != null && topics.isNotEmpty) {
+      queryParams['topics'] = topics.map((t) => t.toString()).toList();
+    }
+    if (publisherIds != null && publisherIds.isNotEmpty) {
+      queryParams['publishers'] = publisherIds.map((p) => p.toString()).toList();
+    }
+    if (country != null && country.isNotEmpty) queryParams['country'] = country.replaceAll(" ", "");
+    if (dateFrom != null) queryParams['date_from'] = dateFrom.toIso8601String();
+    if (dateTo != null) queryParams['date_to'] = dateTo.toIso8601String();
+
+    final uri = Uri.parse('$baseUrl/search/stream').replace(queryParameters: queryParams);
+    final client = http.Client();
+    try {
+      final request = http.Request('GET', uri)..headers['Accept'] = 'text/event-stream';
+      final response = await client.send(request);
+      if (response.statusCode != 200) {
+        throw Exception('Fehler beim Aufrufen von /api/v01/search/stream: ${response.statusCode}');
+      }
+
+      String event = 'message';
+      final data = StringBuffer();
+      await for (final line in response.stream.transform(utf8.decoder).transform(const LineSplitter())) {
+        if (line.isEmpty) {
+          // Leerzeile beendet ein Ereignis
+          if (event == 'articles' && data.isNotEmpty) {
+            final List<dynamic> items = jsonDecode(data.toString());
+            yield items.map((item) => Article.fromJson(item)).toList();
+          } else if (event == 'resync' && onResync != null) {
+            onResync();
+          }
+          event = 'message';
+          data.clear();
+        } else if (line.startsWith('event:')) {
+          event = line.substring(6).trim();
+        } else if (line.startsWith('data:')) {
+          data.write(line.substring(5).trim());
+        }
+      }
+    } finally {
+      client.close();
+    }
+  }
 }